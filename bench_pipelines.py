@@ -0,0 +1,152 @@
+"""Scaled-feature pipelines for the distance/linear benchmark models.
+
+The benchmark scripts label-encode everything into one numeric matrix, which
+is fine for trees but skews KNN distances and LR coefficients. `scaled()`
+puts a ColumnTransformer in front of the estimator: StandardScaler on numeric
+columns, one-hot on the label-encoded categoricals. The fitted transformer is
+memoised with joblib.Memory, keyed on its params and input data, so repeated
+benchmark runs and tuner candidates sharing a fold reuse it.
+
+KNN uses a KD-tree. `KNNIndex` lifts the fitted scaler/encoder parameters
+and a KD-tree (or ball tree) over the transformed training rows out of the
+pipeline and answers queries with plain NumPy and one `tree.query` call.
+That skips sklearn's per-call validation, which dominates single-row
+latency. `save_knn` persists the pipeline and the index side by side, and
+`knn_latency_report` times both against brute force as the training set
+grows.
+"""
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.neighbors import BallTree, KDTree
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+CACHE_DIR = 'pipeline_cache'
+
+_memory = joblib.Memory(CACHE_DIR, verbose=0)
+
+
+def scaled(estimator, categorical_idx, n_features, memory=_memory):
+    """`estimator` behind scaling + one-hot preprocessing; params are `clf__*`."""
+    numeric_idx = [i for i in range(n_features) if i not in categorical_idx]
+    prep = ColumnTransformer([
+        ('num', StandardScaler(), numeric_idx),
+        ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), list(categorical_idx)),
+    ])
+    return Pipeline([('prep', prep), ('clf', estimator)], memory=memory)
+
+
+# ── KNN index ────────────────────────────────────────────────────────────────
+
+class KNNIndex:
+    """Standalone query path for a fitted `scaled(KNeighborsClassifier)` pipeline."""
+
+    def __init__(self, pipeline, X_train, y_train, kind='kd_tree', leaf_size=40):
+        prep, clf = pipeline.named_steps['prep'], pipeline.named_steps['clf']
+        scaler, onehot = prep.named_transformers_['num'], prep.named_transformers_['cat']
+
+        self.numeric_idx     = list(prep.transformers_[0][2])
+        self.categorical_idx = list(prep.transformers_[1][2])
+        self.mean       = scaler.mean_
+        self.scale      = scaler.scale_
+        self.categories = [np.asarray(c, dtype=float) for c in onehot.categories_]
+        self.k          = clf.n_neighbors
+        self.weights    = clf.weights
+        self.classes_   = clf.classes_
+        self.kind       = kind
+        self._y         = np.searchsorted(self.classes_, y_train)
+        tree_cls        = KDTree if kind == 'kd_tree' else BallTree
+        self.tree       = tree_cls(self.transform(X_train), leaf_size=leaf_size)
+
+    def transform(self, X):
+        X     = np.asarray(X, dtype=float)
+        parts = [(X[:, self.numeric_idx] - self.mean) / self.scale]
+        for col, cats in zip(self.categorical_idx, self.categories):
+            parts.append((X[:, [col]] == cats[None, :]).astype(float))
+        return np.hstack(parts)
+
+    def predict_proba(self, X):
+        dist, ind = self.tree.query(self.transform(X), k=self.k)
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                w = 1.0 / dist
+            exact = np.isinf(w)
+            w[exact.any(axis=1)] = exact[exact.any(axis=1)]   # exact hits take all the weight
+        else:
+            w = np.ones_like(dist)
+        proba = np.zeros((len(ind), len(self.classes_)))
+        np.add.at(proba, (np.arange(len(ind))[:, None], self._y[ind]), w)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def save_knn(pipeline, X_train, y_train, path):
+    """Persists a fitted KNN pipeline together with its `KNNIndex`; returns bytes."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump({'pipeline': pipeline, 'index': KNNIndex(pipeline, X_train, y_train)}, path)
+    return os.path.getsize(path)
+
+
+def load_knn(path):
+    """Returns (pipeline, index) saved by `save_knn`."""
+    saved = joblib.load(path)
+    return saved['pipeline'], saved['index']
+
+
+def _query_latency(model, X, single_rows=200):
+    """(p50, p99) single-row latency and batch latency, all in us/row."""
+    single = []
+    for row in X[:single_rows]:
+        t0 = time.perf_counter()
+        model.predict(row[None, :])
+        single.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    model.predict(X)
+    batch = (time.perf_counter() - t0) / len(X)
+    single = np.array(single) * 1e6
+    return np.percentile(single, 50), np.percentile(single, 99), batch * 1e6
+
+
+def _grow(X, y, factor, numeric_idx, rng):
+    """Training set `factor`x larger: resampled rows with 2% numeric jitter."""
+    idx = rng.integers(0, len(X), len(X) * factor)
+    Xg  = X[idx].astype(float)
+    Xg[:, numeric_idx] *= 1 + rng.normal(0, 0.02, (len(idx), len(numeric_idx)))
+    return Xg, y[idx]
+
+
+def knn_latency_report(pipeline, X_train, y_train, X_test, factors=(1, 10, 50), seed=0):
+    """Prints pipeline (KD-tree / brute) vs. `KNNIndex` query latency as the
+    training set grows, and how often the index agrees with the pipeline."""
+    rng         = np.random.default_rng(seed)
+    categorical = pipeline.named_steps['prep'].transformers[1][2]
+    numeric_idx = [i for i in range(X_train.shape[1]) if i not in categorical]
+
+    print(f"\n{'Train rows':>10} {'Query path':<18} {'Build (ms)':>11} {'p50 (us)':>9}"
+          f" {'p99 (us)':>9} {'Batch (us/row)':>15} {'Agree':>6}")
+    for factor in factors:
+        Xg, yg = _grow(X_train, y_train, factor, numeric_idx, rng) if factor > 1 \
+            else (X_train, y_train)
+        reference = None
+        for label in ('pipeline kd_tree', 'pipeline brute', 'KNNIndex kd_tree'):
+            t0 = time.perf_counter()
+            if label.startswith('pipeline'):
+                model = clone(pipeline).set_params(memory=None,
+                                                   clf__algorithm=label.split()[1])
+                model.fit(Xg, yg)
+                fitted = model
+            else:
+                model = KNNIndex(fitted, Xg, yg)
+            build = (time.perf_counter() - t0) * 1e3
+            p50, p99, batch = _query_latency(model, X_test)
+            pred  = model.predict(X_test)
+            reference = pred if reference is None else reference
+            print(f"{len(Xg):>10} {label:<18} {build:>11.1f} {p50:>9.0f}"
+                  f" {p99:>9.0f} {batch:>15.1f} {(pred == reference).mean():>6.1%}")
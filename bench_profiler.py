@@ -0,0 +1,119 @@
+"""Per-phase profiling for the benchmark scripts (`--profile`).
+
+Every `PhaseProfiler.phase(name)` block is run under cProfile, tracemalloc and
+a stack-sampling thread, and leaves three files in the output directory:
+
+    NN_<phase>.pstats     -- cProfile stats (python -m pstats, snakeviz)
+    NN_<phase>.collapsed  -- sampled stacks, one 'a;b;c count' line per stack
+                             (flamegraph.pl, speedscope, inferno)
+    NN_<phase>.alloc.txt  -- top-N allocation sites by size, plus peak memory
+
+Phases must not nest: cProfile allows only one active profiler at a time.
+"""
+import contextlib
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack every `interval` seconds."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval  = interval
+        self.stacks    = Counter()
+        self._done     = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class PhaseProfiler:
+    """Collects per-phase profiles; a profiler with `out_dir=None` is a no-op."""
+
+    def __init__(self, out_dir=None, top_n=20, sample_interval=0.005):
+        self.out_dir         = out_dir
+        self.top_n           = top_n
+        self.sample_interval = sample_interval
+        self.phases          = []   # (name, wall_s, peak_bytes, samples)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.out_dir is not None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        stem    = os.path.join(self.out_dir, f'{len(self.phases):02d}_'
+                                             f'{re.sub(r"[^A-Za-z0-9_.-]+", "_", name)}')
+        sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+        profile = cProfile.Profile()
+        tracemalloc.start(10)
+        sampler.start()
+        t0 = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - t0
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak  = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            profile.dump_stats(stem + '.pstats')
+            with open(stem + '.collapsed', 'w') as f:
+                for stack, n in sampler.stacks.most_common():
+                    f.write(f'{stack} {n}\n')
+            self._write_allocations(stem + '.alloc.txt', name, snapshot, peak)
+            self.phases.append((name, wall, peak, sum(sampler.stacks.values())))
+
+    def _write_allocations(self, path, name, snapshot, peak):
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ])
+        stats = snapshot.statistics('traceback')
+        with open(path, 'w') as f:
+            f.write(f'Phase: {name}\nPeak traced memory: {peak / 1024:.1f} KiB\n'
+                    f'Live at phase end: {sum(s.size for s in stats) / 1024:.1f} KiB\n\n')
+            for rank, stat in enumerate(stats[:self.top_n], 1):
+                f.write(f'#{rank}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n')
+                for line in stat.traceback.format(limit=5):
+                    f.write(f'    {line}\n')
+
+    def print_summary(self):
+        if not self.phases:
+            return
+        total = sum(wall for _, wall, _, _ in self.phases)
+        print(f"\n{'Phase':<36} {'Wall (s)':>9} {'Share':>7} {'Peak (MiB)':>11} {'Samples':>8}")
+        for name, wall, peak, samples in self.phases:
+            print(f"{name:<36} {wall:>9.3f} {wall / total:>6.1%} "
+                  f"{peak / 2 ** 20:>11.2f} {samples:>8}")
+        print(f"\n  Profiles written to {self.out_dir}/\n")
@@ -0,0 +1,285 @@
+"""SQLite history of benchmark runs and regression gating between runs.
+
+Each benchmark run appends one row to `runs` (git commit, dataset hash,
+environment) and one row per model to `model_results` (config, quality
+metrics, per-fold CV scores and fit times, repeated predict timings, peak
+fit memory). `compare` runs a t-test per model on the per-fold / per-repeat
+samples (paired across identical CV folds, Welch otherwise) and exits 1 when a
+change is both significant and larger than the noise floor, so it can gate CI.
+
+    python bench_store.py list [--task workout]
+    python bench_store.py show 12
+    python bench_store.py compare 11 12          # base, candidate
+    python bench_store.py compare --task diet    # previous vs. latest diet run
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import sklearn
+from scipy import stats
+
+DB_PATH = 'bench_history.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    task         TEXT NOT NULL,
+    started_at   TEXT NOT NULL,
+    git_commit   TEXT,
+    git_dirty    INTEGER,
+    dataset      TEXT,
+    dataset_sha1 TEXT,
+    host         TEXT,
+    python       TEXT,
+    sklearn      TEXT
+);
+CREATE TABLE IF NOT EXISTS model_results (
+    run_id        INTEGER NOT NULL REFERENCES runs(id),
+    model         TEXT NOT NULL,
+    params        TEXT,
+    accuracy      REAL,
+    f1            REAL,
+    precision     REAL,
+    recall        REAL,
+    cv_mean       REAL,
+    cv_std        REAL,
+    cv_scores     TEXT,
+    cv_fit_times  TEXT,
+    predict_times TEXT,
+    predict_rows  INTEGER,
+    fit_peak_mb   REAL,
+    model_kb      REAL,
+    PRIMARY KEY (run_id, model)
+);
+"""
+
+# Compared metric -> (per-sample column, higher is better, relative floor, absolute floor,
+# paired). Fold samples are paired across runs when the dataset is unchanged,
+# since the CV splits are seeded; predict repeats are not.
+# A change is only flagged when it is significant AND exceeds both floors: fold
+# timings within one run share the machine's state, so run-to-run drift of
+# ~15% on an idle box is normal and must not fail the gate.
+CHECKS = {
+    'cv_f1':     ('cv_scores',     True,  0.01, 0.005,  True),
+    'fit_s':     ('cv_fit_times',  False, 0.25, 0.005,  True),
+    'predict_s': ('predict_times', False, 0.25, 0.0005, False),
+}
+
+
+# ── Measurement helpers (used by the benchmark scripts) ─────────────────────
+
+def fit_peak_memory(model, X, y):
+    """Fits `model` and returns peak traced Python/NumPy memory in MiB.
+
+    Works inside a `--profile` phase, where tracemalloc is already running.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        model.fit(X, y)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return (peak - base) / 2 ** 20
+
+
+def time_predict(model, X, repeats=7):
+    """Wall time (s) of `repeats` full `predict(X)` calls."""
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict(X)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+# ── Store ────────────────────────────────────────────────────────────────────
+
+def _git(*args):
+    """Runs git in this checkout (the code being benchmarked), not the cwd."""
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              timeout=10, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(results_path, db_path=DB_PATH):
+    """Appends the run saved at `results_path` (see `save_results`); returns its id."""
+    with open(results_path) as f:
+        data = json.load(f)
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    with connect(db_path) as conn:
+        cur = conn.execute(
+            'INSERT INTO runs (task, started_at, git_commit, git_dirty, dataset, dataset_sha1,'
+            ' host, python, sklearn) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (data['task'], data['started_at'], _git('rev-parse', 'HEAD'),
+             None if status is None else int(bool(status)), data['dataset'],
+             _file_sha1(data['dataset']), platform.node(), platform.python_version(),
+             sklearn.__version__))
+        run_id = cur.lastrowid
+        for name, res in data['models'].items():
+            conn.execute(
+                'INSERT INTO model_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run_id, name, json.dumps(res['params'], sort_keys=True, default=str),
+                 res['accuracy'], res['f1'], res['precision'], res['recall'],
+                 res['cv_mean'], res['cv_std'], json.dumps(res['cv_scores']),
+                 json.dumps(res['cv_fit_times']), json.dumps(res['predict_times']),
+                 res['predict_rows'], res['fit_peak_mb'], res['model_kb']))
+    conn.close()
+    return run_id
+
+
+def _latest_runs(conn, task, n=2):
+    rows = conn.execute('SELECT id FROM runs WHERE task = ? ORDER BY id DESC LIMIT ?',
+                        (task, n)).fetchall()
+    return [r['id'] for r in reversed(rows)]
+
+
+# ── Comparison ───────────────────────────────────────────────────────────────
+
+def compare(conn, base_id, new_id, alpha=0.01):
+    """Per-model t-tests (paired or Welch); returns a list of finding dicts."""
+    def load(run_id):
+        rows = conn.execute('SELECT * FROM model_results WHERE run_id = ?', (run_id,))
+        return {r['model']: r for r in rows}
+
+    base, new = load(base_id), load(new_id)
+    same_data = len({r['dataset_sha1'] for r in conn.execute(
+        'SELECT dataset_sha1 FROM runs WHERE id IN (?, ?)', (base_id, new_id))}) == 1
+    findings  = []
+    for model in sorted(set(base) & set(new)):
+        for check, (column, higher_better, rel_floor, abs_floor, paired) in CHECKS.items():
+            a = np.array(json.loads(base[model][column]))
+            b = np.array(json.loads(new[model][column]))
+            rel = (b.mean() - a.mean()) / a.mean() if a.mean() else 0.0
+            with warnings.catch_warnings():   # constant fold deltas: exact, not unstable
+                warnings.simplefilter('ignore', RuntimeWarning)
+                if np.allclose(a, b):
+                    p = 1.0
+                elif paired and same_data and len(a) == len(b):
+                    p = float(stats.ttest_rel(a, b).pvalue)
+                else:
+                    p = float(stats.ttest_ind(a, b, equal_var=False).pvalue)
+            worse = rel < 0 if higher_better else rel > 0
+            if p < alpha and abs(rel) >= rel_floor and abs(b.mean() - a.mean()) >= abs_floor:
+                status = 'REGRESSION' if worse else 'improved'
+            else:
+                status = 'ok'
+            findings.append({'model': model, 'check': check, 'base': a.mean(),
+                             'new': b.mean(), 'rel': rel, 'p': p, 'status': status,
+                             'config_changed': base[model]['params'] != new[model]['params']})
+    return findings
+
+
+def print_comparison(conn, base_id, new_id, findings):
+    runs = {r['id']: r for r in conn.execute('SELECT * FROM runs WHERE id IN (?, ?)',
+                                            (base_id, new_id))}
+    for label, run_id in (('base', base_id), ('new', new_id)):
+        r = runs[run_id]
+        commit = (r['git_commit'] or 'unknown')[:10] + ('+dirty' if r['git_dirty'] else '')
+        print(f"  {label:<4} run {run_id:>4}  {r['started_at']}  {commit:<16}"
+              f" data {r['dataset_sha1']}  {r['host']}")
+    if runs[base_id]['dataset_sha1'] != runs[new_id]['dataset_sha1']:
+        print('  warning: datasets differ between runs')
+    if runs[base_id]['host'] != runs[new_id]['host']:
+        print('  warning: runs were recorded on different hosts; timings are not comparable')
+
+    print(f"\n{'Model':<22} {'Check':<10} {'Base':>10} {'New':>10} {'Change':>8}"
+          f" {'p':>7}  Status")
+    for f in findings:
+        note = '  (config changed)' if f['config_changed'] else ''
+        print(f"{f['model']:<22} {f['check']:<10} {f['base']:>10.4f} {f['new']:>10.4f}"
+              f" {f['rel']:>+7.1%} {f['p']:>7.3f}  {f['status']}{note}")
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--db', default=DB_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_list = sub.add_parser('list', help='list recorded runs')
+    p_list.add_argument('--task')
+
+    p_show = sub.add_parser('show', help='per-model results of one run')
+    p_show.add_argument('run', type=int)
+
+    p_cmp = sub.add_parser('compare', help='diff two runs; exit 1 on regressions')
+    p_cmp.add_argument('base', type=int, nargs='?')
+    p_cmp.add_argument('new', type=int, nargs='?')
+    p_cmp.add_argument('--task', help='compare the two latest runs of this task')
+    p_cmp.add_argument('--alpha', type=float, default=0.01)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == 'list':
+        query = 'SELECT * FROM runs' + (' WHERE task = ?' if args.task else '') + ' ORDER BY id'
+        print(f"{'Run':>4}  {'Task':<8} {'Started':<20} {'Commit':<12} {'Dataset':<13} Host")
+        for r in conn.execute(query, (args.task,) if args.task else ()):
+            commit = (r['git_commit'] or '-')[:10] + ('*' if r['git_dirty'] else '')
+            print(f"{r['id']:>4}  {r['task']:<8} {r['started_at']:<20} {commit:<12}"
+                  f" {r['dataset_sha1']:<13} {r['host']}")
+
+    elif args.command == 'show':
+        print(f"{'Model':<22} {'F1':>6} {'CV F1':>6} {'Fit (s)':>8} {'Pred (ms)':>10}"
+              f" {'Fit MiB':>8} {'KB':>8}")
+        for r in conn.execute('SELECT * FROM model_results WHERE run_id = ?', (args.run,)):
+            print(f"{r['model']:<22} {r['f1']:>6.3f} {r['cv_mean']:>6.3f}"
+                  f" {np.mean(json.loads(r['cv_fit_times'])):>8.3f}"
+                  f" {np.median(json.loads(r['predict_times'])) * 1e3:>10.2f}"
+                  f" {r['fit_peak_mb']:>8.2f} {r['model_kb']:>8.1f}")
+
+    else:
+        if args.base is None or args.new is None:
+            if not args.task:
+                parser.error('compare needs BASE and NEW run ids, or --task')
+            ids = _latest_runs(conn, args.task)
+            if len(ids) < 2:
+                parser.error(f"fewer than two recorded '{args.task}' runs")
+            args.base, args.new = ids
+        missing = [i for i in (args.base, args.new)
+                   if conn.execute('SELECT 1 FROM runs WHERE id = ?', (i,)).fetchone() is None]
+        if missing:   # exit 2 (usage), not 1: that means a regression was found
+            parser.error(f"no recorded run {', '.join(map(str, missing))}")
+        findings = compare(conn, args.base, args.new, args.alpha)
+        print_comparison(conn, args.base, args.new, findings)
+        regressions = [f for f in findings if f['status'] == 'REGRESSION']
+        print(f"\n  {len(regressions)} regression(s) at alpha={args.alpha}\n")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Confidence calibration for the forest recommenders.
+
+A random forest's `proba.max()` is a vote share, not a probability of being
+right: on the diet task it sits near 1.0 for almost every row while the
+out-of-bag accuracy is lower. `ConfidenceCalibrator` learns an isotonic map
+from top-class confidence to P(prediction is correct) on out-of-fold
+predictions and bakes it into a fixed float32 table over [0, 1], so applying
+it at inference is one array index -- scalar or vectorized -- with no sklearn
+call. The table is a plain attribute and is pickled with the recommender.
+
+The isotonic fit runs on bins of at least MIN_BIN_ROWS rows (by confidence)
+rather than on single rows, so one wrong out-of-bag row in a sparse stretch
+cannot pull a whole range to 0. The map never goes below 1 / n_classes, the
+lowest top-class share a forest can report.
+
+`expected_calibration_error` and `reliability_curve` are the metrics the
+benchmark scripts report.
+"""
+import numpy as np
+from sklearn.isotonic import IsotonicRegression
+
+TABLE_SIZE   = 1001   # grid points over [0, 1]; step 0.001, below display precision
+MIN_BIN_ROWS = 50     # out-of-fold rows per point the isotonic fit sees
+
+
+def top_confidence(proba, classes, y):
+    """(top-class confidence, prediction correct) per row of `proba`.
+
+    Rows without a prediction (all-NaN out-of-bag rows) are dropped.
+    """
+    proba = np.asarray(proba, dtype=float)
+    keep  = ~np.isnan(proba).any(axis=1)
+    proba, y = proba[keep], np.asarray(y)[keep]
+    return proba.max(axis=1), np.asarray(classes)[proba.argmax(axis=1)] == y
+
+
+class ConfidenceCalibrator:
+    """Monotone map from raw top-class confidence to calibrated confidence."""
+
+    def __init__(self, table_size=TABLE_SIZE):
+        self.table  = np.linspace(0.0, 1.0, table_size, dtype=np.float32)   # identity
+        self._scale = table_size - 1
+        self.n_fit  = 0
+
+    def fit(self, proba, y, classes, min_bin_rows=MIN_BIN_ROWS):
+        """Fits on out-of-fold `proba` (columns ordered as `classes`) and labels `y`."""
+        conf, correct = top_confidence(proba, classes, y)
+        # Consecutive rows by confidence, pooled into bins of >= min_bin_rows
+        order  = np.argsort(conf, kind='stable')
+        n_bins = max(len(conf) // min_bin_rows, 1)
+        bins   = np.arange(len(conf)) * n_bins // max(len(conf), 1)
+        counts = np.bincount(bins, minlength=n_bins)
+        x      = np.bincount(bins, conf[order], n_bins) / counts
+        acc    = np.bincount(bins, correct[order].astype(float), n_bins) / counts
+        iso = IsotonicRegression(y_min=1.0 / len(classes), y_max=1.0, increasing=True,
+                                 out_of_bounds='clip').fit(x, acc, sample_weight=counts)
+        grid        = np.linspace(0.0, 1.0, len(self.table))
+        self.table  = iso.predict(grid).astype(np.float32)
+        self.n_fit  = len(conf)
+        return self
+
+    def __call__(self, conf):
+        """Calibrated confidence; `conf` may be a float or an array."""
+        # Both paths round half up (conf >= 0, so truncation is floor)
+        if type(conf) is float:   # hot path of early-exit scoring
+            return float(self.table[int(conf * self._scale + 0.5)])
+        if np.ndim(conf) == 0:
+            return float(self.table[int(conf * self._scale + 0.5)])
+        idx = (np.asarray(conf, dtype=float) * self._scale + 0.5).astype(np.intp)
+        return self.table[idx]
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+
+def reliability_curve(conf, correct, n_bins=10):
+    """Per equal-width bin: (mean confidence, accuracy, count); empty bins are NaN."""
+    conf, correct = np.asarray(conf, dtype=float), np.asarray(correct, dtype=float)
+    bins   = np.minimum((conf * n_bins).astype(int), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    with np.errstate(invalid='ignore'):
+        mean_conf = np.bincount(bins, conf, n_bins) / counts
+        accuracy  = np.bincount(bins, correct, n_bins) / counts
+    return mean_conf, accuracy, counts
+
+
+def expected_calibration_error(conf, correct, n_bins=10):
+    """Count-weighted mean |accuracy - confidence| over equal-width bins."""
+    mean_conf, accuracy, counts = reliability_curve(conf, correct, n_bins)
+    filled = counts > 0
+    return float(np.sum(counts[filled] * np.abs(accuracy[filled] - mean_conf[filled]))
+                 / counts.sum())
@@ -0,0 +1,214 @@
+"""Compact forest mode: pruned, tree-selected, flat float32 random forests.
+
+Compaction is three steps:
+  1. refit the forest with leaf-limited / cost-complexity-pruned trees,
+  2. greedy forward ensemble selection on a validation split keeps the fewest
+     trees whose F1 stays within `tolerance` of the whole pruned forest,
+  3. the kept trees are flattened into `FlatForest` arrays: float32 thresholds,
+     int16 features, int16/int32 child indices and float32 leaf distributions.
+
+    python compact_forest.py [--max-leaf-nodes 64 --ccp-alpha 0.0 --tolerance 0.005]
+"""
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+from health_app import DietRecommenderAI, WorkoutRecommenderAI
+
+TASKS = {
+    'diet':    (DietRecommenderAI,    'diet_recommendations_dataset.csv'),
+    'workout': (WorkoutRecommenderAI, 'workout_dataset.csv'),
+}
+
+
+def _float32_floor(values):
+    """Rounds thresholds down to float32 so `x <= t` is unchanged for float32 x."""
+    t32  = values.astype(np.float32)
+    over = t32.astype(np.float64) > values
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+class FlatForest:
+    """A fitted forest stored as flat arrays, with a sklearn-like predict API.
+
+    Node arrays of all trees are concatenated; `offsets[t]` is the first node of
+    tree t and child indices are local to their tree (-1 marks a leaf).
+    """
+
+    def __init__(self, estimators, classes, params=None):
+        trees  = [est.tree_ for est in estimators]
+        sizes  = np.array([t.node_count for t in trees])
+        index  = np.int16 if sizes.max() < np.iinfo(np.int16).max else np.int32
+
+        self.classes_   = np.asarray(classes)
+        self.n_features_in_ = trees[0].n_features
+        self.offsets    = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        self.feature    = np.concatenate([np.maximum(t.feature, 0) for t in trees]).astype(np.int16)
+        self.threshold  = _float32_floor(np.concatenate([t.threshold for t in trees]))
+        self.left       = np.concatenate([t.children_left for t in trees]).astype(index)
+        self.right      = np.concatenate([t.children_right for t in trees]).astype(index)
+        value           = np.concatenate([t.value[:, 0, :] for t in trees])
+        self.value      = (value / value.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.cover      = np.concatenate([t.weighted_n_node_samples for t in trees]).astype(np.float32)
+        self.max_depth  = int(max(t.max_depth for t in trees))
+        self.n_estimators = len(trees)
+        self._params    = dict(params or {}, n_estimators=len(trees))
+
+    def get_params(self, deep=True):
+        return dict(self._params)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.offsets, self.feature, self.threshold,
+                                      self.left, self.right, self.value, self.cover))
+
+    def apply(self, X):
+        """Global leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X    = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.offsets, (len(X), self.n_estimators)).copy()
+        for _ in range(self.max_depth):
+            left = self.left[node]
+            live = left >= 0
+            if not live.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            child   = np.where(go_left, left, self.right[node]).astype(np.int32) + self.offsets
+            node    = np.where(live, child, node)
+        return node
+
+    def predict_proba(self, X):
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+# ── Compaction ───────────────────────────────────────────────────────────────
+
+def select_trees(forest, X_val, y_val, tolerance=0.005, min_trees=10):
+    """Greedy forward selection; returns (kept tree indices, full-forest F1, F1 path).
+
+    Each step adds the tree that most lowers validation log-loss of the running
+    average. The shortest prefix (at least `min_trees`) whose F1 is within
+    `tolerance` of the best of the whole forest and the greedy path is kept.
+    """
+    per_tree = np.stack([est.predict_proba(X_val) for est in forest.estimators_])
+    y_idx    = np.searchsorted(forest.classes_, y_val)
+    # Probability each tree gives the true class: (n_trees, n_val)
+    p_true   = per_tree[:, np.arange(len(y_idx)), y_idx]
+    full_f1  = f1_score(y_idx, per_tree.mean(axis=0).argmax(1), average='weighted')
+
+    chosen, remaining = [], list(range(len(per_tree)))
+    total, total_true, f1_path = np.zeros_like(per_tree[0]), np.zeros(len(y_idx)), []
+    while remaining:
+        k    = len(chosen) + 1
+        cand = (total_true[None, :] + p_true[remaining]) / k
+        loss = -np.log(np.clip(cand, 1e-7, 1.0)).mean(axis=1)
+        best = remaining.pop(int(np.argmin(loss)))
+        total_true += p_true[best]
+        total      += per_tree[best]
+        chosen.append(best)
+        f1_path.append(f1_score(y_idx, total.argmax(1), average='weighted'))
+
+    min_k  = min(min_trees, len(f1_path))
+    target = max(full_f1, max(f1_path[min_k - 1:])) - tolerance
+    k = next(i + 1 for i, f1 in enumerate(f1_path) if i + 1 >= min_k and f1 >= target)
+    return chosen[:k], full_f1, f1_path
+
+
+def compact_forest(X_train, y_train, X_val, y_val, max_leaf_nodes=64, ccp_alpha=0.0,
+                   n_estimators=100, tolerance=0.005, min_trees=10, random_state=42):
+    """Fits a pruned forest and returns a `FlatForest` of its selected trees."""
+    forest = RandomForestClassifier(n_estimators=n_estimators, max_leaf_nodes=max_leaf_nodes,
+                                    ccp_alpha=ccp_alpha, random_state=random_state)
+    forest.fit(X_train, y_train)
+    keep, _, _ = select_trees(forest, X_val, y_val, tolerance, min_trees)
+    params = {'compact': True, 'max_leaf_nodes': max_leaf_nodes, 'ccp_alpha': ccp_alpha,
+              'tolerance': tolerance, 'min_trees': min_trees, 'random_state': random_state}
+    return FlatForest([forest.estimators_[i] for i in keep], forest.classes_, params)
+
+
+def compact_recommender(recommender, dataset, val_size=0.2, **kwargs):
+    """Replaces `recommender.model` with a compacted forest trained on `dataset`.
+
+    A stratified `val_size` slice is held out for tree selection; the pruned
+    forest itself is fitted on the rest.
+    """
+    X, y = recommender.encode_frame(pd.read_csv(dataset), fit=True)
+    X_tr, X_val, y_tr, y_val = train_test_split(X, y, test_size=val_size,
+                                                stratify=y, random_state=42)
+    recommender.model = compact_forest(X_tr, y_tr, X_val, y_val, **kwargs)
+    recommender._set_version(dataset)
+    # The held-out slice doubles as the calibration set (the flat forest has no OOB votes)
+    recommender.fit_calibration(recommender.model.predict_proba(X_val), y_val)
+    recommender.fit_rules(X_tr, y_tr)
+    recommender.early_exit = None   # a FlatForest has no per-tree sklearn estimators
+    return recommender
+
+
+# ── Size / latency / F1 report ───────────────────────────────────────────────
+
+def _latency_us(model, X, single_rows=200):
+    t0 = time.perf_counter()
+    for row in X[:single_rows]:
+        model.predict_proba(row[None, :])
+    single = (time.perf_counter() - t0) / min(single_rows, len(X)) * 1e6
+    t0 = time.perf_counter()
+    model.predict_proba(X)
+    batch = (time.perf_counter() - t0) / len(X) * 1e6
+    return single, batch
+
+
+def report(task, max_leaf_nodes=64, ccp_alpha=0.0, tolerance=0.005):
+    recommender_cls, dataset = TASKS[task]
+    rec  = recommender_cls()
+    X, y = rec.encode_frame(pd.read_csv(dataset), fit=True)
+    X    = X.astype(np.float32)
+    X_tmp, X_te, y_tmp, y_te = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+    X_tr, X_val, y_tr, y_val = train_test_split(X_tmp, y_tmp, test_size=0.25,
+                                                stratify=y_tmp, random_state=42)
+
+    current = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_tmp, y_tmp)
+    compact = compact_forest(X_tr, y_tr, X_val, y_val, max_leaf_nodes, ccp_alpha,
+                             tolerance=tolerance)
+    flat_full = FlatForest(current.estimators_, current.classes_)
+
+    rows = []
+    for name, model, size in (
+            ('current (sklearn)', current,   len(pickle.dumps(current))),
+            ('current (flat)',    flat_full, flat_full.nbytes),
+            ('compact (flat)',    compact,   compact.nbytes)):
+        single, batch = _latency_us(model, X_te)
+        n_nodes = (sum(e.tree_.node_count for e in model.estimators_)
+                   if hasattr(model, 'estimators_') else len(model.feature))
+        rows.append((name, model.n_estimators, n_nodes, size / 1024, single, batch,
+                     f1_score(y_te, model.predict(X_te), average='weighted')))
+
+    print(f"\n{task}: compaction (max_leaf_nodes={max_leaf_nodes}, ccp_alpha={ccp_alpha})")
+    print(f"{'Model':<20} {'Trees':>6} {'Nodes':>8} {'Size (KB)':>10}"
+          f" {'1-row (us)':>11} {'Batch (us/row)':>15} {'Test F1':>8}")
+    for name, trees, nodes, kb, single, batch, f1 in rows:
+        print(f"{name:<20} {trees:>6} {nodes:>8} {kb:>10.1f} {single:>11.1f}"
+              f" {batch:>15.2f} {f1:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--max-leaf-nodes', type=int, default=64)
+    parser.add_argument('--ccp-alpha', type=float, default=0.0)
+    parser.add_argument('--tolerance', type=float, default=0.005)
+    args = parser.parse_args()
+    for task in TASKS:
+        report(task, args.max_leaf_nodes, args.ccp_alpha, args.tolerance)
+
+
+if __name__ == '__main__':
+    main()
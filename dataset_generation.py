@@ -27,7 +27,8 @@ def _assign_workout_intensity(age, bmi, disease, activity, goal, rng):
     return intensity
 
 
-def generate_workout_dataset(num_rows=1000, seed=99):
+def generate_workout_dataset(num_rows=1000, seed=99, progress=None,
+                             filename='workout_dataset.csv'):
     print(f"Generating {num_rows} workout records...")
     rng = np.random.default_rng(seed)
 
@@ -55,15 +56,43 @@ def generate_workout_dataset(num_rows=1000, seed=99):
         intensity = _assign_workout_intensity(age, bmi, disease, activity, goal, rng)
         rows.append([patient_id, age, gender, weight, height, bmi,
                      disease, activity, goal, intensity])
+        if progress and (i + 1) % 500 == 0:
+            progress(i + 1, num_rows, 'rows')
 
     cols = ['Patient_ID', 'Age', 'Gender', 'Weight_kg', 'Height_cm', 'BMI',
             'Disease_Type', 'Physical_Activity_Level', 'Goal', 'Workout_Intensity']
     df = pd.DataFrame(rows, columns=cols)
-    filename = 'workout_dataset.csv'
     df.to_csv(filename, index=False)
+    if progress:
+        progress(num_rows, num_rows, 'rows')
     print(f"Saved: {filename}")
     print(df['Workout_Intensity'].value_counts().to_string())
 
 
+def generate_joint_dataset(source='diet_recommendations_dataset.csv', seed=7,
+                           filename='joint_dataset.csv'):
+    """Diet rows plus a sampled Goal and a rule-assigned Workout_Intensity.
+
+    One row per person carrying both targets, for the multi-output
+    `JointRecommenderAI`. The intensity comes from the same rules and 8 %
+    noise as the workout dataset.
+    """
+    print(f"Generating joint dataset from '{source}'...")
+    rng = np.random.default_rng(seed)
+    df  = pd.read_csv(source)
+    df['Goal'] = rng.choice(['Lose Weight', 'Maintain', 'Gain Muscle'], size=len(df))
+    df['Workout_Intensity'] = [
+        _assign_workout_intensity(age, bmi, disease, activity, goal, rng)
+        for age, bmi, disease, activity, goal in zip(
+            df['Age'], df['BMI'], df['Disease_Type'].fillna('None'),
+            df['Physical_Activity_Level'], df['Goal'])
+    ]
+    df.to_csv(filename, index=False)
+    print(f"Saved: {filename}")
+    print(df['Workout_Intensity'].value_counts().to_string())
+    return filename
+
+
 if __name__ == "__main__":
-    generate_workout_dataset(1000)
\ No newline at end of file
+    generate_workout_dataset(1000)
+    generate_joint_dataset()
\ No newline at end of file
@@ -0,0 +1,127 @@
+"""Early-exit evaluation of a fitted random forest, one request at a time.
+
+A forest's answer is the class with the largest summed leaf distribution over
+all T trees. After k trees, each class holds some mass and R = T - k trees are
+left. Every tree adds at most 1 to any class. So once the leader is more than
+R ahead of the runner-up, no remaining tree can change the label. At that
+point the full-forest confidence (final leader mass / T) is known to lie in
+[s / T, (s + R) / T], where s is the leader's mass so far. Evaluation stops
+when the label is settled and that interval is at most 2 * tolerance wide.
+The returned confidence is the running mean s / k clipped into the interval,
+so it is never more than `tolerance` from the full-forest value.
+
+Users see calibrated confidence, and a step in the calibration map can turn a
+small raw interval into a large displayed one. With a `calibrator`, the width
+is measured after calibration instead: scoring stops when calibrator(lo) and
+calibrator(hi) are at most 2 * tolerance apart, and the calibrated value is
+returned, never more than `tolerance` from the calibrated full-forest value.
+The map is monotone, so that value lies in [calibrator(lo), calibrator(hi)].
+
+The margin grows fastest when the trees that side most strongly with the
+full forest go first. `fit_order` ranks trees offline by their mean margin
+for the full forest's winner over a sample of training rows. At the default
+tolerance the interval condition, not the margin, decides when to stop, so
+most rows still evaluate about 90 of 100 trees and the order barely matters.
+The latency gain over `predict_proba` comes mainly from the walk itself: the
+trees are stored as Python lists and walked one row at a time, which avoids
+the per-call validation and per-tree dispatch of sklearn's `predict_proba`
+that dominate single-row latency. `early_exit_benchmark.py` reports trees
+evaluated, latency and confidence deviation per tolerance.
+"""
+import numpy as np
+
+ORDER_ROWS   = 2000   # training rows sampled to rank the trees
+TOLERANCE    = 0.05   # default max |confidence - full-forest confidence|, as shown
+RANDOM_STATE = 0
+
+
+class EarlyExitForest:
+    """A fitted `RandomForestClassifier` re-packed for early-exit single-row scoring."""
+
+    def __init__(self, forest, tolerance=TOLERANCE):
+        self.classes_  = forest.classes_
+        self.tolerance = tolerance
+        self.n_trees   = len(forest.estimators_)
+        self.arrays    = []   # per tree: feature, threshold, left, right, leaf distribution
+        for est in forest.estimators_:
+            t     = est.tree_
+            value = t.value[:, 0, :]
+            self.arrays.append((np.maximum(t.feature, 0), t.threshold, t.children_left,
+                                t.children_right, value / value.sum(axis=1, keepdims=True)))
+        self.order = list(range(self.n_trees))
+        self._build_lists()
+
+    def _build_lists(self):
+        self._trees = [tuple(a.tolist() for a in arrays) for arrays in self.arrays]
+
+    # The list copies are rebuilt on load rather than pickled: they are several
+    # times larger than the arrays.
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != '_trees'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_lists()
+
+    def fit_order(self, X, seed=RANDOM_STATE):
+        """Ranks the trees by mean margin for the full forest's winner on rows of `X`."""
+        rng = np.random.default_rng(seed)
+        if len(X) > ORDER_ROWS:
+            X = X[np.sort(rng.choice(len(X), ORDER_ROWS, replace=False))]
+        per_tree = self._per_tree_proba(np.asarray(X, dtype=np.float32))
+        winner   = per_tree.sum(axis=0).argmax(axis=1)
+        rows     = np.arange(len(winner))
+        lead     = per_tree[:, rows, winner]
+        per_tree[:, rows, winner] = -np.inf
+        margin   = lead - per_tree.max(axis=2)
+        self.order = np.argsort(-margin.mean(axis=1), kind='stable').tolist()
+        return self
+
+    def _per_tree_proba(self, X):
+        """Leaf distributions, shape (n_trees, n_rows, n_classes)."""
+        out = np.empty((self.n_trees, len(X), len(self.classes_)))
+        for i, (feature, threshold, left, right, value) in enumerate(self.arrays):
+            node = np.zeros(len(X), dtype=np.intp)
+            while True:
+                live = left[node] >= 0
+                if not live.any():
+                    break
+                go_left = X[np.arange(len(X)), feature[node]] <= threshold[node]
+                node    = np.where(live, np.where(go_left, left[node], right[node]), node)
+            out[i] = value[node]
+        return out
+
+    def score(self, row, tolerance=None, calibrator=None):
+        """(class index, confidence, trees evaluated) for one encoded feature row.
+
+        With `calibrator`, the confidence is calibrated and the tolerance
+        applies to it.
+        """
+        tol   = self.tolerance if tolerance is None else tolerance
+        x     = np.asarray(row, dtype=np.float32).tolist()   # float32, as sklearn compares
+        T     = self.n_trees
+        mass  = [0.0] * len(self.classes_)
+        k     = 0
+        for t in self.order:
+            feature, threshold, left, right, value = self._trees[t]
+            node = 0
+            while left[node] >= 0:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            mass = [m + v for m, v in zip(mass, value[node])]
+            k   += 1
+            left_over = T - k
+            # The margin is at most k, so nothing can be settled before k > left_over
+            if k > left_over and (calibrator is not None or left_over <= 2 * tol * T):
+                lead   = max(range(len(mass)), key=mass.__getitem__)
+                second = max(m for c, m in enumerate(mass) if c != lead)
+                if mass[lead] - second > left_over and (
+                        calibrator is None
+                        or calibrator((mass[lead] + left_over) / T)
+                        - calibrator(mass[lead] / T) <= 2 * tol):
+                    break
+        lead = max(range(len(mass)), key=mass.__getitem__)
+        lo, hi = mass[lead] / T, (mass[lead] + T - k) / T
+        conf   = min(max(mass[lead] / k, lo), hi)   # running mean, inside the interval
+        if calibrator is not None:
+            lo, hi, conf = calibrator(lo), calibrator(hi), calibrator(conf)
+        return lead, min(max(conf, hi - tol), lo + tol), k
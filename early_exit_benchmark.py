@@ -0,0 +1,88 @@
+"""Early-exit forest scoring vs. sklearn `predict_proba`, one row at a time.
+
+Each recommender is trained on 80 % of its dataset. Held-out rows are then
+scored singly, once by sklearn and once by `EarlyExitForest` at each
+tolerance: with the tolerance on the raw vote share (fitted and learned tree
+order) and on the calibrated confidence (learned order, as `_score_uncached`
+runs it). The report gives the mean number of trees evaluated, p50 latency,
+label agreement with the full forest and the max deviation of the raw and of
+the displayed (calibrated) confidence from the full-forest values.
+
+    python early_exit_benchmark.py [--task diet|workout|all] [--requests 300]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from early_exit import EarlyExitForest
+from rule_benchmark import RANDOM_STATE, TASKS, TEST_SIZE
+
+TOLERANCES = (0.0, 0.02, 0.05, 0.1, 0.25)
+
+
+def _p50_ms(fn, rows):
+    times = []
+    for row in rows:
+        t0 = time.perf_counter()
+        fn(row)
+        times.append(time.perf_counter() - t0)
+    return np.percentile(np.array(times) * 1e3, 50)
+
+
+def benchmark(task, n_requests=300):
+    recommender_cls, dataset, _ = TASKS[task]
+    df = pd.read_csv(dataset)
+    train, test = train_test_split(df, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    recommender = recommender_cls()
+    X, y = recommender.encode_frame(train, fit=True)
+    recommender.model.fit(X, y)
+    recommender.fit_calibration(recommender._out_of_fold_proba(X, y), y)
+    calibrator = recommender.calibrator
+    X_test = recommender.encode_frame(test)[0][:n_requests]
+
+    full      = recommender.model.predict_proba(X_test)
+    full_idx  = full.argmax(axis=1)
+    full_conf = full.max(axis=1)
+    full_cal  = calibrator(full_conf)
+    n_trees   = len(recommender.model.estimators_)
+    learned   = EarlyExitForest(recommender.model).fit_order(X)
+    modes     = {'raw tol, fitted order':  (EarlyExitForest(recommender.model), None),
+                 'raw tol, learned order': (learned, None),
+                 'calibrated tol':         (learned, calibrator)}
+
+    print(f"\n=== {task}: {len(X_test)} held-out rows, {n_trees} trees ===")
+    print(f"\n{'Mode':<36} {'Trees':>6} {'p50 (ms)':>9} {'Labels':>8}"
+          f" {'Max |dRaw|':>11} {'Max |dShown|':>13}")
+    sk_p50 = _p50_ms(lambda r: recommender.model.predict_proba(r[None, :]), X_test)
+    print(f"{'sklearn predict_proba':<36} {n_trees:>6.1f} {sk_p50:>9.3f} {1:>8.1%}"
+          f" {0:>11.4f} {0:>13.4f}")
+    for tol in TOLERANCES:
+        for mode, (forest, cal) in modes.items():
+            res   = [forest.score(row, tol, calibrator=cal) for row in X_test]
+            conf  = np.array([r[1] for r in res])
+            shown = conf if cal is not None else calibrator(conf)
+            raw   = ('' if cal is not None
+                     else f"{np.abs(conf - full_conf).max():.4f}")
+            p50   = _p50_ms(lambda r: forest.score(r, tol, calibrator=cal), X_test)
+            print(f"{f'{mode}, tol {tol:g}':<36}"
+                  f" {np.mean([r[2] for r in res]):>6.1f} {p50:>9.3f}"
+                  f" {np.mean(np.array([r[0] for r in res]) == full_idx):>8.1%}"
+                  f" {raw:>11} {np.abs(shown - full_cal).max():>13.4f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--task', choices=['diet', 'workout', 'all'], default='all')
+    parser.add_argument('--requests', type=int, default=300,
+                        help='held-out rows scored one at a time (default: 300)')
+    args = parser.parse_args()
+    for task in (['diet', 'workout'] if args.task == 'all' else [args.task]):
+        benchmark(task, args.requests)
+
+
+if __name__ == '__main__':
+    main()
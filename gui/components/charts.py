@@ -4,6 +4,7 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 
 from gui.styles import BG_CARD, ACCENT, TEXT_MAIN, TEXT_DIM
+from weight_projection import fan_coordinates
 
 class MockupBMIGauge(ctk.CTkFrame):
     def __init__(self, parent, bmi, **kwargs):
@@ -95,3 +96,84 @@ class MockupDonutChart(ctk.CTkFrame):
         canvas = FigureCanvasTkAgg(fig, master=self)
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
+
+class WeightFanChart(ctk.CTkFrame):
+    """Projected weight bands (5-95% and 25-75%) with the median path.
+
+    Drawn as Tk canvas polygons rather than a Matplotlib figure, so a redraw
+    on resize or a new horizon costs well under a millisecond of geometry.
+    """
+    BAND_COLORS = ("#164e63", "#0e7490")   # outer, inner
+
+    def __init__(self, parent, projection, **kwargs):
+        super().__init__(parent, fg_color=BG_CARD, **kwargs)
+        self.projection = projection
+        self.canvas = ctk.CTkCanvas(self, bg=BG_CARD, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda _: self._draw())
+
+    def set_projection(self, projection):
+        self.projection = projection
+        self._draw()
+
+    def _draw(self):
+        c = self.canvas
+        width, height = c.winfo_width(), c.winfo_height()
+        c.delete("all")
+        if width < 100 or height < 60:
+            return
+        bands, median, (lo, hi) = fan_coordinates(self.projection, width, height)
+        for ring, color in zip(bands, self.BAND_COLORS):
+            c.create_polygon(ring, fill=color, outline="")
+        c.create_line(median, fill=ACCENT, width=2)
+
+        # Axes: start / end weights on the left, week ticks along the bottom
+        left, bottom = median[0], height - 28
+        c.create_line(left, 12, left, bottom, fill="#334155")
+        c.create_line(left, bottom, width - 12, bottom, fill="#334155")
+        for kg in (lo, hi):
+            y = 12 + (hi - kg) / (hi - lo) * (bottom - 12)
+            c.create_text(left - 6, y, text=f"{kg:.0f}", anchor="e", fill=TEXT_DIM,
+                          font=("Helvetica", 10))
+        last = int(self.projection.weeks[-1])
+        for week in (0, last // 2, last):
+            x = left + week / last * (width - 12 - left)
+            c.create_text(x, bottom + 6, text=f"wk {week}", anchor="n", fill=TEXT_DIM,
+                          font=("Helvetica", 10))
+
+
+class WeeklyVolumeChart(ctk.CTkFrame):
+    """Minutes per day of a weekly schedule as bars, labelled with the exercise and kcal."""
+
+    def __init__(self, parent, schedule, color=ACCENT, **kwargs):
+        super().__init__(parent, fg_color=BG_CARD, **kwargs)
+        self.schedule = schedule
+        self.color    = color
+        self.canvas = ctk.CTkCanvas(self, bg=BG_CARD, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda _: self._draw())
+
+    def _draw(self):
+        c = self.canvas
+        width, height = c.winfo_width(), c.winfo_height()
+        c.delete("all")
+        if width < 100 or height < 80:
+            return
+        top, bottom = 34, height - 24
+        longest = max(max(d['minutes'] for d in self.schedule), 1)
+        slot    = width / len(self.schedule)
+        for i, d in enumerate(self.schedule):
+            x = slot * (i + 0.5)
+            c.create_text(x, bottom + 6, text=d['day'], anchor="n", fill=TEXT_DIM,
+                          font=("Helvetica", 10))
+            if d['exercise'] is None:
+                c.create_text(x, bottom - 8, text="Rest", anchor="s", fill="#475569",
+                              font=("Helvetica", 10))
+                continue
+            y = bottom - d['minutes'] / longest * (bottom - top)
+            c.create_rectangle(x - slot * 0.3, y, x + slot * 0.3, bottom,
+                               fill=self.color, outline="")
+            c.create_text(x, y - 4, text=f"{d['minutes']} min · {d['kcal']} kcal",
+                          anchor="s", fill=TEXT_MAIN, font=("Helvetica", 9))
+            c.create_text(x, y - 18, text=d['exercise'], anchor="s", fill=TEXT_DIM,
+                          font=("Helvetica", 9), width=slot - 4)
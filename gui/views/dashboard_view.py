@@ -1,7 +1,8 @@
 import customtkinter as ctk
 from datetime import datetime
 from gui.styles import BG_MAIN, BG_CARD, ACCENT, TEXT_MAIN, TEXT_DIM
-from gui.components.charts import MockupBMIGauge, MockupDonutChart
+from gui.components.charts import MockupBMIGauge, MockupDonutChart, WeightFanChart
+from instrumentation import timed
 
 class DashboardView(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -11,6 +12,7 @@ class DashboardView(ctk.CTkFrame):
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+    @timed('on_show', view='DashboardView')
     def on_show(self):
         # Refresh logic, clear and rebuild to keep it strictly aligned with mock data
         for w in self.winfo_children():
@@ -112,13 +114,19 @@ class DashboardView(ctk.CTkFrame):
         pbar.pack(fill="x")
         pbar.set(0.0)
 
+        # --- WHAT IF ---
+        self._build_what_if(dashboard_frame, data, row=3)
+
+        # --- WEIGHT PROJECTION ---
+        self._build_projection(dashboard_frame, data, row=4)
+
         # --- MEAL PLAN CARDS ---
         meal_header = ctk.CTkFrame(dashboard_frame, fg_color="transparent")
-        meal_header.grid(row=3, column=0, columnspan=2, sticky="w", padx=10, pady=(20, 5))
+        meal_header.grid(row=5, column=0, columnspan=2, sticky="w", padx=10, pady=(20, 5))
         ctk.CTkLabel(meal_header, text="MEAL PLAN", font=ctk.CTkFont(size=12, weight="bold"), text_color=TEXT_MAIN).pack()
 
         meal_grid = ctk.CTkFrame(dashboard_frame, fg_color="transparent")
-        meal_grid.grid(row=4, column=0, columnspan=2, sticky="nsew", padx=5)
+        meal_grid.grid(row=6, column=0, columnspan=2, sticky="nsew", padx=5)
         meal_grid.grid_columnconfigure((0, 1, 2, 3), weight=1)
         
         menu_items = list(data['menu'].items())
@@ -150,3 +158,100 @@ class DashboardView(ctk.CTkFrame):
             ctk.CTkLabel(cbot, text=kcal, font=ctk.CTkFont(size=13, weight="bold"), text_color=TEXT_DIM).pack(side="left", pady=(0, 5))
             act_btn = ctk.CTkButton(cbot, text="📋", width=30, height=30, fg_color=ACCENT, hover_color="#0891b2", text_color="#000", corner_radius=8)
             act_btn.pack(side="right", pady=(0, 5))
+
+    PROJECTION_WEEKS = {"12 weeks": 12, "26 weeks": 26, "52 weeks": 52}
+
+    def _build_projection(self, parent, data, row):
+        """Fan chart of the Monte-Carlo weight projection for the plan's target."""
+        card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
+        card.grid(row=row, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
+        head = ctk.CTkFrame(card, fg_color="transparent")
+        head.pack(fill="x", padx=24, pady=(18, 0))
+
+        ctk.CTkLabel(head, text="WEIGHT PROJECTION",
+                     font=ctk.CTkFont(size=11, weight="bold"),
+                     text_color=TEXT_DIM).pack(side="left")
+        horizon = ctk.CTkSegmentedButton(head, values=list(self.PROJECTION_WEEKS),
+                                         selected_color=ACCENT, selected_hover_color="#0891b2",
+                                         command=lambda v: self._on_projection(v))
+        horizon.pack(side="right")
+
+        self._projection_lbl = ctk.CTkLabel(card, text="", anchor="w",
+                                            font=ctk.CTkFont(size=13, weight="bold"),
+                                            text_color=TEXT_MAIN)
+        self._projection_lbl.pack(fill="x", padx=24, pady=(8, 0))
+
+        self._projection_profile = data['raw_info']
+        self._projection_target  = data['target_cals']
+        self._projection_burn    = data.get('exercise_kcal', 0.0)
+        self._fan_chart = WeightFanChart(card, self._project(26), height=220)
+        self._fan_chart.pack(fill="x", padx=20, pady=(4, 18))
+        horizon.set("26 weeks")
+        self._on_projection("26 weeks")
+
+    def _project(self, weeks):
+        return self.controller.projections.project(
+            self._projection_profile, self._projection_target, weeks, self._projection_burn)
+
+    def _on_projection(self, label):
+        projection = self._project(self.PROJECTION_WEEKS[label])
+        self._projection_lbl.configure(
+            text=f"Median {projection.summary()} at {projection.target:,} kcal/day")
+        self._fan_chart.set_projection(projection)
+
+    def _build_what_if(self, parent, data, row):
+        """Weight / exercise sliders over the profile's precomputed what-if grid."""
+        profile = data['raw_info']
+        self._what_if = self.controller.what_if.grid(profile)
+        grid = self._what_if
+
+        card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
+        card.grid(row=row, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
+        inner = ctk.CTkFrame(card, fg_color="transparent")
+        inner.pack(fill="x", padx=24, pady=18)
+        inner.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(inner, text="WHAT IF",
+                     font=ctk.CTkFont(size=11, weight="bold"),
+                     text_color=TEXT_DIM).grid(row=0, column=0, columnspan=3, sticky="w")
+
+        self._weight_lbl   = ctk.CTkLabel(inner, text="", width=170, anchor="w",
+                                          font=ctk.CTkFont(size=12), text_color=TEXT_MAIN)
+        self._exercise_lbl = ctk.CTkLabel(inner, text="", width=170, anchor="w",
+                                          font=ctk.CTkFont(size=12), text_color=TEXT_MAIN)
+        self._weight_lbl.grid(row=1, column=0, sticky="w", pady=(10, 0))
+        self._exercise_lbl.grid(row=2, column=0, sticky="w", pady=(6, 0))
+
+        # Each move snaps to the nearest precomputed cell; the sliders never score
+        self._weight_slider = ctk.CTkSlider(
+            inner, from_=float(grid.weights[0]), to=float(grid.weights[-1]),
+            number_of_steps=len(grid.weights) - 1, button_color=ACCENT,
+            command=lambda _: self._on_what_if())
+        self._exercise_slider = ctk.CTkSlider(
+            inner, from_=float(grid.exercise[0]), to=float(grid.exercise[-1]),
+            button_color=ACCENT, command=lambda _: self._on_what_if())
+        self._weight_slider.set(profile['weight_kg'])
+        self._exercise_slider.set(profile['weekly_exercise'])
+        self._weight_slider.grid(row=1, column=1, sticky="ew", padx=(10, 0), pady=(10, 0))
+        self._exercise_slider.grid(row=2, column=1, sticky="ew", padx=(10, 0), pady=(6, 0))
+
+        self._what_if_plan = ctk.CTkLabel(inner, text="", justify="left", anchor="w",
+                                          font=ctk.CTkFont(size=13, weight="bold"),
+                                          text_color=TEXT_MAIN)
+        self._what_if_body = ctk.CTkLabel(inner, text="", justify="left", anchor="w",
+                                          font=ctk.CTkFont(size=12), text_color=TEXT_DIM)
+        self._what_if_plan.grid(row=3, column=0, columnspan=2, sticky="w", pady=(12, 0))
+        self._what_if_body.grid(row=4, column=0, columnspan=2, sticky="w", pady=(4, 0))
+        self._on_what_if()
+
+    def _on_what_if(self):
+        plan = self._what_if.at(self._weight_slider.get(), self._exercise_slider.get())
+        macros = plan['macros']
+        self._weight_lbl.configure(text=f"Weight: {plan['weight_kg']:.1f} kg")
+        self._exercise_lbl.configure(text=f"Exercise: {plan['weekly_exercise']:.1f} h / week")
+        self._what_if_plan.configure(
+            text=f"Diet: {plan['diet_rec'].replace('_', ' ')}  {plan['diet_confidence']:.0%}"
+                 f"     Workout: {plan['workout_intensity']}  {plan['workout_confidence']:.0%}")
+        self._what_if_body.configure(
+            text=f"BMI {plan['bmi']:.1f}  ·  {plan['target_cals']:,} kcal  ·  "
+                 f"Protein {macros['Protein']} g, Fats {macros['Fats']} g, Carbs {macros['Carbs']} g")
@@ -1,13 +1,9 @@
 import customtkinter as ctk
 from gui.styles import BG_MAIN, BG_CARD, ACCENT, TEXT_MAIN, TEXT_DIM
 from health_app import DIET_INFO
-
-MEAL_SPLITS = [
-    ("Breakfast", 0.25),
-    ("Lunch",     0.35),
-    ("Dinner",    0.30),
-    ("Snack",     0.10),
-]
+from instrumentation import timed
+from meal_planner import MEAL_SPLITS
+from tree_shap import format_contributors
 
 MACRO_COLORS = {
     "Protein": "#38bdf8",
@@ -26,6 +22,7 @@ class DietView(ctk.CTkFrame):
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+    @timed('on_show', view='DietView')
     def on_show(self):
         for w in self.winfo_children():
             w.destroy()
@@ -46,7 +43,9 @@ class DietView(ctk.CTkFrame):
         ctk.CTkLabel(top, text="Diet Plan",
                      font=ctk.CTkFont(size=26, weight="bold"),
                      text_color=TEXT_MAIN).pack(side="left")
-        ctk.CTkLabel(top, text=f"Model confidence: {confidence:.0%}",
+        version = data.get('model_versions', {}).get('diet')
+        ctk.CTkLabel(top, text=f"Model confidence: {confidence:.0%}"
+                               + (f"  ·  model {version}" if version else ""),
                      font=ctk.CTkFont(size=12), text_color=TEXT_DIM).pack(side="right")
 
         # ── Scrollable body ───────────────────────────────────────────────────
@@ -55,11 +54,11 @@ class DietView(ctk.CTkFrame):
         scroll.grid_columnconfigure((0, 1), weight=1)
 
         # ── Section 1: Diet type header ───────────────────────────────────────
-        self._diet_header(scroll, info, color, row=0)
+        self._diet_header(scroll, info, color, data.get('diet_contributors'), row=0)
 
         # ── Section 2: Macro targets + Calorie split ─────────────────────────
         self._macro_card(scroll, macros, target, color, row=1, col=0)
-        self._calorie_split_card(scroll, target, row=1, col=1)
+        self._calorie_split_card(scroll, data.get('meal_plan'), target, row=1, col=1)
 
         # ── Section 3: Food guidelines ────────────────────────────────────────
         self._guidelines_card(scroll, info, color, row=2)
@@ -69,7 +68,7 @@ class DietView(ctk.CTkFrame):
 
     # ── Builders ──────────────────────────────────────────────────────────────
 
-    def _diet_header(self, parent, info, color, row):
+    def _diet_header(self, parent, info, color, contributors, row):
         card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
         card.grid(row=row, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
 
@@ -92,6 +91,13 @@ class DietView(ctk.CTkFrame):
                      text=f"Why this diet?  {info['rationale']}",
                      font=ctk.CTkFont(size=12), text_color="#7dd3fc",
                      wraplength=880, justify="left").pack(padx=16, pady=12)
+        if contributors:
+            # Features that moved the model most toward this diet (TreeSHAP)
+            ctk.CTkLabel(rationale_box,
+                         text=f"Your top factors:  {format_contributors(contributors)}",
+                         font=ctk.CTkFont(size=12), text_color=TEXT_DIM,
+                         wraplength=880, justify="left").pack(anchor="w", padx=16,
+                                                              pady=(0, 12))
 
     def _macro_card(self, parent, macros, target, color, row, col):
         card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
@@ -133,7 +139,7 @@ class DietView(ctk.CTkFrame):
                      font=ctk.CTkFont(size=13, weight="bold"),
                      text_color=TEXT_MAIN).pack(anchor="w")
 
-    def _calorie_split_card(self, parent, target, row, col):
+    def _calorie_split_card(self, parent, meal_plan, target, row, col):
         card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
         card.grid(row=row, column=col, sticky="nsew", padx=10, pady=10)
 
@@ -146,8 +152,10 @@ class DietView(ctk.CTkFrame):
 
         meal_colors = ["#06b6d4", "#38bdf8", "#0ea5e9", "#7dd3fc"]
 
-        for (meal_name, pct), bar_color in zip(MEAL_SPLITS, meal_colors):
-            kcal = int(target * pct)
+        for (meal_name, share), bar_color in zip(MEAL_SPLITS, meal_colors):
+            # Planned meals land near their share of the target, not exactly on it
+            kcal = meal_plan[meal_name]['kcal'] if meal_plan else int(target * share)
+            pct  = kcal / target if target > 0 else 0
 
             row_frame = ctk.CTkFrame(inner, fg_color="transparent")
             row_frame.pack(fill="x", pady=8)
@@ -164,10 +172,11 @@ class DietView(ctk.CTkFrame):
                                      progress_color=bar_color,
                                      fg_color="#334155", corner_radius=4)
             bar.pack(fill="x", pady=(4, 0))
-            bar.set(pct)
+            bar.set(min(pct, 1.0))
 
+        total = sum(m['kcal'] for m in meal_plan.values()) if meal_plan else target
         ctk.CTkFrame(inner, fg_color="#334155", height=1).pack(fill="x", pady=(16, 8))
-        ctk.CTkLabel(inner, text=f"Total: {target:,} kcal / day",
+        ctk.CTkLabel(inner, text=f"Total: {total:,} of {target:,} kcal / day",
                      font=ctk.CTkFont(size=13, weight="bold"),
                      text_color=TEXT_MAIN).pack(anchor="w")
 
@@ -1,13 +1,188 @@
+from tkinter import messagebox
+
 import customtkinter as ctk
-from gui.styles import BG_MAIN, TEXT_MAIN
+from gui.styles import BG_MAIN, BG_CARD, ACCENT, ACCENT_SUB, TEXT_MAIN, TEXT_DIM
+from job_queue import FINISHED, KINDS, JobQueue, JobRunner, dataset_is_generated, format_progress
+from instrumentation import timed
+
+STATUS_COLORS = {
+    "queued":    TEXT_DIM,
+    "running":   ACCENT,
+    "done":      "#22c55e",
+    "failed":    "#ef4444",
+    "cancelled": "#f59e0b",
+}
+
+# Button label -> (job kind, params)
+ACTIONS = [
+    ("Retrain diet model",         "train",     {"task": "diet"}),
+    ("Retrain workout model",      "train",     {"task": "workout"}),
+    ("Benchmark diet models",      "benchmark", {"task": "diet"}),
+    ("Benchmark workout models",   "benchmark", {"task": "workout"}),
+    ("Regenerate workout dataset", "dataset",   {}),
+]
+
+POLL_MS    = 500
+JOBS_SHOWN = 15
+
+
+def _summary(job):
+    """Short outcome text for a finished job."""
+    if job['status'] == 'failed':
+        return (job['error'] or 'failed').strip().splitlines()[-1]
+    result = job['result'] or {}
+    if job['reused_from']:
+        return f"{format_progress(job)} (inputs unchanged)"
+    if 'version' in result:
+        return f"model version {result['version']}"
+    if 'f1' in result:
+        best = max(result['f1'], key=result['f1'].get)
+        return f"best: {best} (F1 {result['f1'][best]:.3f}), run {result['run_id']}"
+    if result.get('artifacts'):
+        return ", ".join(result['artifacts'])
+    return job['status']
+
 
 class SettingsView(ctk.CTkFrame):
     def __init__(self, parent, controller):
         super().__init__(parent, fg_color=BG_MAIN, corner_radius=0)
         self.controller = controller
-        
-        lbl = ctk.CTkLabel(self, text="Settings / Profile View\n(Under Construction)", font=("Helvetica", 24, "bold"), text_color=TEXT_MAIN)
-        lbl.place(relx=0.5, rely=0.5, anchor="center")
-        
+        self.queue      = JobQueue()
+        self.runner     = None      # started on first show
+        self._rows      = {}        # job id -> widgets of its row
+        self._poll_id   = None
+
+        self.grid_rowconfigure(2, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        # ── Top bar ──────────────────────────────────────────────────────────
+        top = ctk.CTkFrame(self, fg_color="transparent", height=60)
+        top.grid(row=0, column=0, sticky="ew", padx=30, pady=(20, 10))
+        top.grid_propagate(False)
+
+        ctk.CTkLabel(top, text="Settings",
+                     font=ctk.CTkFont(size=26, weight="bold"),
+                     text_color=TEXT_MAIN).pack(side="left")
+
+        # ── Job actions ──────────────────────────────────────────────────────
+        actions = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=16)
+        actions.grid(row=1, column=0, sticky="ew", padx=30, pady=10)
+
+        ctk.CTkLabel(actions, text="BACKGROUND JOBS",
+                     font=ctk.CTkFont(size=11, weight="bold"),
+                     text_color=TEXT_DIM).pack(anchor="w", padx=24, pady=(20, 2))
+        ctk.CTkLabel(actions,
+                     text="Jobs run in a separate process, so the app stays responsive. "
+                          "A job whose inputs have not changed reuses its last result.",
+                     font=ctk.CTkFont(size=12), text_color=TEXT_DIM,
+                     wraplength=760, justify="left").pack(anchor="w", padx=24)
+
+        buttons = ctk.CTkFrame(actions, fg_color="transparent")
+        buttons.pack(fill="x", padx=20, pady=(12, 20))
+        for label, kind, params in ACTIONS:
+            ctk.CTkButton(buttons, text=label, height=36,
+                          fg_color="#334155", hover_color=ACCENT_SUB,
+                          font=ctk.CTkFont(size=13),
+                          command=lambda k=kind, p=params: self._submit(k, p)
+                          ).pack(side="left", padx=4)
+
+        # ── Job list ─────────────────────────────────────────────────────────
+        self.job_list = ctk.CTkScrollableFrame(self, fg_color="transparent")
+        self.job_list.grid(row=2, column=0, sticky="nsew", padx=20, pady=10)
+        self.job_list.grid_columnconfigure(0, weight=1)
+
+    @timed('on_show', view='SettingsView')
     def on_show(self):
-        pass
+        if self.runner is None:
+            self.runner = JobRunner(self.queue).start()
+        if self._poll_id is None:
+            self._poll()
+
+    def _submit(self, kind, params):
+        if kind == 'dataset':
+            # The CSV may hold appended member outcomes; replace them only on request
+            out = params.get('out', KINDS['dataset'][1]['out'])
+            if not dataset_is_generated(out):
+                if not messagebox.askyesno(
+                        "Regenerate workout dataset",
+                        f"{out} has rows the generator did not write, such as appended "
+                        f"member outcomes. Replace the whole file with synthetic rows?",
+                        icon="warning", parent=self):
+                    return
+                params = {**params, 'overwrite': True}
+        self.queue.submit(kind, **params)
+        if self.runner is not None:
+            self.runner.wake()
+        self._refresh()
+
+    def _cancel(self, job_id):
+        self.queue.cancel(job_id)
+        self._refresh()
+
+    def _poll(self):
+        self._refresh()
+        self._poll_id = self.after(POLL_MS, self._poll)
+
+    def _refresh(self):
+        jobs = self.queue.jobs(limit=JOBS_SHOWN)
+        ids  = {job['id'] for job in jobs}
+        for job_id in [j for j in self._rows if j not in ids]:
+            self._rows.pop(job_id)['card'].destroy()
+        for position, job in enumerate(jobs):
+            row = self._rows.get(job['id']) or self._make_row(job)
+            self._update_row(row, job, position)
+
+    def _make_row(self, job):
+        card = ctk.CTkFrame(self.job_list, fg_color=BG_CARD, corner_radius=12)
+        card.grid_columnconfigure(0, weight=1)
+
+        params = "  ".join(f"{k}={v}" for k, v in job['params'].items())
+        ctk.CTkLabel(card, text=f"#{job['id']}  {job['kind'].title()}   {params}",
+                     font=ctk.CTkFont(size=14, weight="bold"),
+                     text_color=TEXT_MAIN, anchor="w").grid(
+            row=0, column=0, sticky="w", padx=16, pady=(12, 2))
+
+        status = ctk.CTkLabel(card, text="", font=ctk.CTkFont(size=11, weight="bold"))
+        status.grid(row=0, column=1, sticky="e", padx=16, pady=(12, 2))
+
+        bar = ctk.CTkProgressBar(card, height=8, progress_color=ACCENT, fg_color="#334155")
+        bar.grid(row=1, column=0, columnspan=2, sticky="ew", padx=16, pady=4)
+
+        detail = ctk.CTkLabel(card, text="", font=ctk.CTkFont(size=12),
+                              text_color=TEXT_DIM, anchor="w")
+        detail.grid(row=2, column=0, columnspan=2, sticky="w", padx=16, pady=(0, 12))
+
+        cancel = ctk.CTkButton(card, text="Cancel", width=80, height=30,
+                               fg_color="transparent", border_width=1,
+                               border_color="#ef4444", text_color="#ef4444",
+                               hover_color="#334155",
+                               command=lambda j=job['id']: self._cancel(j))
+        cancel.grid(row=0, column=2, rowspan=3, padx=(0, 16))
+
+        row = {'card': card, 'status': status, 'bar': bar, 'detail': detail, 'cancel': cancel}
+        self._rows[job['id']] = row
+        return row
+
+    def _update_row(self, row, job, position):
+        row['card'].grid(row=position, column=0, sticky="ew", padx=10, pady=6)
+        status = job['status']
+        row['status'].configure(text=status.upper(),
+                                text_color=STATUS_COLORS.get(status, TEXT_DIM))
+        if job['total']:
+            row['bar'].set(job['done'] / job['total'])
+        else:
+            row['bar'].set(1.0 if status == 'done' else 0.0)
+        row['detail'].configure(text=_summary(job) if status in FINISHED else format_progress(job))
+        if status in FINISHED:
+            row['cancel'].grid_remove()
+        else:
+            row['cancel'].grid()
+
+    def destroy(self):
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        if self.runner is not None:
+            self.runner.stop()
+            self.runner = None
+        super().destroy()
@@ -1,6 +1,14 @@
+import threading
+
 import customtkinter as ctk
 from gui.styles import BG_MAIN, BG_CARD, ACCENT, TEXT_MAIN, TEXT_DIM
-from health_app import DietRecommenderAI, WorkoutRecommenderAI, calculate_macros, get_meal_plan
+from health_app import CLINICAL_DEFAULTS, calculate_macros, energy_targets
+from meal_planner import menu_entries
+from plan_table import PlanTable
+from workout_schedule import build_schedules
+from instrumentation import count, timed
+
+EXPLAIN_POLL_MS = 100   # how often the Tk thread checks for finished explanations
 
 
 class SetupView(ctk.CTkFrame):
@@ -151,13 +159,9 @@ class SetupView(ctk.CTkFrame):
 
     # ── Plan generation ───────────────────────────────────────────────────────
 
-    _CLINICAL_DEFAULTS = {
-        'None':         {'cholesterol': 170.0, 'bp': 115, 'glucose': 85.0},
-        'Diabetes':     {'cholesterol': 190.0, 'bp': 125, 'glucose': 160.0},
-        'Hypertension': {'cholesterol': 205.0, 'bp': 150, 'glucose': 95.0},
-        'Obesity':      {'cholesterol': 215.0, 'bp': 135, 'glucose': 108.0},
-    }
+    _CLINICAL_DEFAULTS = CLINICAL_DEFAULTS
 
+    @timed('generate_plan')
     def generate_plan(self):
         self.error_lbl.configure(text="")
         try:
@@ -182,30 +186,116 @@ class SetupView(ctk.CTkFrame):
             user_info['disease'], self._CLINICAL_DEFAULTS['None']
         )
 
-        # 2. BMR / TDEE / target calories (Mifflin-St Jeor)
+        # 2. BMI
         w, h, a = user_info['weight_kg'], user_info['height_cm'], user_info['age']
         bmi = w / ((h / 100) ** 2)
 
-        if user_info['gender'] == "Male":
-            bmr = 88.362 + (13.397 * w) + (4.799 * h) - (5.677 * a)
+        # 3. AI predictions -- one multi-output forest when a joint model matching
+        # the current data was saved (joint_benchmark.py --save), else two forests.
+        # Each model answers from one snapshot and reports that snapshot's version.
+        models = self.controller.models
+        joint  = models.handle('joint').current
+        if joint is not None:
+            joint_inputs = dict(
+                age=user_info['age'],
+                weight=user_info['weight_kg'],
+                height=user_info['height_cm'],
+                disease=user_info['disease'],
+                gender=user_info['gender'],
+                activity_level=user_info['activity_level'],
+                goal=user_info['goal'],
+                severity=user_info['severity'],
+                cholesterol=clinical['cholesterol'],
+                blood_pressure=clinical['bp'],
+                glucose=clinical['glucose'],
+                weekly_exercise=user_info['weekly_exercise'],
+            )
+            (diet_rec, diet_conf), (workout_intensity, workout_conf) = \
+                joint.recommender.predict(**joint_inputs)
+            # Top features behind each displayed answer (TreeSHAP, tree_shap.py)
+            explain = lambda: joint.recommender.explain(
+                **joint_inputs, labels=(diet_rec, workout_intensity))
+            model_versions = {'diet': joint.version, 'workout': joint.version}
         else:
-            bmr = 447.593 + (9.247 * w) + (3.098 * h) - (4.330 * a)
-
-        activity_multipliers = {
-            "Sedentary": 1.2, "Lightly Active": 1.375,
-            "Moderately Active": 1.55, "Very Active": 1.725,
-            "Extra Active": 1.9,
-        }
-        tdee = bmr * activity_multipliers.get(user_info['activity_level'], 1.2)
-
-        target_calories = tdee
-        if user_info['goal'] == 'Lose Weight':   target_calories -= 500
-        elif user_info['goal'] == 'Gain Weight': target_calories += 500
+            (diet_rec, diet_conf, workout_intensity, workout_conf,
+             explain, model_versions) = \
+                self._predict_separately(models, user_info, clinical)
+        for task, version in model_versions.items():
+            count('predictions', task=task, version=version)
+
+        # 4. Weekly workout schedule (workout_schedule.py); its net burn beyond
+        # what the activity level allows raises TDEE and the calorie target
+        # (Mifflin-St Jeor, health_app.energy_targets)
+        schedule = build_schedules([workout_intensity], [w], [user_info['weekly_exercise']])
+        exercise_kcal = float(schedule.exercise_kcal[0])
+        energy = dict(weight=w, height=h, age=a, gender=user_info['gender'],
+                      activity_level=user_info['activity_level'], goal=user_info['goal'])
+        _, tdee, target_calories = energy_targets(**energy, exercise_kcal=exercise_kcal)
+        tdee_change     = float(tdee - energy_targets(**energy)[1])
         target_calories = int(target_calories)
 
-        # 3. AI predictions
-        diet_model = DietRecommenderAI('diet_recommendations_dataset.csv')
-        diet_rec, diet_conf = diet_model.predict_with_confidence(
+        # 5. Nutrition -- foods and portions per meal that hit the macro grams
+        # within the diet's sodium / carb limits (meal_planner.py)
+        macros     = calculate_macros(target_calories, diet_type=diet_rec)
+        meal_plan  = self.controller.meal_planner.plan(target_calories, diet_rec)
+        menu_items = menu_entries(meal_plan)
+
+        # 6. Store & transition
+        self.controller.user_data = {
+            "name":                 user_info['name'],
+            "bmi":                  bmi,
+            "target_cals":          target_calories,
+            "macros":               macros,
+            "menu":                 menu_items,
+            "meal_plan":            meal_plan,
+            "schedule":             schedule.day_plan(0),
+            "exercise_kcal":        exercise_kcal,
+            "tdee_change":          tdee_change,
+            "raw_info":             user_info,
+            "diet_rec":             diet_rec,
+            "diet_confidence":      diet_conf,
+            "workout_intensity":    workout_intensity,
+            "workout_confidence":   workout_conf,
+            "model_versions":       model_versions,
+            "diet_contributors":    None,   # filled in by _explain_later
+            "workout_contributors": None,
+        }
+        self.controller.finish_setup()
+        self._explain_later(self.controller.user_data, explain)
+
+    def _explain_later(self, user_data, explain):
+        """Fills in the contributors from `explain()` on a worker thread.
+
+        Building a TreeExplainer takes seconds when the model's warm-up
+        (LiveModels) has not finished, so it never runs on the Tk thread. The
+        Tk thread polls the worker and, once it is done, redraws the Diet or
+        Workout view if one is showing; the other reads the keys when shown.
+        """
+        def run():
+            user_data['diet_contributors'], user_data['workout_contributors'] = explain()
+        worker = threading.Thread(target=run, name='explain-plan', daemon=True)
+        worker.start()
+
+        controller = self.controller   # this view is destroyed by finish_setup
+
+        def poll():
+            if worker.is_alive():
+                controller.after(EXPLAIN_POLL_MS, poll)
+            elif controller.user_data is user_data and \
+                    controller.current_view in ('DietView', 'WorkoutView'):
+                controller.views[controller.current_view].on_show()
+        controller.after(EXPLAIN_POLL_MS, poll)
+
+    def _predict_separately(self, models, user_info, clinical):
+        """(diet_rec, diet_conf, workout_intensity, workout_conf, explain, versions)
+        from the two forests; `explain()` returns both answers' contributors."""
+        # Handles start from a saved artifact when it matches the dataset (else
+        # train from the CSV) and pick up retrained ones (Settings) as they land.
+        diet = models.handle('diet').current
+        # Compiled plan tables (plan_table.py) turn the forest traversal into an
+        # index lookup; off-table inputs fall back to the live model.
+        diet_table = PlanTable.load_if_present('diet', diet.recommender)
+        diet_inputs = dict(
             age=user_info['age'],
             weight=user_info['weight_kg'],
             height=user_info['height_cm'],
@@ -218,9 +308,25 @@ class SetupView(ctk.CTkFrame):
             glucose=clinical['glucose'],
             weekly_exercise=user_info['weekly_exercise'],
         )
+        if diet_table is not None:
+            diet_rec, diet_conf = diet_table.lookup(
+                age=user_info['age'],
+                weight=user_info['weight_kg'],
+                height=user_info['height_cm'],
+                disease=user_info['disease'],
+                gender=user_info['gender'],
+                activity_level=user_info['activity_level'],
+                severity=user_info['severity'],
+                weekly_exercise=user_info['weekly_exercise'],
+            )
+        else:
+            diet_rec, diet_conf = diet.recommender.predict_with_confidence(**diet_inputs)
 
-        workout_model = WorkoutRecommenderAI('workout_dataset.csv')
-        workout_intensity, workout_conf = workout_model.predict(
+        workout = models.handle('workout').current
+        workout_table = PlanTable.load_if_present('workout', workout.recommender)
+        predict_workout = (workout_table.lookup if workout_table is not None
+                           else workout.recommender.predict)
+        workout_inputs = dict(
             age=user_info['age'],
             weight=user_info['weight_kg'],
             height=user_info['height_cm'],
@@ -229,32 +335,12 @@ class SetupView(ctk.CTkFrame):
             activity_level=user_info['activity_level'],
             goal=user_info['goal'],
         )
-
-        # 4. Nutrition
-        macros   = calculate_macros(target_calories, diet_type=diet_rec)
-        raw_menu = get_meal_plan(diet_rec)
-        menu_items = {
-            "BREAKFAST": (raw_menu.get("Breakfast", "Healthy Meal"),
-                          f"{int(target_calories * 0.25):,} kcal"),
-            "LUNCH":     (raw_menu.get("Lunch", "Healthy Meal"),
-                          f"{int(target_calories * 0.35):,} kcal"),
-            "DINNER":    (raw_menu.get("Dinner", "Healthy Meal"),
-                          f"{int(target_calories * 0.30):,} kcal"),
-            "SNACK":     (raw_menu.get("Snack", "Healthy Snack"),
-                          f"{int(target_calories * 0.10):,} kcal"),
-        }
-
-        # 5. Store & transition
-        self.controller.user_data = {
-            "name":               user_info['name'],
-            "bmi":                bmi,
-            "target_cals":        target_calories,
-            "macros":             macros,
-            "menu":               menu_items,
-            "raw_info":           user_info,
-            "diet_rec":           diet_rec,
-            "diet_confidence":    diet_conf,
-            "workout_intensity":  workout_intensity,
-            "workout_confidence": workout_conf,
-        }
-        self.controller.finish_setup()
\ No newline at end of file
+        workout_intensity, workout_conf = predict_workout(**workout_inputs)
+
+        # Top features behind each displayed answer (TreeSHAP, tree_shap.py),
+        # from the same snapshots that answered
+        explain = lambda: (diet.recommender.explain(**diet_inputs, label=diet_rec),
+                           workout.recommender.explain(**workout_inputs,
+                                                       label=workout_intensity))
+        versions = {'diet': diet.version, 'workout': workout.version}
+        return (diet_rec, diet_conf, workout_intensity, workout_conf, explain, versions)
@@ -1,6 +1,9 @@
 import customtkinter as ctk
 from gui.styles import BG_MAIN, BG_CARD, ACCENT, TEXT_MAIN, TEXT_DIM
+from gui.components.charts import WeeklyVolumeChart
 from health_app import WORKOUT_PLANS
+from instrumentation import timed
+from tree_shap import format_contributors
 
 INTENSITY_COLORS = {
     "Light":    "#22c55e",
@@ -17,6 +20,7 @@ class WorkoutView(ctk.CTkFrame):
         self.grid_rowconfigure(1, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+    @timed('on_show', view='WorkoutView')
     def on_show(self):
         for w in self.winfo_children():
             w.destroy()
@@ -36,9 +40,11 @@ class WorkoutView(ctk.CTkFrame):
                      font=ctk.CTkFont(size=26, weight="bold"),
                      text_color=TEXT_MAIN).pack(side="left")
 
+        version  = data.get('model_versions', {}).get('workout')
         conf_lbl = ctk.CTkLabel(
             top,
-            text=f"Model confidence: {confidence:.0%}",
+            text=f"Model confidence: {confidence:.0%}"
+                 + (f"  ·  model {version}" if version else ""),
             font=ctk.CTkFont(size=12),
             text_color=TEXT_DIM,
         )
@@ -68,6 +74,14 @@ class WorkoutView(ctk.CTkFrame):
                      font=ctk.CTkFont(size=13),
                      text_color=TEXT_DIM).pack(anchor="w", pady=(6, 0))
 
+        # Features that moved the model most toward this intensity (TreeSHAP)
+        contributors = data.get('workout_contributors')
+        if contributors:
+            ctk.CTkLabel(inner,
+                         text=f"Your top factors:  {format_contributors(contributors)}",
+                         font=ctk.CTkFont(size=12), text_color=color,
+                         wraplength=880, justify="left").pack(anchor="w", pady=(6, 0))
+
         # ── Stats row ─────────────────────────────────────────────────────────
         stats_frame = ctk.CTkFrame(inner, fg_color="transparent")
         stats_frame.pack(fill="x", pady=(16, 0))
@@ -83,15 +97,20 @@ class WorkoutView(ctk.CTkFrame):
                          font=ctk.CTkFont(size=13, weight="bold"),
                          text_color=TEXT_MAIN).pack()
 
+        # ── Weekly schedule ───────────────────────────────────────────────────
+        schedule = data.get('schedule')
+        if schedule:
+            self._schedule_card(scroll, schedule, data.get('tdee_change', 0.0), color, row=1)
+
         # ── Exercise cards ────────────────────────────────────────────────────
         ctk.CTkLabel(scroll, text="EXERCISES",
                      font=ctk.CTkFont(size=12, weight="bold"),
                      text_color=TEXT_MAIN).grid(
-            row=1, column=0, columnspan=2, sticky="w", padx=20, pady=(20, 6))
+            row=2, column=0, columnspan=2, sticky="w", padx=20, pady=(20, 6))
 
         for i, (name, detail) in enumerate(plan['exercises']):
             col = i % 2
-            row = 2 + i // 2
+            row = 3 + i // 2
 
             card = ctk.CTkFrame(scroll, fg_color=BG_CARD, corner_radius=14)
             card.grid(row=row, column=col, sticky="nsew", padx=10, pady=8)
@@ -108,4 +127,29 @@ class WorkoutView(ctk.CTkFrame):
             ctk.CTkLabel(text_box, text=detail,
                          font=ctk.CTkFont(size=12),
                          text_color=TEXT_DIM, anchor="w",
-                         wraplength=260, justify="left").pack(anchor="w", pady=(4, 0))
\ No newline at end of file
+                         wraplength=260, justify="left").pack(anchor="w", pady=(4, 0))
+
+    def _schedule_card(self, parent, schedule, tdee_change, color, row):
+        """The week's sessions as a volume chart, with totals and the TDEE change."""
+        card = ctk.CTkFrame(parent, fg_color=BG_CARD, corner_radius=16)
+        card.grid(row=row, column=0, columnspan=2, sticky="ew", padx=10, pady=10)
+
+        head = ctk.CTkFrame(card, fg_color="transparent")
+        head.pack(fill="x", padx=24, pady=(18, 0))
+        ctk.CTkLabel(head, text="THIS WEEK",
+                     font=ctk.CTkFont(size=11, weight="bold"),
+                     text_color=TEXT_DIM).pack(side="left")
+
+        sessions = sum(d['exercise'] is not None for d in schedule)
+        minutes  = sum(d['minutes'] for d in schedule)
+        kcal     = sum(d['kcal'] for d in schedule)
+        # The plan's burn beyond the activity level's allowance, already in
+        # the calorie target
+        ctk.CTkLabel(head,
+                     text=f"{sessions} sessions  ·  {minutes} min  ·  {kcal:,} kcal"
+                          f"  ·  TDEE {tdee_change:+.0f} kcal/day",
+                     font=ctk.CTkFont(size=12, weight="bold"),
+                     text_color=TEXT_MAIN).pack(side="right")
+
+        WeeklyVolumeChart(card, schedule, color=color, height=200).pack(
+            fill="x", padx=20, pady=(8, 18))
@@ -1,42 +1,242 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import KFold, cross_val_predict
 from sklearn.preprocessing import LabelEncoder
+import hashlib
+import joblib
 import os
-
-# The AI Model
-class DietRecommenderAI:
-    _FEATURE_COLS     = ['Age', 'Gender', 'Weight_kg', 'Height_cm', 'BMI',
-                         'Disease_Type', 'Severity', 'Physical_Activity_Level',
-                         'Cholesterol_mg/dL', 'Blood_Pressure_mmHg',
-                         'Glucose_mg/dL', 'Weekly_Exercise_Hours']
-    _CATEGORICAL_COLS = ['Gender', 'Disease_Type', 'Severity', 'Physical_Activity_Level']
-
-    def __init__(self, csv_file):
-        self.model    = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.encoders = {}
-        if os.path.exists(csv_file):
-            self.train_model(csv_file)
+import threading
+
+from calibration import ConfidenceCalibrator
+from early_exit import EarlyExitForest
+from instrumentation import span, timed
+from rule_table import RuleTable
+from tree_shap import TreeExplainer
+
+_ENCODE_BLOCK     = 1 << 20   # rows encoded at a time; bounds transient copies
+CALIBRATION_FOLDS = 3         # out-of-fold calibration where OOB votes are unavailable
+TOP_CONTRIBUTORS  = 3         # features listed by `explain`
+EXPLAIN_CACHE     = 1024      # encoded rows whose attributions an explainer keeps
+_EXPLAINER_LOCK   = threading.Lock()   # one build at a time across threads
+
+
+def _as_labels(series):
+    """Categorical column as strings; blank Disease_Type (healthy rows) -> 'None'."""
+    values = series.fillna('None') if series.hasnans else series
+    return values if values.dtype == object else values.astype(str)
+
+
+def _model_version(file_path, model, n_bytes=None):
+    """Short content hash of the training data and model params.
+
+    Two models trained on the same bytes with the same hyper-parameters share a
+    version, which is what the prediction cache keys on. `n_bytes` limits the
+    hash to the prefix a model was actually trained on.
+    """
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        if n_bytes is None:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
         else:
-            print(f"Error: {csv_file} not found.")
+            h.update(f.read(n_bytes))
+    h.update(repr(sorted(model.get_params().items())).encode())
+    return h.hexdigest()[:12]
+
+
+class _ForestRecommender:
+    """Shared training / encoding / scoring helpers for the two recommenders.
+
+    Subclasses set `_FEATURE_COLS`, `_CATEGORICAL_COLS`, `_TARGET_COL` and
+    create `self.model`, `self.encoders` and `self.version`. A multi-output
+    subclass lists its targets in `_TARGET_COLS`; `_TARGET_COL` then only names
+    the model (cache namespace, spans). `self.cache` is an
+    optional `PredictionCache`; `self.calibrator`, when set, maps the forest's
+    raw confidence to a calibrated one. `self.rules`, when set, is a
+    `RuleTable` consulted before the forest (see `_fast_path`), and
+    `self.early_exit` an `EarlyExitForest` that scores single rows in place of
+    `predict_proba`. `explainer()` builds a `TreeExplainer` for the current
+    version on first use (`warm_explainers()` does it ahead of time, off the
+    UI thread); it is not saved with the model.
+    """
+    _FEATURE_COLS     = []
+    _CATEGORICAL_COLS = []
+    _TARGET_COL       = None
+    _TARGET_COLS      = None
+
+    @property
+    def _targets(self):
+        return self._TARGET_COLS or [self._TARGET_COL]
 
     def train_model(self, file_path):
-        df = pd.read_csv(file_path)
-        df['Disease_Type'] = df['Disease_Type'].fillna('None')
-
-        for col in self._CATEGORICAL_COLS:
-            le = LabelEncoder()
-            df[col] = le.fit_transform(df[col].astype(str))
-            self.encoders[col] = le
-
-        le_target = LabelEncoder()
-        df['Diet_Recommendation'] = le_target.fit_transform(
-            df['Diet_Recommendation'].astype(str))
-        self.encoders['Diet_Recommendation'] = le_target
-
-        X = df[self._FEATURE_COLS].values
-        y = df['Diet_Recommendation'].values
-        self.model.fit(X, y)
+        with span('train_model', task=self._TARGET_COL):
+            df   = pd.read_csv(file_path, usecols=self._FEATURE_COLS + self._targets)
+            X, y = self.encode_frame(df, fit=True)
+            del df
+            self.model.fit(X, y)
+            self._set_version(file_path)
+            self.fit_calibration(self._out_of_fold_proba(X, y), y)
+            self.fit_rules(X, y)
+            self.fit_early_exit(X)
+
+    def encode_frame(self, df, fit=False, out=None):
+        """Label-encodes a raw dataset frame into (X, y).
+
+        X is one C-contiguous float32 matrix -- the layout the forest trains on,
+        so sklearn does not copy it again -- written in place in row blocks, so
+        transient copies stay at block size. Pass `out` (e.g. a memmap slice) to
+        write into an existing array. With `fit=True` the encoders are
+        (re)fitted; otherwise the stored ones are applied and unseen categories
+        raise `ValueError`. y is int32, with one column per target when
+        `_TARGET_COLS` is set.
+        """
+        n      = len(df)
+        blocks = [(start, min(start + _ENCODE_BLOCK, n)) for start in range(0, n, _ENCODE_BLOCK)]
+        labels = self._CATEGORICAL_COLS + self._targets
+        if fit:
+            for col in labels:
+                seen = set()
+                for start, stop in blocks:
+                    seen.update(_as_labels(df[col].iloc[start:stop]).unique())
+                self.encoders[col] = LabelEncoder().fit(np.array(sorted(seen), dtype=object))
+
+        if out is None:
+            out = np.empty((n, len(self._FEATURE_COLS)), dtype=np.float32)
+        y = np.empty((n, len(self._TARGET_COLS)) if self._TARGET_COLS else n, dtype=np.int32)
+        y_cols = y.reshape(n, len(self._targets))   # view: one column per target
+        for start, stop in blocks:
+            for j, col in enumerate(self._FEATURE_COLS):
+                column = df[col].iloc[start:stop]
+                out[start:stop, j] = (self._encode_column(col, column)
+                                      if col in self._CATEGORICAL_COLS else column.to_numpy())
+            for j, col in enumerate(self._targets):
+                y_cols[start:stop, j] = self._encode_column(col, df[col].iloc[start:stop])
+        return out, y
+
+    def _encode_column(self, col, series):
+        """Integer codes of one categorical column (LabelEncoder semantics)."""
+        values = _as_labels(series)
+        # Hash lookup into the sorted classes_; same codes as LabelEncoder.transform
+        codes  = pd.Categorical(values, categories=self.encoders[col].classes_).codes
+        if (codes < 0).any():
+            unseen = sorted(set(values[codes < 0]))
+            raise ValueError(f'{col} contains previously unseen labels: {unseen}')
+        return codes
+
+    def _out_of_fold_proba(self, X, y):
+        """Calibration set for `train_model`: the fitted forest's OOB votes."""
+        return self.model.oob_decision_function_
+
+    def fit_calibration(self, proba, y):
+        """Fits the confidence map on out-of-fold `proba` (e.g. the forest's OOB votes)."""
+        self.calibrator = ConfidenceCalibrator().fit(proba, y, self.model.classes_)
+
+    def fit_rules(self, X, y):
+        """Mines the fast-path rule table from the fitted forest and its training data."""
+        self.rules = RuleTable.mine(self, X, y)
+
+    def fit_early_exit(self, X):
+        """Re-packs the fitted forest for early-exit scoring, trees ordered on `X`."""
+        self.early_exit = EarlyExitForest(self.model).fit_order(X)
+
+    def explainer(self, output=0):
+        """SHAP explainer of the forest (target `output`), rebuilt when the version changes."""
+        with _EXPLAINER_LOCK:
+            built = self.__dict__.get('_explainers')
+            if built is None or built[0] != self.version:
+                built = self._explainers = (self.version, {})
+            if output not in built[1]:
+                built[1][output] = TreeExplainer(self.model, output, cache_size=EXPLAIN_CACHE)
+            return built[1][output]
+
+    def warm_explainers(self):
+        """Builds the explainer of every target now (seconds on the full forests)."""
+        for output in range(len(self._targets)):
+            self.explainer(output)
+        return self
+
+    def _explain_row(self, features, top, output=0, label=None):
+        """[(column, raw value, SHAP value)] for `label` on one encoded row, largest
+        |SHAP value| first.
+
+        `label` is the answer shown to the user (e.g. from a rule or plan table);
+        without it, or when the forest never predicts it, the forest's own answer.
+        """
+        explainer = self.explainer(output)
+        phi   = explainer.shap_values(features)[0]                      # (features, classes)
+        label = self._class_index(output, label)
+        if label is None:
+            label = int((explainer.expected_value + phi.sum(axis=0)).argmax())
+        out   = []
+        for i in np.argsort(-np.abs(phi[:, label]), kind='stable')[:top]:
+            col, value = self._FEATURE_COLS[i], features[0][i]
+            if col in self._CATEGORICAL_COLS:
+                value = self.encoders[col].inverse_transform([int(value)])[0]
+            out.append((col, value, float(phi[i, label])))
+        return out
+
+    def _class_index(self, output, label):
+        """Column of `label` in the forest's class order for target `output`, or None."""
+        encoder = self.encoders[self._targets[output]]
+        if label is None or str(label) not in encoder.classes_:
+            return None
+        classes = self.model.classes_[output] if self._TARGET_COLS else self.model.classes_
+        match   = np.flatnonzero(classes == encoder.transform([str(label)])[0])
+        return int(match[0]) if len(match) else None
+
+    def _set_version(self, file_path, n_bytes=None):
+        self.version = _model_version(file_path, self.model, n_bytes)
+        if self.cache is not None:
+            self.cache.bind_version(self._TARGET_COL, self.version)
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def save(self, path):
+        """Writes the trained state (forest, encoders, version, ...) with joblib.
+
+        The file is written next to `path` and renamed over it, so a reader
+        (e.g. `ArtifactWatcher`) sees either the old artifact or the new one.
+        """
+        state = {k: v for k, v in self.__dict__.items() if k not in ('cache', '_explainers')}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.tmp{os.getpid()}'
+        joblib.dump(state, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, cache=None):
+        """Restores a recommender written by `save` without retraining."""
+        obj = cls.__new__(cls)
+        obj.__dict__.update(joblib.load(path))
+        obj.__dict__.setdefault('calibrator', None)   # artifacts saved before calibration
+        obj.__dict__.setdefault('rules', None)        # ... and before the rule fast path
+        obj.__dict__.setdefault('early_exit', None)   # ... and before early-exit scoring
+        obj.cache = None
+        obj._bind_cache(cache)
+        return obj
+
+    @classmethod
+    def load_if_current(cls, path, csv_file, cache=None):
+        """`load(path)` if that artifact was trained on the current contents of
+        `csv_file`; otherwise None.
+
+        The version is checked against the artifact's own hyper-parameters, so
+        a forest grown by `IncrementalTrainer` (more trees) still loads.
+        """
+        if not (os.path.exists(path) and os.path.exists(csv_file)):
+            return None
+        obj = cls.load(path)
+        if obj.version != _model_version(csv_file, obj.model):
+            return None
+        obj._bind_cache(cache)
+        return obj
+
+    def _bind_cache(self, cache):
+        self.cache = cache
+        if cache is not None and self.version is not None:
+            cache.bind_version(self._TARGET_COL, self.version)
 
     def _safe_encode(self, col: str, value: str) -> int:
         le    = self.encoders[col]
@@ -45,6 +245,77 @@ class DietRecommenderAI:
             return int(le.transform([value])[0])
         return int(le.transform([le.classes_[0]])[0])
 
+    def _fast_path(self, **values):
+        """Rule-table answer for the raw categorical `values`, or None (ask the forest)."""
+        return None if self.rules is None else self.rules.match(values)
+
+    def _score(self, features):
+        """Returns (label, confidence) for a single encoded feature row.
+
+        With a cache attached, the row is snapped to the cache's quantum grid
+        first so that a hit and a miss always return the same answer.
+        """
+        if self.cache is None:
+            return self._score_uncached(features)
+        key    = self.cache.make_key(self._TARGET_COL, self.version, features[0])
+        result = self.cache.get(key)
+        if result is None:
+            result = self._score_uncached(self.cache.dequantize(key))
+            self.cache.put(key, result)
+        return result
+
+    def _score_uncached(self, features):
+        if self.early_exit is not None:
+            # The tolerance bounds the calibrated confidence, the one users see
+            idx, conf, _ = self.early_exit.score(features[0], calibrator=self.calibrator)
+        else:
+            proba = self.model.predict_proba(features)[0]
+            idx   = int(proba.argmax())
+            conf  = float(proba[idx])
+            if self.calibrator is not None:
+                conf = self.calibrator(conf)
+        label = self.encoders[self._TARGET_COL].inverse_transform(
+            [self.model.classes_[idx]])[0]
+        return label, conf
+
+    def score_batch(self, X):
+        """(labels, calibrated confidences) for the encoded rows X, one `predict_proba` call."""
+        proba = self.model.predict_proba(X)
+        idx   = proba.argmax(axis=1)
+        conf  = proba[np.arange(len(idx)), idx]
+        if self.calibrator is not None:
+            conf = self.calibrator(conf)
+        return self.encoders[self._TARGET_COL].inverse_transform(self.model.classes_[idx]), conf
+
+
+# The AI Model
+class DietRecommenderAI(_ForestRecommender):
+    _FEATURE_COLS     = ['Age', 'Gender', 'Weight_kg', 'Height_cm', 'BMI',
+                         'Disease_Type', 'Severity', 'Physical_Activity_Level',
+                         'Cholesterol_mg/dL', 'Blood_Pressure_mmHg',
+                         'Glucose_mg/dL', 'Weekly_Exercise_Hours']
+    _CATEGORICAL_COLS = ['Gender', 'Disease_Type', 'Severity', 'Physical_Activity_Level']
+    _TARGET_COL       = 'Diet_Recommendation'
+
+    def __init__(self, csv_file=None, cache=None):
+        # oob_score: the out-of-bag votes are the calibration set, at no extra fit
+        self.model      = RandomForestClassifier(n_estimators=100, random_state=42,
+                                                 oob_score=True)
+        self.encoders   = {}
+        self.version    = None
+        self.calibrator = None
+        self.rules      = None
+        self.early_exit = None
+        self.cache      = None
+        if csv_file is None:
+            pass            # untrained; call train_model() or use load()
+        elif os.path.exists(csv_file):
+            self.train_model(csv_file)
+        else:
+            print(f"Error: {csv_file} not found.")
+        self._bind_cache(cache)
+
+    @timed('build_features', task='Diet_Recommendation')
     def _build_features(self, age, weight, height, disease, gender,
                         activity_level, severity, cholesterol,
                         blood_pressure, glucose, weekly_exercise):
@@ -60,29 +331,50 @@ class DietRecommenderAI:
             cholesterol, blood_pressure, glucose, weekly_exercise,
         ]]
 
+    def _rules_for(self, disease, gender, activity_level, severity):
+        return self._fast_path(Gender=gender, Disease_Type=disease, Severity=severity,
+                               Physical_Activity_Level=_ACTIVITY_MAP.get(activity_level,
+                                                                         'Moderate'))
+
+    @timed('predict', task='Diet_Recommendation')
     def predict(self, age, weight, height, disease,
                 gender='Female', activity_level='Moderate', severity='Mild',
                 cholesterol=180.0, blood_pressure=120, glucose=90.0,
                 weekly_exercise=3.0):
+        hit = self._rules_for(disease, gender, activity_level, severity)
+        if hit is not None:
+            return hit[0]
         features = self._build_features(age, weight, height, disease, gender,
                                         activity_level, severity, cholesterol,
                                         blood_pressure, glucose, weekly_exercise)
         pred = self.model.predict(features)[0]
         return self.encoders['Diet_Recommendation'].inverse_transform([pred])[0]
 
+    @timed('predict_with_confidence', task='Diet_Recommendation')
     def predict_with_confidence(self, age, weight, height, disease,
                                 gender='Female', activity_level='Moderate',
                                 severity='Mild', cholesterol=180.0,
                                 blood_pressure=120, glucose=90.0,
                                 weekly_exercise=3.0):
         """Returns (diet_type, confidence) where confidence is 0.0-1.0."""
-        features   = self._build_features(age, weight, height, disease, gender,
-                                          activity_level, severity, cholesterol,
-                                          blood_pressure, glucose, weekly_exercise)
-        pred       = self.model.predict(features)[0]
-        proba      = self.model.predict_proba(features)[0]
-        diet_type  = self.encoders['Diet_Recommendation'].inverse_transform([pred])[0]
-        return diet_type, float(proba.max())
+        hit = self._rules_for(disease, gender, activity_level, severity)
+        if hit is not None:
+            return hit
+        features = self._build_features(age, weight, height, disease, gender,
+                                        activity_level, severity, cholesterol,
+                                        blood_pressure, glucose, weekly_exercise)
+        return self._score(features)
+
+    def explain(self, age, weight, height, disease,
+                gender='Female', activity_level='Moderate', severity='Mild',
+                cholesterol=180.0, blood_pressure=120, glucose=90.0,
+                weekly_exercise=3.0, top=TOP_CONTRIBUTORS, label=None):
+        """The `top` (column, value, SHAP value) behind diet `label` for this user
+        (default: the forest's diet)."""
+        return self._explain_row(self._build_features(age, weight, height, disease, gender,
+                                                      activity_level, severity, cholesterol,
+                                                      blood_pressure, glucose, weekly_exercise),
+                                 top, label=label)
 
 
 # ── Diet Info ────────────────────────────────────────────────────────────────
@@ -160,6 +452,18 @@ DIET_INFO = {
 }
 
 
+# ── Clinical Defaults ────────────────────────────────────────────────────────
+
+# Disease-conditioned population averages used in place of clinical fields the
+# GUI does not collect (see PROJECT_DOCUMENTATION.md, section 3.1).
+CLINICAL_DEFAULTS = {
+    'None':         {'cholesterol': 170.0, 'bp': 115, 'glucose': 85.0},
+    'Diabetes':     {'cholesterol': 190.0, 'bp': 125, 'glucose': 160.0},
+    'Hypertension': {'cholesterol': 205.0, 'bp': 150, 'glucose': 95.0},
+    'Obesity':      {'cholesterol': 215.0, 'bp': 135, 'glucose': 108.0},
+}
+
+
 # ── Workout Recommender ───────────────────────────────────────────────────────
 
 # Maps GUI labels → dataset labels for activity and goal
@@ -176,12 +480,16 @@ _GOAL_MAP = {
     "Gain Weight":    "Gain Muscle",
 }
 
+# "minutes" and "days" are the duration / frequency ranges as numbers, for
+# the weekly schedules (workout_schedule.py)
 WORKOUT_PLANS = {
     "Light": {
         "label":       "Light Intensity",
         "description": "Safe, low-impact movement to build a healthy habit.",
         "duration":    "30-40 min / session",
         "frequency":   "4-5 days / week",
+        "minutes":     (30, 40),
+        "days":        (4, 5),
         "exercises": [
             ("Walking",        "Flat terrain, comfortable pace"),
             ("Gentle Yoga",    "Focus on flexibility and breathing"),
@@ -194,6 +502,8 @@ WORKOUT_PLANS = {
         "description": "Cardio and strength to improve fitness and burn calories.",
         "duration":    "40-55 min / session",
         "frequency":   "4-5 days / week",
+        "minutes":     (40, 55),
+        "days":        (4, 5),
         "exercises": [
             ("Brisk Walking / Jog", "Heart rate 50-70% of max"),
             ("Cycling",             "Steady pace, flat or light hills"),
@@ -206,6 +516,8 @@ WORKOUT_PLANS = {
         "description": "Max-effort training for performance and muscle building.",
         "duration":    "50-75 min / session",
         "frequency":   "5-6 days / week",
+        "minutes":     (50, 75),
+        "days":        (5, 6),
         "exercises": [
             ("HIIT Intervals",   "20s on / 10s off, 8 rounds"),
             ("Weight Training",  "Compound lifts - 4 sets x 8-12 reps"),
@@ -216,79 +528,241 @@ WORKOUT_PLANS = {
 }
 
 
-class WorkoutRecommenderAI:
+class WorkoutRecommenderAI(_ForestRecommender):
     _FEATURE_COLS     = ['Age', 'Gender', 'Weight_kg', 'Height_cm', 'BMI',
                          'Disease_Type', 'Physical_Activity_Level', 'Goal']
     _CATEGORICAL_COLS = ['Gender', 'Disease_Type', 'Physical_Activity_Level', 'Goal']
-
-    def __init__(self, csv_file):
-        self.model    = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.encoders = {}
-        if os.path.exists(csv_file):
+    _TARGET_COL       = 'Workout_Intensity'
+
+    def __init__(self, csv_file=None, cache=None):
+        # oob_score: the out-of-bag votes are the calibration set, at no extra fit
+        self.model      = RandomForestClassifier(n_estimators=100, random_state=42,
+                                                 oob_score=True)
+        self.encoders   = {}
+        self.version    = None
+        self.calibrator = None
+        self.rules      = None
+        self.early_exit = None
+        self.cache      = None
+        if csv_file is None:
+            pass            # untrained; call train_model() or use load()
+        elif os.path.exists(csv_file):
             self.train_model(csv_file)
         else:
             print(f"Error: {csv_file} not found. Run dataset_generation.py first.")
+        self._bind_cache(cache)
 
-    def train_model(self, file_path):
-        df = pd.read_csv(file_path)
-        for col in self._CATEGORICAL_COLS:
-            le = LabelEncoder()
-            df[col] = le.fit_transform(df[col].fillna('None').astype(str))
-            self.encoders[col] = le
-        le_target = LabelEncoder()
-        df['Workout_Intensity'] = le_target.fit_transform(df['Workout_Intensity'].astype(str))
-        self.encoders['Workout_Intensity'] = le_target
-        X = df[self._FEATURE_COLS].values
-        y = df['Workout_Intensity'].values
-        self.model.fit(X, y)
+    @timed('build_features', task='Workout_Intensity')
+    def _build_features(self, age, weight, height, disease, gender,
+                        activity_level, goal):
+        bmi         = weight / ((height / 100) ** 2)
+        activity    = _ACTIVITY_MAP.get(activity_level, 'Moderate')
+        mapped_goal = _GOAL_MAP.get(goal, 'Maintain')
+        return [[
+            age,
+            self._safe_encode('Gender', gender),
+            weight, height, bmi,
+            self._safe_encode('Disease_Type', disease),
+            self._safe_encode('Physical_Activity_Level', activity),
+            self._safe_encode('Goal', mapped_goal),
+        ]]
 
-    def _safe_encode(self, col: str, value: str) -> int:
-        le    = self.encoders[col]
-        value = str(value).strip()
-        if value in le.classes_:
-            return int(le.transform([value])[0])
-        return int(le.transform([le.classes_[0]])[0])
+    def _rules_for(self, disease, gender, activity_level, goal):
+        return self._fast_path(Gender=gender, Disease_Type=disease,
+                               Physical_Activity_Level=_ACTIVITY_MAP.get(activity_level, 'Moderate'),
+                               Goal=_GOAL_MAP.get(goal, 'Maintain'))
 
+    @timed('predict', task='Workout_Intensity')
     def predict(self, age, weight, height, disease,
                 gender='Female', activity_level='Moderately Active', goal='Maintain Weight'):
         """Returns (intensity_label, confidence) where confidence is 0.0-1.0."""
-        bmi         = weight / ((height / 100) ** 2)
-        activity    = _ACTIVITY_MAP.get(activity_level, 'Moderate')
-        mapped_goal = _GOAL_MAP.get(goal, 'Maintain')
-        features = [[
+        hit = self._rules_for(disease, gender, activity_level, goal)
+        if hit is not None:
+            return hit
+        features = self._build_features(age, weight, height, disease, gender,
+                                        activity_level, goal)
+        return self._score(features)
+
+    def explain(self, age, weight, height, disease,
+                gender='Female', activity_level='Moderately Active', goal='Maintain Weight',
+                top=TOP_CONTRIBUTORS, label=None):
+        """The `top` (column, value, SHAP value) behind intensity `label` for this user
+        (default: the forest's intensity)."""
+        return self._explain_row(self._build_features(age, weight, height, disease, gender,
+                                                      activity_level, goal), top, label=label)
+
+
+class JointRecommenderAI(_ForestRecommender):
+    """Diet recommendation and workout intensity from one multi-output forest.
+
+    Trained on the merged person-level dataset (`generate_joint_dataset`). Every
+    leaf stores both targets' class distributions, so one feature row, one
+    encoding pass and one traversal per tree answer both questions.
+    """
+    _FEATURE_COLS     = DietRecommenderAI._FEATURE_COLS + ['Goal']
+    _CATEGORICAL_COLS = DietRecommenderAI._CATEGORICAL_COLS + ['Goal']
+    _TARGET_COL       = 'Joint_Plan'
+    _TARGET_COLS      = ['Diet_Recommendation', 'Workout_Intensity']
+
+    def __init__(self, csv_file=None, cache=None):
+        self.model      = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.encoders   = {}
+        self.version    = None
+        self.calibrator = None
+        self.rules      = None
+        self.early_exit = None
+        self.cache      = None
+        if csv_file is None:
+            pass            # untrained; call train_model() or use load()
+        elif os.path.exists(csv_file):
+            self.train_model(csv_file)
+        else:
+            print(f"Error: {csv_file} not found. Run dataset_generation.py first.")
+        self._bind_cache(cache)
+
+    def _out_of_fold_proba(self, X, y):
+        # sklearn computes no OOB votes for multiclass-multioutput targets
+        cv = KFold(CALIBRATION_FOLDS, shuffle=True, random_state=42)
+        return cross_val_predict(clone(self.model), X, y, cv=cv, method='predict_proba')
+
+    def fit_calibration(self, proba, y):
+        """One confidence map per target; `proba` is a list as from `predict_proba`."""
+        self.calibrator = [ConfidenceCalibrator().fit(p, y[:, j], classes)
+                           for j, (p, classes) in enumerate(zip(proba, self.model.classes_))]
+
+    def fit_early_exit(self, X):
+        # Single-output only: stopping would need every target's label settled
+        self.early_exit = None
+
+    @timed('build_features', task='Joint_Plan')
+    def _build_features(self, age, weight, height, disease, gender, activity_level,
+                        goal, severity, cholesterol, blood_pressure, glucose,
+                        weekly_exercise):
+        bmi      = weight / ((height / 100) ** 2)
+        activity = _ACTIVITY_MAP.get(activity_level, 'Moderate')
+        return [[
             age,
             self._safe_encode('Gender', gender),
             weight, height, bmi,
             self._safe_encode('Disease_Type', disease),
+            self._safe_encode('Severity', severity),
             self._safe_encode('Physical_Activity_Level', activity),
-            self._safe_encode('Goal', mapped_goal),
+            cholesterol, blood_pressure, glucose, weekly_exercise,
+            self._safe_encode('Goal', _GOAL_MAP.get(goal, 'Maintain')),
         ]]
-        pred      = self.model.predict(features)[0]
-        proba     = self.model.predict_proba(features)[0]
-        intensity = self.encoders['Workout_Intensity'].inverse_transform([pred])[0]
-        return intensity, float(proba.max())
+
+    def _score_uncached(self, features):
+        results = []
+        for j, (proba, classes) in enumerate(zip(self.model.predict_proba(features),
+                                                 self.model.classes_)):
+            idx   = int(proba[0].argmax())
+            label = self.encoders[self._TARGET_COLS[j]].inverse_transform([classes[idx]])[0]
+            conf  = float(proba[0, idx])
+            results.append((label, conf if self.calibrator is None else self.calibrator[j](conf)))
+        return tuple(results)
+
+    def score_batch(self, X):
+        """((labels, confidences) per target) for the encoded rows X, one `predict_proba` call."""
+        results = []
+        for j, (proba, classes) in enumerate(zip(self.model.predict_proba(X),
+                                                 self.model.classes_)):
+            idx  = proba.argmax(axis=1)
+            conf = proba[np.arange(len(idx)), idx]
+            if self.calibrator is not None:
+                conf = self.calibrator[j](conf)
+            results.append((self.encoders[self._TARGET_COLS[j]].inverse_transform(classes[idx]),
+                            conf))
+        return tuple(results)
+
+    def _rules_for(self, disease, gender, activity_level, goal, severity):
+        return self._fast_path(Gender=gender, Disease_Type=disease, Severity=severity,
+                               Physical_Activity_Level=_ACTIVITY_MAP.get(activity_level, 'Moderate'),
+                               Goal=_GOAL_MAP.get(goal, 'Maintain'))
+
+    @timed('predict', task='Joint_Plan')
+    def predict(self, age, weight, height, disease,
+                gender='Female', activity_level='Moderately Active', goal='Maintain Weight',
+                severity='Mild', cholesterol=180.0, blood_pressure=120, glucose=90.0,
+                weekly_exercise=3.0):
+        """Returns ((diet_label, confidence), (intensity_label, confidence))."""
+        hit = self._rules_for(disease, gender, activity_level, goal, severity)
+        if hit is not None:
+            return hit
+        features = self._build_features(age, weight, height, disease, gender, activity_level,
+                                        goal, severity, cholesterol, blood_pressure,
+                                        glucose, weekly_exercise)
+        return self._score(features)
+
+    def explain(self, age, weight, height, disease,
+                gender='Female', activity_level='Moderately Active', goal='Maintain Weight',
+                severity='Mild', cholesterol=180.0, blood_pressure=120, glucose=90.0,
+                weekly_exercise=3.0, top=TOP_CONTRIBUTORS, labels=(None, None)):
+        """(diet contributors, intensity contributors), as `DietRecommenderAI.explain`;
+        `labels` are the displayed (diet, intensity)."""
+        features = self._build_features(age, weight, height, disease, gender, activity_level,
+                                        goal, severity, cholesterol, blood_pressure,
+                                        glucose, weekly_exercise)
+        return tuple(self._explain_row(features, top, output=j, label=label)
+                     for j, label in enumerate(labels))
+
+
+# ── Energy Targets ───────────────────────────────────────────────────────────
+
+ACTIVITY_MULTIPLIERS = {
+    "Sedentary": 1.2, "Lightly Active": 1.375,
+    "Moderately Active": 1.55, "Very Active": 1.725,
+    "Extra Active": 1.9,
+}
+GOAL_CALORIE_DELTA = {'Lose Weight': -500, 'Gain Weight': 500}
+
+
+def energy_targets(weight, height, age, gender, activity_level, goal, exercise_kcal=0.0):
+    """(BMR, TDEE, target kcal) per PROJECT_DOCUMENTATION.md section 5.
+
+    `exercise_kcal` is a workout schedule's net burn per day
+    (workout_schedule.py). The activity multiplier already allows
+    BMR x (multiplier - 1.2) for exercise above sedentary, so only the burn
+    beyond that allowance is added: TDEE = max(BMR x multiplier,
+    BMR x 1.2 + exercise_kcal).
+    `weight`, `height`, `age` and `exercise_kcal` may be arrays (they
+    broadcast); the target is truncated to whole kcal.
+    """
+    weight, height, age = (np.asarray(v, dtype=float) for v in (weight, height, age))
+    if gender == "Male":
+        bmr = 88.362 + 13.397 * weight + 4.799 * height - 5.677 * age
+    else:
+        bmr = 447.593 + 9.247 * weight + 3.098 * height - 4.330 * age
+    tdee   = np.maximum(bmr * ACTIVITY_MULTIPLIERS.get(activity_level, 1.2),
+                        bmr * ACTIVITY_MULTIPLIERS['Sedentary'] + exercise_kcal)
+    target = np.trunc(tdee + GOAL_CALORIE_DELTA.get(goal, 0)).astype(int)
+    return bmr, tdee, target
 
 
 # ── Macros Calculator ─────────────────────────────────────────────────────────
 
-# Macros Calculator
+# Ratio tuple per diet: (Protein %, Fat %, Carbs %)
+MACRO_RATIOS = {
+    'Low_Carb':   (0.30, 0.50, 0.20),
+    'Low_Sodium': (0.30, 0.30, 0.40),   # standard balanced split
+    'Balanced':   (0.30, 0.30, 0.40),
+}
+_KCAL_PER_GRAM = np.array([4.0, 9.0, 4.0])   # protein, fat, carbs
+
+
+def macro_grams(calories, diet_type):
+    """(..., 3) grams of protein, fat and carbs; `calories` and `diet_type` may be
+    arrays of matching shape (one diet per calorie target)."""
+    labels, inverse = np.unique(np.asarray(diet_type, dtype=object).astype(str),
+                                return_inverse=True)
+    ratios = np.array([MACRO_RATIOS.get(d, MACRO_RATIOS['Balanced']) for d in labels])
+    ratios = ratios[inverse.reshape(np.shape(diet_type))]
+    return np.floor(np.asarray(calories, dtype=float)[..., None] * ratios / _KCAL_PER_GRAM
+                    ).astype(int)
+
+
 def calculate_macros(calories, diet_type):
     # Returns grams of Protein, Fat, Carbs based on the specific diet.
-
-    if diet_type == 'Low_Carb':
-        # Ratio tuple: (Protein %, Fat %, Carbs %)
-        ratios = (0.30, 0.50, 0.20)
-    elif diet_type == 'Low_Sodium':
-        # Standard Balanced: 30% P, 30% F, 40% C
-        ratios = (0.30, 0.30, 0.40)
-    else: # Balanced
-        ratios = (0.30, 0.30, 0.40)
-        
-    # Calculate grams: Protein/Carbs = 4 kcal/g, Fat = 9 kcal/g
-    protein = int((calories * ratios[0]) / 4)
-    fat = int((calories * ratios[1]) / 9)
-    carbs = int((calories * ratios[2]) / 4)
-    
+    protein, fat, carbs = macro_grams(calories, diet_type).tolist()
     return {'Protein': protein, 'Fats': fat, 'Carbs': carbs}
 
 def get_meal_plan(diet_type):
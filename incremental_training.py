@@ -0,0 +1,344 @@
+"""Incremental (warm-start) retraining for datasets that only grow by appends.
+
+The trainer remembers how many bytes of the CSV the current forest has seen
+and a hash of that prefix. When the file has only grown, the appended rows are
+parsed on their own and the forest is grown with `warm_start`: new trees are
+fitted on the new rows plus a small replay sample of older rows. Rewritten
+files, unseen categories and the periodic rebuild schedule trigger a full
+refit instead.
+
+    python incremental_training.py update    workout
+    python incremental_training.py history   workout
+    python incremental_training.py benchmark workout [--batches 5 --batch-rows 200]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from health_app import DietRecommenderAI, WorkoutRecommenderAI
+
+ARTIFACT_DIR = 'models'
+
+TASKS = {
+    'diet':    (DietRecommenderAI,    'diet_recommendations_dataset.csv'),
+    'workout': (WorkoutRecommenderAI, 'workout_dataset.csv'),
+}
+
+
+def _prefix_sha1(path, n_bytes):
+    h         = hashlib.sha1()
+    remaining = n_bytes
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+
+def _fit_in_steps(model, X, y, progress, step=10):
+    """`model.fit(X, y)`, growing the forest `step` trees at a time so `progress`
+    can report trees done. The trees (and OOB votes) are identical to one fit."""
+    n_trees, oob = model.n_estimators, model.oob_score
+    model.set_params(warm_start=True, oob_score=False)
+    try:
+        for n in range(min(step, n_trees), n_trees + 1, step):
+            model.set_params(n_estimators=n).fit(X, y)
+            progress(n, n_trees, 'trees')
+        if model.n_estimators != n_trees:
+            model.set_params(n_estimators=n_trees).fit(X, y)
+            progress(n_trees, n_trees, 'trees')
+        if oob:   # no new trees: this call only computes the OOB votes
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                model.set_params(oob_score=True).fit(X, y)
+    finally:
+        model.set_params(warm_start=False, n_estimators=n_trees, oob_score=oob)
+
+
+class IncrementalTrainer:
+    """Keeps a persisted forest in sync with an append-only dataset.
+
+    The artifact (`<artifact_dir>/<task>.joblib`) carries the recommender plus a
+    `training_state` dict; every update is appended to `<task>_history.json`.
+    `progress(done, total, unit)`, if given, is called as a full rebuild reads
+    rows and fits trees.
+    """
+
+    def __init__(self, task, dataset=None, artifact_dir=ARTIFACT_DIR,
+                 full_rebuild_every=7, full_rebuild_days=30.0,
+                 trees_per_1k_rows=20, min_new_trees=5, replay_rows=2000, seed=42,
+                 progress=None):
+        self.recommender_cls, default_dataset = TASKS[task]
+        self.task               = task
+        self.dataset            = dataset or default_dataset
+        self.artifact_path      = os.path.join(artifact_dir, f'{task}.joblib')
+        self.history_path       = os.path.join(artifact_dir, f'{task}_history.json')
+        self.full_rebuild_every = full_rebuild_every
+        self.full_rebuild_days  = full_rebuild_days
+        self.trees_per_1k_rows  = trees_per_1k_rows
+        self.min_new_trees      = min_new_trees
+        self.replay_rows        = replay_rows
+        self.rng                = np.random.default_rng(seed)
+        self.progress           = progress
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def load(self, cache=None):
+        return self.recommender_cls.load(self.artifact_path, cache=cache)
+
+    def history(self):
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path) as f:
+            return json.load(f)
+
+    def update(self, force_full=False):
+        """Brings the artifact up to date with the dataset; returns the history entry."""
+        if force_full or not os.path.exists(self.artifact_path):
+            return self._full_rebuild('initial' if not force_full else 'forced')
+
+        recommender = self.load()
+        state       = recommender.training_state
+        size        = os.path.getsize(self.dataset)
+
+        if size == state['byte_offset']:
+            return {'kind': 'unchanged', 'version': recommender.version, 'rows': state['rows']}
+        if size < state['byte_offset'] or \
+                _prefix_sha1(self.dataset, state['byte_offset']) != state['prefix_sha1']:
+            return self._full_rebuild('dataset rewritten')
+        if state['updates_since_full'] + 1 >= self.full_rebuild_every:
+            return self._full_rebuild('scheduled (update count)')
+        if time.time() - state['full_trained_at'] >= self.full_rebuild_days * 86400:
+            return self._full_rebuild('scheduled (age)')
+
+        try:
+            return self._grow(recommender, size)
+        except ValueError as e:   # unseen category / class in the appended rows
+            return self._full_rebuild(f'incompatible append: {e}')
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _read_appended(self, offset, size):
+        with open(self.dataset, 'rb') as f:
+            header = f.readline()
+            f.seek(offset)
+            tail = f.read(size - offset)
+        return pd.read_csv(io.BytesIO(header + tail.lstrip(b'\r\n')))
+
+    def _replay_sample(self, X, y):
+        if len(X) <= self.replay_rows:
+            return X.copy(), y.copy()
+        idx = self.rng.choice(len(X), self.replay_rows, replace=False)
+        return X[idx], y[idx]
+
+    def _merge_replay(self, state, X_new, y_new):
+        """Reservoir-style replay buffer: keeps a uniform sample of all rows seen."""
+        X_old, y_old = state['replay_X'], state['replay_y']
+        n_seen       = state['rows']
+        X_all, y_all = np.vstack([X_old, X_new]), np.concatenate([y_old, y_new])
+        if len(X_all) <= self.replay_rows:
+            return X_all, y_all
+        # Weight old buffer rows by how many rows each stands for
+        w = np.concatenate([np.full(len(X_old), n_seen / len(X_old)), np.ones(len(X_new))])
+        idx = self.rng.choice(len(X_all), self.replay_rows, replace=False, p=w / w.sum())
+        return X_all[idx], y_all[idx]
+
+    def _read_prefix(self):
+        """The dataset's current bytes, up to the last complete row when a writer
+        is mid-append. Everything recorded about a rebuild comes from these."""
+        size = os.path.getsize(self.dataset)
+        with open(self.dataset, 'rb') as f:
+            data = f.read(size)
+        if not data.endswith(b'\n') and os.path.getsize(self.dataset) > size:
+            data = data[:data.rfind(b'\n') + 1]
+        return data
+
+    def _full_rebuild(self, reason):
+        recommender = self.recommender_cls()
+        data = self._read_prefix()
+        df   = pd.read_csv(io.BytesIO(data))
+        X, y = recommender.encode_frame(df, fit=True)
+        if self.progress:
+            self.progress(len(df), len(df), 'rows')
+        t0   = time.perf_counter()
+        if self.progress:
+            _fit_in_steps(recommender.model, X, y, self.progress)
+        else:
+            recommender.model.fit(X, y)
+        fit_seconds = time.perf_counter() - t0
+        recommender._set_version(self.dataset, len(data))
+        recommender.fit_calibration(recommender._out_of_fold_proba(X, y), y)
+        recommender.fit_rules(X, y)
+        recommender.fit_early_exit(X)
+
+        replay_X, replay_y = self._replay_sample(X, y)
+        recommender.training_state = {
+            'rows':               len(df),
+            'byte_offset':        len(data),
+            'prefix_sha1':        hashlib.sha1(data).hexdigest(),
+            'updates_since_full': 0,
+            'full_trained_at':    time.time(),
+            'last_full_seconds':  fit_seconds,
+            'last_full_rows':     len(df),
+            'replay_X':           replay_X,
+            'replay_y':           replay_y,
+        }
+        return self._commit(recommender, {
+            'kind': 'full', 'reason': reason, 'rows': len(df), 'new_rows': len(df),
+            'fit_seconds': fit_seconds, 'estimated_full_seconds': fit_seconds,
+        })
+
+    def _grow(self, recommender, size):
+        state      = recommender.training_state
+        new_df     = self._read_appended(state['byte_offset'], size)
+        X_new, y_new = recommender.encode_frame(new_df, fit=False)
+
+        n_classes = len(recommender.model.classes_)
+        X_fit = np.vstack([X_new, state['replay_X']])
+        y_fit = np.concatenate([y_new, state['replay_y']])
+        if len(np.unique(y_fit)) != n_classes:
+            raise ValueError('new trees would not see every class')
+
+        n_new = max(self.min_new_trees,
+                    int(round(self.trees_per_1k_rows * len(new_df) / 1000)))
+        model = recommender.model
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new)
+        t0 = time.perf_counter()
+        model.fit(X_fit, y_fit)
+        fit_seconds = time.perf_counter() - t0
+        model.set_params(warm_start=False)
+        recommender._set_version(self.dataset, size)
+        # The confidence map from the last full rebuild is kept: the OOB votes of a
+        # warm-started fit mix old trees with replay rows they were trained on.
+        # The rules and the early-exit trees are rebuilt: the new trees may have
+        # moved a region's answer.
+        recommender.fit_rules(X_fit, y_fit)
+        recommender.fit_early_exit(X_fit)
+
+        rows = state['rows'] + len(new_df)
+        replay_X, replay_y = self._merge_replay(state, X_new, y_new)
+        state.update({
+            'rows':               rows,
+            'byte_offset':        size,
+            'prefix_sha1':        _prefix_sha1(self.dataset, size),
+            'updates_since_full': state['updates_since_full'] + 1,
+            'replay_X':           replay_X,
+            'replay_y':           replay_y,
+        })
+        # Forest fit time is ~linear in rows for a fixed tree count
+        estimated_full = state['last_full_seconds'] * rows / state['last_full_rows']
+        return self._commit(recommender, {
+            'kind': 'incremental', 'reason': 'append', 'rows': rows,
+            'new_rows': len(new_df), 'trees_added': n_new,
+            'fit_seconds': fit_seconds, 'estimated_full_seconds': estimated_full,
+        })
+
+    def _commit(self, recommender, entry):
+        recommender.save(self.artifact_path)
+        entry.update({
+            'version':      recommender.version,
+            'n_estimators': recommender.model.n_estimators,
+            'trained_at':   time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'saved_seconds': entry['estimated_full_seconds'] - entry['fit_seconds'],
+        })
+        history = self.history() + [entry]
+        with open(self.history_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        return entry
+
+
+# ── Reporting ────────────────────────────────────────────────────────────────
+
+def print_history(history):
+    print(f"\n{'Trained at':<20} {'Kind':<12} {'Version':<13} {'Rows':>7} {'+Rows':>6}"
+          f" {'Trees':>6} {'Fit (s)':>8} {'Saved (s)':>10}")
+    for h in history:
+        print(f"{h['trained_at']:<20} {h['kind']:<12} {h['version']:<13} {h['rows']:>7}"
+              f" {h['new_rows']:>6} {h['n_estimators']:>6} {h['fit_seconds']:>8.3f}"
+              f" {h['saved_seconds']:>10.3f}")
+    total = sum(h['saved_seconds'] for h in history)
+    print(f"\n  Total fit time saved vs. full retraining: {total:.2f}s\n")
+
+
+def benchmark(task, batches=5, batch_rows=200, seed=0):
+    """Simulates daily appends and times incremental vs. full retraining.
+
+    Appended rows are resampled from the real dataset; a 20% holdout (never
+    appended) measures whether the grown forest keeps up with a full refit.
+    """
+    recommender_cls, dataset = TASKS[task]
+    rng  = np.random.default_rng(seed)
+    df   = pd.read_csv(dataset)
+    test = df.sample(frac=0.2, random_state=seed)
+    pool = df.drop(test.index)
+
+    workdir = tempfile.mkdtemp(prefix='fitai_inc_')
+    try:
+        path = os.path.join(workdir, os.path.basename(dataset))
+        pool.to_csv(path, index=False)
+        trainer = IncrementalTrainer(task, dataset=path, artifact_dir=workdir,
+                                     full_rebuild_every=batches + 1)
+        trainer.update()
+
+        print(f"\n{'Batch':>5} {'Rows':>7} {'Inc fit (s)':>12} {'Full fit (s)':>13}"
+              f" {'Speed-up':>9} {'Inc F1':>7} {'Full F1':>8}")
+        for b in range(1, batches + 1):
+            batch = pool.iloc[rng.integers(0, len(pool), batch_rows)]
+            batch.to_csv(path, mode='a', header=False, index=False)
+            entry = trainer.update()
+
+            inc   = trainer.load()
+            full  = recommender_cls()
+            X, y  = full.encode_frame(pd.read_csv(path), fit=True)
+            t0    = time.perf_counter()
+            full.model.fit(X, y)
+            full_s = time.perf_counter() - t0
+
+            X_te, y_te = inc.encode_frame(test)
+            inc_f1  = f1_score(y_te, inc.model.predict(X_te), average='weighted')
+            X_te, y_te = full.encode_frame(test)
+            full_f1 = f1_score(y_te, full.model.predict(X_te), average='weighted')
+            print(f"{b:>5} {entry['rows']:>7} {entry['fit_seconds']:>12.3f} {full_s:>13.3f}"
+                  f" {full_s / entry['fit_seconds']:>8.1f}x {inc_f1:>7.3f} {full_f1:>8.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=['update', 'history', 'benchmark'])
+    parser.add_argument('task', choices=sorted(TASKS))
+    parser.add_argument('--full', action='store_true', help='force a full rebuild')
+    parser.add_argument('--batches', type=int, default=5)
+    parser.add_argument('--batch-rows', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.task, args.batches, args.batch_rows)
+        return
+
+    trainer = IncrementalTrainer(args.task)
+    if args.command == 'update':
+        entry = trainer.update(force_full=args.full)
+        print(json.dumps(entry, indent=2))
+    else:
+        print_history(trainer.history())
+
+
+if __name__ == '__main__':
+    main()
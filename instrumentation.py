@@ -0,0 +1,243 @@
+"""Lightweight timing spans, counters and histograms for the hot paths.
+
+Disabled by default: `span()` then returns a shared no-op context manager and
+`timed()` wrappers cost one global lookup per call. Enable with `enable()` or
+by setting `FITAI_INSTRUMENT=1`; with `FITAI_INSTRUMENT_OUT=<dir>` all three
+exports are written to that directory at interpreter exit:
+
+    metrics.prom  -- Prometheus text exposition format
+    metrics.jsonl -- one JSON object per span / counter / histogram
+    trace.json    -- Chrome trace-event file (chrome://tracing, Perfetto)
+"""
+import atexit
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+MAX_EVENTS      = 100_000
+PREFIX          = 'fitai_'
+
+_enabled = os.environ.get('FITAI_INSTRUMENT') == '1'
+_lock    = threading.Lock()
+_t0      = time.perf_counter()
+
+
+class _Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts  = [0] * len(buckets)
+        self.total   = 0
+        self.sum     = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum   += value
+
+
+_counters   = {}                        # (name, labels) -> float
+_histograms = {}                        # (name, labels) -> _Histogram
+_events     = deque(maxlen=MAX_EVENTS)  # finished spans, oldest dropped first
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _events.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def count(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = _Histogram()
+        hist.observe(value)
+
+
+# ── Spans ────────────────────────────────────────────────────────────────────
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name   = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        end      = time.perf_counter()
+        duration = end - self.start
+        key      = _key(self.name, self.labels)
+        with _lock:
+            _counters[(self.name + '_total', key[1])] = \
+                _counters.get((self.name + '_total', key[1]), 0) + 1
+            hist = _histograms.get((self.name + '_seconds', key[1]))
+            if hist is None:
+                hist = _histograms[(self.name + '_seconds', key[1])] = _Histogram()
+            hist.observe(duration)
+            _events.append((self.name, self.labels, self.start - _t0, duration,
+                            threading.get_ident(), exc_type is not None))
+        return False
+
+
+def span(name, **labels):
+    """Context manager timing the enclosed block as `name` (no-op when disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, labels)
+
+
+def timed(name=None, **labels):
+    """Decorator form of `span`; defaults the span name to the function name."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(span_name, labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ── Exporters ────────────────────────────────────────────────────────────────
+
+def _metric_name(name):
+    return PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _label_value(v):
+    # Prometheus text format: backslash, double quote and newline are escaped
+    return str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _label_str(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_label_value(v)}"' for k, v in items) + '}'
+
+
+def _series_order(item):
+    # Label values may mix types (e.g. version=None next to a string)
+    name, labels = item[0]
+    return name, [(k, str(v)) for k, v in labels]
+
+
+def to_prometheus():
+    """Returns all counters and histograms in Prometheus text format."""
+    lines = []
+    with _lock:
+        counters   = sorted(_counters.items(), key=_series_order)
+        histograms = sorted(_histograms.items(), key=_series_order)
+        seen = set()
+        for (name, labels), value in counters:
+            metric = _metric_name(name)
+            if metric not in seen:
+                lines.append(f'# TYPE {metric} counter')
+                seen.add(metric)
+            lines.append(f'{metric}{_label_str(labels)} {value}')
+        for (name, labels), hist in histograms:
+            metric = _metric_name(name)
+            if metric not in seen:
+                lines.append(f'# TYPE {metric} histogram')
+                seen.add(metric)
+            for bound, n in zip(hist.buckets, hist.counts):
+                lines.append(f'{metric}_bucket{_label_str(labels, [("le", bound)])} {n}')
+            lines.append(f'{metric}_bucket{_label_str(labels, [("le", "+Inf")])} {hist.total}')
+            lines.append(f'{metric}_sum{_label_str(labels)} {hist.sum}')
+            lines.append(f'{metric}_count{_label_str(labels)} {hist.total}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_jsonl(path):
+    with _lock, open(path, 'w') as f:
+        for name, labels, start, duration, tid, failed in _events:
+            f.write(json.dumps({'type': 'span', 'name': name, 'labels': labels,
+                                'start_s': start, 'duration_s': duration,
+                                'thread': tid, 'error': failed}) + '\n')
+        for (name, labels), value in _counters.items():
+            f.write(json.dumps({'type': 'counter', 'name': name,
+                                'labels': dict(labels), 'value': value}) + '\n')
+        for (name, labels), hist in _histograms.items():
+            f.write(json.dumps({'type': 'histogram', 'name': name, 'labels': dict(labels),
+                                'buckets': list(hist.buckets), 'counts': hist.counts,
+                                'count': hist.total, 'sum': hist.sum}) + '\n')
+
+
+def write_chrome_trace(path):
+    """Writes spans as complete ('X') trace events, timestamps in microseconds."""
+    pid = os.getpid()
+    with _lock:
+        events = [{'name': name, 'cat': 'fitai', 'ph': 'X', 'pid': pid, 'tid': tid,
+                   'ts': start * 1e6, 'dur': duration * 1e6, 'args': labels}
+                  for name, labels, start, duration, tid, _ in _events]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def export_all(out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'metrics.prom'), 'w') as f:
+        f.write(to_prometheus())
+    write_jsonl(os.path.join(out_dir, 'metrics.jsonl'))
+    write_chrome_trace(os.path.join(out_dir, 'trace.json'))
+
+
+if _enabled and os.environ.get('FITAI_INSTRUMENT_OUT'):
+    atexit.register(export_all, os.environ['FITAI_INSTRUMENT_OUT'])
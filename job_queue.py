@@ -0,0 +1,546 @@
+"""Local job runner for training, benchmark and dataset-generation jobs.
+
+Jobs are rows in a SQLite queue (`jobs.sqlite`). A `JobRunner` claims queued
+rows from a dispatcher thread and runs them in a process pool, so the GUI
+that submits them never blocks. Job functions call `progress(done, total,
+unit)`. Each call is stored in the `events` table, along with an ETA
+extrapolated from the current stage's rate, and mirrored on the job row so
+pollers read one row.
+
+A job's input key hashes its kind, its parameters, its data files and the
+code that produces its output. Submitting a job whose key matches a finished
+job returns that job's result without running it again, as long as the
+finished job's artifacts are still on disk unchanged. An identical job that
+is still queued or running is returned as-is. Cancelling a queued job takes
+effect at once; a running job stops at its next progress report.
+
+    python job_queue.py submit train --task diet
+    python job_queue.py submit benchmark --task workout
+    python job_queue.py submit dataset --rows 5000 [--out PATH] [--overwrite]
+    python job_queue.py run [--forever]      # work the queue in the foreground
+    python job_queue.py status [ID]
+    python job_queue.py watch ID
+    python job_queue.py cancel ID
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from incremental_training import TASKS
+
+DB_PATH          = 'jobs.sqlite'
+GENERATED_SUFFIX = '.generated'   # sidecar: sha1 of what the dataset job last wrote
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind         TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    input_key    TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    cancel       INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    unit         TEXT,
+    done         REAL,
+    total        REAL,
+    eta_s        REAL,
+    result       TEXT,
+    error        TEXT,
+    reused_from  INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (input_key, status);
+CREATE TABLE IF NOT EXISTS events (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL REFERENCES jobs(id),
+    ts     REAL NOT NULL,
+    unit   TEXT,
+    done   REAL,
+    total  REAL,
+    eta_s  REAL
+);
+"""
+
+FINISHED = ('done', 'failed', 'cancelled')
+
+BENCHMARKS = {'diet': 'benchmark', 'workout': 'workout_benchmark'}
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation has been requested."""
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+# ── Job kinds ────────────────────────────────────────────────────────────────
+# Each job takes (params, progress) and returns a JSON-able dict whose
+# 'artifacts' lists the files it wrote. Those files are hashed for reuse.
+
+def _train(params, progress):
+    from incremental_training import IncrementalTrainer
+    trainer = IncrementalTrainer(params['task'], progress=progress)
+    entry   = trainer.update(force_full=params['full'])
+    return {'version': entry['version'], 'kind': entry['kind'],
+            'artifacts': [trainer.artifact_path]}
+
+
+def _benchmark(params, progress):
+    import bench_store
+    from sklearn.model_selection import train_test_split
+    bench = importlib.import_module(BENCHMARKS[params['task']])
+    X, y, class_names, _ = bench.load_and_preprocess(bench.DATASET)
+    split   = train_test_split(X, y, test_size=bench.TEST_SIZE,
+                               random_state=bench.RANDOM_STATE, stratify=y)
+    results = bench.evaluate_models(*split, progress=progress)
+    bench.save_results(results, class_names, bench.RESULTS_FILE)
+    run_id  = bench_store.record_run(bench.RESULTS_FILE)
+    bench.render_charts(bench.RESULTS_FILE, jobs=1)
+    charts  = [f'{stem}.png' for _, stem in bench.CHARTS.values()]
+    return {'run_id':    run_id,
+            'f1':        {name: res['f1'] for name, res in results.items()},
+            'artifacts': [bench.RESULTS_FILE] + charts}
+
+
+def dataset_is_generated(path):
+    """True when `path` is missing or still exactly what a dataset job wrote.
+
+    workout_dataset.csv also collects appended member outcomes
+    (incremental_training.py); a dataset job must not silently replace those.
+    """
+    if not os.path.exists(path):
+        return True
+    try:
+        with open(path + GENERATED_SUFFIX) as f:
+            return f.read().strip() == _file_sha1(path)
+    except FileNotFoundError:
+        return False
+
+
+def _dataset(params, progress):
+    from dataset_generation import generate_workout_dataset
+    out = params['out']
+    if not params['overwrite'] and not dataset_is_generated(out):
+        raise RuntimeError(f'{out} has rows a dataset job did not write (e.g. appended member'
+                           f' outcomes); resubmit with overwrite=True or another out path')
+    generate_workout_dataset(params['rows'], params['seed'], progress=progress, filename=out)
+    with open(out + GENERATED_SUFFIX, 'w') as f:
+        f.write(_file_sha1(out))
+    return {'artifacts': [out]}
+
+
+# kind -> (job function, default params, data files for the given params, source
+# files the output depends on). Data paths are relative to the working directory
+# like the scripts themselves; source paths to this checkout.
+KINDS = {
+    'train':     (_train,     {'task': 'diet', 'full': True},
+                  lambda p: [TASKS[p['task']][1]],
+                  ['health_app.py', 'calibration.py', 'incremental_training.py']),
+    'benchmark': (_benchmark, {'task': 'diet'},
+                  lambda p: [TASKS[p['task']][1]],
+                  ['benchmark.py', 'workout_benchmark.py', 'bench_pipelines.py',
+                   'bench_store.py', 'calibration.py', 'permutation_importance.py']),
+    'dataset':   (_dataset,   {'rows': 1000, 'seed': 99, 'out': 'workout_dataset.csv',
+                               'overwrite': False},
+                  lambda p: [p['out']],
+                  ['dataset_generation.py']),
+}
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _input_key(kind, params):
+    _, _, data_files, source_files = KINDS[kind]
+    h = hashlib.sha1(json.dumps([kind, params], sort_keys=True).encode())
+    for path in data_files(params) + [os.path.join(_SRC_DIR, f) for f in source_files]:
+        h.update(f'{path}:{_file_sha1(path) if os.path.exists(path) else "-"}'.encode())
+    return h.hexdigest()[:16]
+
+
+def _artifacts_intact(result):
+    return all(os.path.exists(path) and _file_sha1(path) == sha1
+               for path, sha1 in result['artifacts'].items())
+
+
+# ── Queue ────────────────────────────────────────────────────────────────────
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')   # GUI polls while workers write
+    conn.executescript(SCHEMA)
+    return conn
+
+
+@contextlib.contextmanager
+def _transaction(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+class JobQueue:
+    """Submit / status / cancel API over the SQLite queue; safe across threads."""
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        connect(db_path).close()
+
+    @contextlib.contextmanager
+    def _conn(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, kind, force=False, **params):
+        """Queues a job and returns its id (an existing id if one can be reused)."""
+        if kind not in KINDS:
+            raise ValueError(f'unknown job kind {kind!r}; expected one of {sorted(KINDS)}')
+        defaults = KINDS[kind][1]
+        unknown  = set(params) - set(defaults)
+        if unknown:
+            raise ValueError(f'unknown {kind} parameters: {sorted(unknown)}')
+        params = {**defaults, **params}
+        key    = _input_key(kind, params)
+        now    = time.time()
+
+        with self._conn() as conn, _transaction(conn):
+            active = conn.execute(
+                "SELECT id FROM jobs WHERE input_key = ? AND status IN ('queued', 'running')"
+                ' ORDER BY id DESC LIMIT 1', (key,)).fetchone()
+            if active:
+                return active['id']
+            if not force:
+                prev = conn.execute(
+                    "SELECT * FROM jobs WHERE input_key = ? AND status = 'done'"
+                    ' ORDER BY id DESC LIMIT 1', (key,)).fetchone()
+                if prev and _artifacts_intact(json.loads(prev['result'])):
+                    return conn.execute(
+                        'INSERT INTO jobs (kind, params, input_key, status, submitted_at,'
+                        ' started_at, finished_at, result, reused_from)'
+                        " VALUES (?, ?, ?, 'done', ?, ?, ?, ?, ?)",
+                        (kind, json.dumps(params), key, now, now, now, prev['result'],
+                         prev['reused_from'] or prev['id'])).lastrowid
+            return conn.execute(
+                'INSERT INTO jobs (kind, params, input_key, status, submitted_at)'
+                " VALUES (?, ?, ?, 'queued', ?)",
+                (kind, json.dumps(params), key, now)).lastrowid
+
+    def status(self, job_id):
+        with self._conn() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _as_dict(row) if row else None
+
+    def jobs(self, limit=20):
+        """Most recent jobs first."""
+        with self._conn() as conn:
+            rows = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,))
+            return [_as_dict(r) for r in rows]
+
+    def events(self, job_id, after=0):
+        """Progress events of a job with id > `after`, oldest first."""
+        with self._conn() as conn:
+            rows = conn.execute('SELECT * FROM events WHERE job_id = ? AND id > ? ORDER BY id',
+                                (job_id, after))
+            return [dict(r) for r in rows]
+
+    def cancel(self, job_id):
+        """Cancels a queued job, or flags a running one; False if it already finished."""
+        with self._conn() as conn, _transaction(conn):
+            cur = conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ?"
+                               " WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            if cur.rowcount:
+                return True
+            return conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = 'running'",
+                                (job_id,)).rowcount > 0
+
+    # ── Runner side ──────────────────────────────────────────────────────────
+
+    def claim(self):
+        """Marks the oldest queued job running and returns its id, or None."""
+        with self._conn() as conn, _transaction(conn):
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued'"
+                               ' ORDER BY id LIMIT 1').fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                         (time.time(), row['id']))
+            return row['id']
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._conn() as conn:
+            conn.execute('UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?,'
+                         ' eta_s = NULL WHERE id = ?',
+                         (status, time.time(), None if result is None else json.dumps(result),
+                          error, job_id))
+
+    def fail_interrupted(self):
+        """Fails jobs left 'running' by a runner that exited; call before starting one."""
+        with self._conn() as conn:
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?,"
+                         " error = 'interrupted: runner stopped' WHERE status = 'running'",
+                         (time.time(),))
+
+    def pending(self):
+        with self._conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                                ).fetchone()[0]
+
+
+def _as_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+def format_progress(job):
+    """One-line progress text for a job dict, e.g. '40/100 trees, ETA 12s'."""
+    if job['status'] == 'done' and job['reused_from']:
+        return f"reused job {job['reused_from']}"
+    if job['status'] != 'running':
+        return job['status']
+    if not job['total']:
+        return 'starting'
+    text = f"{job['done']:,.0f}/{job['total']:,.0f} {job['unit']}"
+    if job['eta_s'] is not None:
+        text += f", ETA {job['eta_s']:.0f}s"
+    return text
+
+
+# ── Worker side ──────────────────────────────────────────────────────────────
+
+class _Reporter:
+    """The `progress` callable handed to a job; writes events, checks for cancel.
+
+    The ETA extrapolates the current stage (unit) from its own start, which
+    is the previous stage's last report. Reports are throttled to one per
+    `min_interval` s; a stage's final report is always written.
+    """
+
+    def __init__(self, conn, job_id, min_interval=0.25):
+        self.conn         = conn
+        self.job_id       = job_id
+        self.min_interval = min_interval
+        self._unit        = None
+        self._stage_t0    = self._last = time.time()
+
+    def __call__(self, done, total, unit=''):
+        now = time.time()
+        if unit != self._unit:
+            self._unit, self._stage_t0 = unit, self._last
+        if done < total and now - self._last < self.min_interval:
+            return
+        self._last = now
+        eta = (now - self._stage_t0) / done * (total - done) if done else None
+        with _transaction(self.conn):
+            self.conn.execute('INSERT INTO events (job_id, ts, unit, done, total, eta_s)'
+                              ' VALUES (?, ?, ?, ?, ?, ?)', (self.job_id, now, unit, done,
+                                                             total, eta))
+            self.conn.execute('UPDATE jobs SET unit = ?, done = ?, total = ?, eta_s = ?'
+                              ' WHERE id = ?', (unit, done, total, eta, self.job_id))
+            cancel = self.conn.execute('SELECT cancel FROM jobs WHERE id = ?',
+                                       (self.job_id,)).fetchone()[0]
+        if cancel:
+            raise JobCancelled()
+
+
+def _execute(db_path, job_id):
+    """Runs one claimed job in a pool worker and records how it ended."""
+    queue = JobQueue(db_path)
+    job   = queue.status(job_id)
+    conn  = connect(db_path)
+    try:
+        result = KINDS[job['kind']][0](job['params'], _Reporter(conn, job_id))
+    except JobCancelled:
+        queue.finish(job_id, 'cancelled')
+    except Exception:
+        queue.finish(job_id, 'failed', error=traceback.format_exc())
+    else:
+        result['artifacts'] = {path: _file_sha1(path) for path in result['artifacts']}
+        queue.finish(job_id, 'done', result=result)
+    finally:
+        conn.close()
+
+
+class JobRunner:
+    """Feeds queued jobs to a process pool from a daemon dispatcher thread."""
+
+    def __init__(self, queue=None, workers=1, poll_interval=0.5):
+        self.queue         = queue or JobQueue()
+        self.workers       = workers
+        self.poll_interval = poll_interval
+        self._running      = {}   # job id -> Future
+        self._wake         = threading.Event()
+        self._done         = threading.Event()
+        self._pool         = None
+        self._thread       = None
+
+    def _new_pool(self):
+        # spawn: never fork a process that has Tk and threads running
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def start(self):
+        self.queue.fail_interrupted()
+        self._pool   = self._new_pool()
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        """Dispatch now instead of at the next poll (call after `submit`)."""
+        self._wake.set()
+
+    def _dispatch(self):
+        while not self._done.is_set():
+            while len(self._running) < self.workers:
+                job_id = self.queue.claim()
+                if job_id is None:
+                    break
+                future = self._pool.submit(_execute, self.queue.db_path, job_id)
+                self._running[job_id] = future
+                future.add_done_callback(lambda f, j=job_id: self._reap(j, f))
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _reap(self, job_id, future):
+        self._running.pop(job_id, None)
+        if not future.cancelled() and future.exception() is not None:
+            # The worker died before it could record the outcome itself
+            self.queue.finish(job_id, 'failed', error=repr(future.exception()))
+            if isinstance(future.exception(), BrokenProcessPool) and not self._done.is_set():
+                self._pool = self._new_pool()
+        self._wake.set()
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def stop(self):
+        """Stops dispatching and asks running jobs to cancel at their next report."""
+        self._done.set()
+        self._wake.set()
+        for job_id in list(self._running):
+            self.queue.cancel(job_id)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def _print_jobs(jobs):
+    print(f"{'Job':>4}  {'Kind':<10} {'Params':<28} {'Status':<10} {'Time (s)':>9}  Progress")
+    for job in jobs:
+        params  = ' '.join(f'{k}={v}' for k, v in job['params'].items())
+        elapsed = ((job['finished_at'] or time.time()) - job['started_at']
+                   if job['started_at'] else 0.0)
+        print(f"{job['id']:>4}  {job['kind']:<10} {params:<28} {job['status']:<10}"
+              f" {elapsed:>9.1f}  {format_progress(job)}")
+        if job['error']:
+            print('      ' + job['error'].strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--db', default=DB_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_submit = sub.add_parser('submit', help='queue a job (reuses an identical finished one)')
+    p_submit.add_argument('kind', choices=sorted(KINDS))
+    p_submit.add_argument('--task', choices=sorted(TASKS))
+    p_submit.add_argument('--rows', type=int, help='dataset jobs: rows to generate')
+    p_submit.add_argument('--seed', type=int, help='dataset jobs: RNG seed')
+    p_submit.add_argument('--out', help='dataset jobs: output CSV (default: workout_dataset.csv)')
+    p_submit.add_argument('--overwrite', action='store_true',
+                          help='dataset jobs: replace an output with rows the job did not write')
+    p_submit.add_argument('--incremental', action='store_true',
+                          help='train jobs: grow the saved forest instead of refitting')
+    p_submit.add_argument('--force', action='store_true', help='run even if reusable')
+
+    p_run = sub.add_parser('run', help='work the queue in this process')
+    p_run.add_argument('--workers', type=int, default=1)
+    p_run.add_argument('--forever', action='store_true', help='keep waiting for new jobs')
+
+    p_status = sub.add_parser('status', help='recent jobs, or one job')
+    p_status.add_argument('job', type=int, nargs='?')
+
+    p_watch = sub.add_parser('watch', help='stream a job\'s progress events until it ends')
+    p_watch.add_argument('job', type=int)
+
+    p_cancel = sub.add_parser('cancel', help='cancel a queued or running job')
+    p_cancel.add_argument('job', type=int)
+    args  = parser.parse_args()
+    queue = JobQueue(args.db)
+
+    if args.command == 'submit':
+        params = {k: v for k, v in (('task', args.task), ('rows', args.rows),
+                                    ('seed', args.seed), ('out', args.out)) if v is not None}
+        if args.kind == 'dataset':
+            params['overwrite'] = args.overwrite
+        if args.kind == 'train':
+            params['full'] = not args.incremental
+        try:
+            job_id = queue.submit(args.kind, force=args.force, **params)
+        except ValueError as e:
+            parser.error(str(e))
+        _print_jobs([queue.status(job_id)])
+
+    elif args.command == 'run':
+        runner = JobRunner(queue, workers=args.workers).start()
+        try:
+            while args.forever or queue.pending() or runner.busy:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            runner.stop()
+
+    elif args.command == 'status':
+        jobs = [queue.status(args.job)] if args.job else queue.jobs()
+        if None in jobs:
+            parser.error(f'no job {args.job}')
+        _print_jobs(jobs)
+
+    elif args.command == 'watch':
+        last = 0
+        while True:
+            for e in queue.events(args.job, last):
+                eta  = '' if e['eta_s'] is None else f"  ETA {e['eta_s']:.0f}s"
+                last = e['id']
+                print(f"  {time.strftime('%H:%M:%S', time.localtime(e['ts']))}"
+                      f"  {e['done']:,.0f}/{e['total']:,.0f} {e['unit']}{eta}")
+            job = queue.status(args.job)
+            if job is None or job['status'] in FINISHED:
+                break
+            time.sleep(0.5)
+        _print_jobs([job] if job else [])
+
+    else:
+        print('cancelled' if queue.cancel(args.job) else 'job is not queued or running')
+
+
+if __name__ == '__main__':
+    main()
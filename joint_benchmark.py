@@ -0,0 +1,144 @@
+"""Joint multi-output forest vs. the separate diet + workout forests.
+
+Both setups are trained on the same rows of `joint_dataset.csv` (generated
+from the diet dataset if missing) and scored on the same held-out split. The
+report covers weighted F1 per task, fit time, pickled size, single-request
+latency (p50/p99, uncached, feature building and scoring of both targets)
+and batch latency (encode + predict_proba of the whole split). `--save`
+trains the joint model on the full dataset, with calibration, and writes
+`models/joint.joblib`. `SetupView` uses that file while it matches the
+dataset.
+
+    python joint_benchmark.py [--requests 300] [--save]
+"""
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+
+from dataset_generation import generate_joint_dataset
+from health_app import DietRecommenderAI, JointRecommenderAI, WorkoutRecommenderAI
+from incremental_training import ARTIFACT_DIR
+
+DATASET      = 'joint_dataset.csv'
+ARTIFACT     = os.path.join(ARTIFACT_DIR, 'joint.joblib')
+TEST_SIZE    = 0.20
+RANDOM_STATE = 42
+
+# Dataset values -> the GUI-facing values the predict methods expect
+_ACTIVITY_UI = {'Sedentary': 'Sedentary', 'Moderate': 'Moderately Active',
+                'Active': 'Very Active'}
+_GOAL_UI     = {'Lose Weight': 'Lose Weight', 'Maintain': 'Maintain Weight',
+                'Gain Muscle': 'Gain Weight'}
+
+
+def _fit(recommender, train):
+    """Encodes and fits (no calibration); returns fit seconds."""
+    X, y = recommender.encode_frame(train, fit=True)
+    t0   = time.perf_counter()
+    recommender.model.fit(X, y)
+    return time.perf_counter() - t0
+
+
+def _requests(test):
+    return [dict(age=r['Age'], weight=r['Weight_kg'], height=r['Height_cm'],
+                 disease='None' if pd.isna(r['Disease_Type']) else r['Disease_Type'],
+                 gender=r['Gender'], activity_level=_ACTIVITY_UI[r['Physical_Activity_Level']],
+                 goal=_GOAL_UI[r['Goal']], severity=r['Severity'],
+                 cholesterol=r['Cholesterol_mg/dL'], blood_pressure=r['Blood_Pressure_mmHg'],
+                 glucose=r['Glucose_mg/dL'], weekly_exercise=r['Weekly_Exercise_Hours'])
+            for r in test.to_dict('records')]
+
+
+def _latency_ms(score, requests):
+    times = []
+    for req in requests:
+        t0 = time.perf_counter()
+        score(req)
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1e3
+    return np.percentile(times, 50), np.percentile(times, 99)
+
+
+def _batch_us(steps, n_rows, repeats=5):
+    best = np.inf
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for recommender, frame in steps:
+            recommender.model.predict_proba(recommender.encode_frame(frame)[0])
+        best = min(best, time.perf_counter() - t0)
+    return best / n_rows * 1e6
+
+
+def benchmark(n_requests=300):
+    df = pd.read_csv(DATASET)
+    train, test = train_test_split(df, test_size=TEST_SIZE, random_state=RANDOM_STATE,
+                                   stratify=df['Diet_Recommendation'])
+    diet, workout, joint = DietRecommenderAI(), WorkoutRecommenderAI(), JointRecommenderAI()
+    fit_s = {'two': _fit(diet, train) + _fit(workout, train), 'joint': _fit(joint, train)}
+
+    X_diet, y_diet       = diet.encode_frame(test)
+    X_workout, y_workout = workout.encode_frame(test)
+    X_joint, _           = joint.encode_frame(test)
+    pred_joint           = joint.model.predict(X_joint)
+    f1 = {
+        'two':   (f1_score(y_diet, diet.model.predict(X_diet), average='weighted'),
+                  f1_score(y_workout, workout.model.predict(X_workout), average='weighted')),
+        'joint': (f1_score(y_diet, pred_joint[:, 0], average='weighted'),
+                  f1_score(y_workout, pred_joint[:, 1], average='weighted')),
+    }
+
+    requests = _requests(test.iloc[:n_requests])
+    diet_keys = ('age', 'weight', 'height', 'disease', 'gender', 'activity_level', 'severity',
+                 'cholesterol', 'blood_pressure', 'glucose', 'weekly_exercise')
+    work_keys = ('age', 'weight', 'height', 'disease', 'gender', 'activity_level', 'goal')
+
+    def two_forests(req):
+        return (diet.predict_with_confidence(**{k: req[k] for k in diet_keys}),
+                workout.predict(**{k: req[k] for k in work_keys}))
+
+    agree = np.mean([[a[0] == b[0] for a, b in zip(two_forests(r), joint.predict(**r))]
+                     for r in requests], axis=0)
+    latency = {'two': _latency_ms(two_forests, requests),
+               'joint': _latency_ms(lambda r: joint.predict(**r), requests)}
+    batch = {'two':   _batch_us([(diet, test), (workout, test)], len(test)),
+             'joint': _batch_us([(joint, test)], len(test))}
+    size = {'two':   (len(pickle.dumps(diet.model)) + len(pickle.dumps(workout.model))) / 1024,
+            'joint': len(pickle.dumps(joint.model)) / 1024}
+
+    print(f"\nTrain rows: {len(train)} | test rows: {len(test)} | requests timed: {len(requests)}")
+    print(f"\n{'Setup':<14} {'Diet F1':>8} {'Workout F1':>11} {'Fit (s)':>8} {'Size (KB)':>10}"
+          f" {'p50 (ms)':>9} {'p99 (ms)':>9} {'Batch (us/row)':>15}")
+    for key, label in (('two', 'Two forests'), ('joint', 'Joint forest')):
+        print(f"{label:<14} {f1[key][0]:>8.3f} {f1[key][1]:>11.3f} {fit_s[key]:>8.2f}"
+              f" {size[key]:>10.0f} {latency[key][0]:>9.2f} {latency[key][1]:>9.2f}"
+              f" {batch[key]:>15.1f}")
+    print(f"\n  Joint vs. two-forest labels agree on {agree[0]:.1%} (diet) /"
+          f" {agree[1]:.1%} (workout) of requests;"
+          f" p50 speed-up {latency['two'][0] / latency['joint'][0]:.2f}x\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=300,
+                        help='single requests timed per setup (default: 300)')
+    parser.add_argument('--save', action='store_true',
+                        help=f'train on the full dataset and write {ARTIFACT}')
+    args = parser.parse_args()
+
+    if not os.path.exists(DATASET):
+        generate_joint_dataset(filename=DATASET)
+    benchmark(args.requests)
+    if args.save:
+        joint = JointRecommenderAI(DATASET)
+        joint.save(ARTIFACT)
+        print(f"  Joint model saved -> {ARTIFACT} (version {joint.version})")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,11 @@ from gui.views.diet_view import DietView
 from gui.views.workout_view import WorkoutView
 from gui.views.assistant_view import AssistantView
 from gui.views.settings_view import SettingsView
+from model_snapshot import LiveModels
+from prediction_cache import PredictionCache
+from meal_planner import MealPlanner
+from what_if import WhatIfEngine
+from weight_projection import WeightProjector
 
 class FitAIApp(ctk.CTk):
     def __init__(self):
@@ -40,6 +45,16 @@ class FitAIApp(ctk.CTk):
         
         # User data will be populated by SetupView
         self.user_data = None
+        self.current_view = None
+
+        # Live recommenders; retrained artifacts are swapped in without a restart.
+        # One prediction cache serves every model (namespaced by task and version).
+        self.models = LiveModels(cache=PredictionCache(maxsize=512, ttl=3600.0))
+        # Dashboard sliders read precomputed weight x exercise grids of the live models
+        self.what_if = WhatIfEngine(self.models)
+        self.projections = WeightProjector()
+        # Food database and per-diet candidate index for the meal plans
+        self.meal_planner = MealPlanner()
         
         # Center setup initially
         self.grid_rowconfigure(0, weight=1)
@@ -113,6 +128,7 @@ class FitAIApp(ctk.CTk):
     def show_view(self, view_name, tab_name):
         view = self.views[view_name]
         view.tkraise()
+        self.current_view = view_name
         
         ACCENT_SUB = "#0891b2"
         # Reset navigation button styles
@@ -126,6 +142,7 @@ class FitAIApp(ctk.CTk):
             view.on_show()
 
     def on_closing(self):
+        self.models.stop()
         self.quit()
         self.destroy()
 
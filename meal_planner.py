@@ -0,0 +1,230 @@
+"""Macro-targeted meal plans from a local food database.
+
+`food_database.csv` lists per-100 g protein, fat, carbs and sodium for each
+food, its category, the meals it suits, a portion range and the diets that
+allow it. The day's macro grams (`macro_grams`) are split across meals by
+MEAL_SPLITS. Each meal is then one food per slot of a template
+(e.g. protein + starch + veg + fat), with portions that hit that meal's grams.
+
+`CandidateIndex` precomputes, per diet and meal, every template combination
+of allowed foods. For each combination it stores the portion solve as an
+affine map. Portions minimise
+    ||A g - t||^2 + RIDGE * ||(g - g0) / s||^2,
+where A holds the foods' macros per gram, t the meal's grams, g0 the middle
+of each portion range and s its half-width. That gives g = offset + M t, so
+portions for every profile x candidate are one einsum. They are then clipped
+to the portion ranges and rounded to PORTION_STEP grams.
+
+Each candidate is scored on its relative macro error, sodium over the meal's
+share of the diet's daily limit, and (Low_Carb) carbs over target. Foods
+already used earlier in the day are excluded. The best candidate wins. All of
+it is vectorized over profiles.
+
+`python meal_planner.py` plans days for thousands of random profiles and
+reports throughput and how close the plans land.
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from health_app import energy_targets, macro_grams
+
+FOOD_DATABASE  = 'food_database.csv'
+MEAL_SPLITS    = (('Breakfast', 0.25), ('Lunch', 0.35), ('Dinner', 0.30), ('Snack', 0.10))
+MEAL_TEMPLATES = {
+    'Breakfast': [('protein', 'starch', 'fruit'), ('dairy', 'starch', 'fruit'),
+                  ('dairy', 'fruit', 'fat'), ('protein', 'veg', 'fat'),
+                  ('protein', 'fruit', 'fat')],
+    'Lunch':     [('protein', 'starch', 'veg', 'fat'), ('protein', 'veg', 'veg', 'fat'),
+                  ('protein', 'veg', 'dairy', 'fat')],
+    'Dinner':    [('protein', 'starch', 'veg', 'fat'), ('protein', 'veg', 'veg', 'fat'),
+                  ('protein', 'veg', 'dairy', 'fat')],
+    'Snack':     [('dairy', 'fruit'), ('fruit', 'fat'), ('dairy', 'fat'),
+                  ('protein', 'fruit'), ('veg', 'fat')],
+}
+DIETS            = ('Balanced', 'Low_Carb', 'Low_Sodium')
+SODIUM_LIMIT     = {'Low_Sodium': 1500}   # mg / day
+DEFAULT_SODIUM   = 2300
+RIDGE            = 0.05    # pull towards mid-range portions
+PORTION_STEP     = 5       # g
+SODIUM_WEIGHT    = 4.0     # per (relative excess)^2
+CARB_CAP_WEIGHT  = 4.0     # Low_Carb: carbs over target weigh this much more
+CHUNK_PROFILES   = 256     # bounds the (profiles, candidates, foods) arrays
+
+
+def load_foods(path=FOOD_DATABASE):
+    """The food table, with macros and sodium per gram."""
+    foods = pd.read_csv(path)
+    for col in ('protein_g', 'fat_g', 'carbs_g', 'sodium_mg'):
+        foods[col] = foods[col] / 100.0
+    foods['meals'] = foods['meals'].str.split('|').map(set)
+    foods['diets'] = foods['diets'].str.split('|').map(set)
+    return foods
+
+
+class CandidateIndex:
+    """Every template combination of allowed foods for one diet and meal."""
+
+    def __init__(self, foods, diet, meal):
+        allowed = foods[foods['meals'].map(lambda m: meal.lower() in m)
+                        & foods['diets'].map(lambda d: diet in d)]
+        by_category = allowed.groupby('category').groups
+        combos = set()
+        for template in MEAL_TEMPLATES[meal]:
+            pools = [by_category.get(c, []) for c in template]
+            for combo in itertools.product(*pools):
+                if len(set(combo)) == len(combo):
+                    combos.add(tuple(sorted(combo)))
+        k = len(MEAL_TEMPLATES[meal][0])
+        self.foods = np.array(sorted(combos), dtype=np.intp).reshape(-1, k)    # (C, k)
+
+        per_gram   = foods[['protein_g', 'fat_g', 'carbs_g']].to_numpy()
+        lo, hi     = foods['min_g'].to_numpy(float), foods['max_g'].to_numpy(float)
+        self.A      = per_gram[self.foods].transpose(0, 2, 1)            # (C, 3, k)
+        self.sodium = foods['sodium_mg'].to_numpy()[self.foods]           # (C, k)
+        self.lo, self.hi = lo[self.foods], hi[self.foods]
+        mid, half  = (self.lo + self.hi) / 2, (self.hi - self.lo) / 2
+        # Ridge solve, per candidate: (A'A + RIDGE S^-2)^-1 (A'(t - A g0)) + g0
+        gram        = self.A.transpose(0, 2, 1) @ self.A
+        penalty     = RIDGE * np.eye(self.foods.shape[1]) / half[:, :, None] ** 2
+        self.M      = np.linalg.solve(gram + penalty, self.A.transpose(0, 2, 1))  # (C, k, 3)
+        self.offset = mid - np.einsum('ckm,cmj,cj->ck', self.M, self.A, mid)
+        self.member = np.zeros((len(self.foods), len(foods)), dtype=np.float32)
+        np.put_along_axis(self.member, self.foods, 1.0, axis=1)
+
+    def __len__(self):
+        return len(self.foods)
+
+    def best(self, targets, sodium_budget, used, carb_cap=False):
+        """(candidate, grams, macros, sodium) of the best candidate per profile.
+
+        targets: (N, 3) meal grams; used: (N, foods) 1 where a food is taken.
+        """
+        grams = self.offset + np.einsum('ckm,nm->nck', self.M, targets)
+        grams = np.clip(np.round(grams / PORTION_STEP) * PORTION_STEP, self.lo, self.hi)
+        macros = np.einsum('cmk,nck->ncm', self.A, grams)                   # (N, C, 3)
+        sodium = (grams * self.sodium).sum(axis=2)                           # (N, C)
+
+        rel = (macros - targets[:, None, :]) / np.maximum(targets[:, None, :], 5.0)
+        if carb_cap:
+            rel[..., 2] *= np.where(rel[..., 2] > 0, CARB_CAP_WEIGHT, 0.5)
+        excess = np.maximum(sodium - sodium_budget, 0.0) / sodium_budget
+        score  = (rel ** 2).sum(axis=2) + SODIUM_WEIGHT * excess ** 2
+        score += 1e6 * (used @ self.member.T > 0)                            # no repeats in a day
+        pick   = score.argmin(axis=1)
+        rows   = np.arange(len(targets))
+        return pick, grams[rows, pick], macros[rows, pick], sodium[rows, pick]
+
+
+class MealPlanner:
+    """Plans a day of meals for macro targets; candidate indexes are built once."""
+
+    def __init__(self, path=FOOD_DATABASE):
+        self.foods = load_foods(path)
+        self.names = self.foods['food'].tolist()
+        self.index = {(diet, meal): CandidateIndex(self.foods, diet, meal)
+                      for diet in DIETS for meal, _ in MEAL_SPLITS}
+
+    def plan_batch(self, grams, diet):
+        """Meals for every row of `grams` ((N, 3) daily protein, fat, carbs) on one diet.
+
+        Returns {meal: (foods (N, k), portions (N, k), macros (N, 3), sodium (N,))}.
+        """
+        diet  = diet if diet in DIETS else 'Balanced'
+        grams = np.asarray(grams, dtype=float).reshape(-1, 3)
+        limit = SODIUM_LIMIT.get(diet, DEFAULT_SODIUM)
+        out   = {meal: [] for meal, _ in MEAL_SPLITS}
+        for start in range(0, len(grams), CHUNK_PROFILES):
+            day  = grams[start:start + CHUNK_PROFILES]
+            used = np.zeros((len(day), len(self.names)), dtype=np.float32)
+            for meal, share in MEAL_SPLITS:
+                index = self.index[diet, meal]
+                pick, portions, macros, sodium = index.best(
+                    day * share, limit * share, used, carb_cap=diet == 'Low_Carb')
+                used += index.member[pick]
+                out[meal].append((index.foods[pick], portions, macros, sodium))
+        return {meal: tuple(np.concatenate(parts) for parts in zip(*chunks))
+                for meal, chunks in out.items()}
+
+    def plan(self, calories, diet):
+        """One day for a calorie target: {meal: {'items', 'kcal', 'macros', 'sodium_mg'}}."""
+        day  = self.plan_batch(macro_grams(calories, diet)[None, :], diet)
+        plan = {}
+        for meal, (foods, portions, macros, sodium) in day.items():
+            protein, fat, carbs = macros[0].round().astype(int).tolist()
+            plan[meal] = {
+                'items':     [(self.names[f], int(g)) for f, g in zip(foods[0], portions[0])],
+                'kcal':      int(round(4 * protein + 9 * fat + 4 * carbs)),
+                'macros':    {'Protein': protein, 'Fats': fat, 'Carbs': carbs},
+                'sodium_mg': int(round(sodium[0])),
+            }
+        return plan
+
+
+def menu_entries(plan):
+    """SetupView's `menu`: {'BREAKFAST': ('Rolled oats 60 g\n...', '540 kcal'), ...}."""
+    return {meal.upper(): ('\n'.join(f'{food} {g} g' for food, g in m['items']),
+                           f"{m['kcal']:,} kcal")
+            for meal, m in plan.items()}
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def benchmark(n_profiles=5000, seed=0):
+    from what_if import _random_profile
+
+    t0 = time.perf_counter()
+    planner = MealPlanner()
+    build_s = time.perf_counter() - t0
+    sizes   = {diet: [len(planner.index[diet, meal]) for meal, _ in MEAL_SPLITS] for diet in DIETS}
+
+    rng      = np.random.default_rng(seed)
+    profiles = [_random_profile(rng) for _ in range(n_profiles)]
+    calories = np.array([energy_targets(p['weight_kg'], p['height_cm'], p['age'], p['gender'],
+                                        p['activity_level'], p['goal'])[2] for p in profiles])
+    diets    = rng.choice(DIETS, n_profiles)
+
+    print(f"\n=== Meal planner: {len(planner.names)} foods, {n_profiles:,} profiles ===")
+    print(f"\n  Candidate index built in {build_s * 1e3:.0f} ms")
+    for diet, n in sizes.items():
+        print(f"    {diet:<11} " + ', '.join(f'{meal} {c:,}' for (meal, _), c in zip(MEAL_SPLITS, n)))
+
+    print(f"\n  {'Diet':<11} {'Profiles':>8} {'Days/s':>8} {'Protein':>9} {'Fat':>7} {'Carbs':>7}"
+          f" {'kcal':>7} {'Sodium max':>11}")
+    for diet in DIETS:
+        mask   = diets == diet
+        target = macro_grams(calories[mask], diet).astype(float)
+        t0     = time.perf_counter()
+        day    = planner.plan_batch(target, diet)
+        seconds = time.perf_counter() - t0
+        got    = sum(m[2] for m in day.values())
+        sodium = sum(m[3] for m in day.values())
+        err    = np.median(np.abs(got - target) / target, axis=0)
+        kcal   = np.median(np.abs(got @ [4, 9, 4] - target @ [4, 9, 4]) / (target @ [4, 9, 4]))
+        print(f"  {diet:<11} {mask.sum():>8,} {mask.sum() / seconds:>8,.0f}"
+              f" {err[0]:>9.1%} {err[1]:>7.1%} {err[2]:>7.1%} {kcal:>7.1%}"
+              f" {sodium.max():>8,.0f} mg")
+    print("  (median relative error of the day's totals against the macro targets)")
+
+    single = []
+    for p, diet in zip(profiles[:200], diets[:200]):
+        t0 = time.perf_counter()
+        planner.plan(energy_targets(p['weight_kg'], p['height_cm'], p['age'], p['gender'],
+                                    p['activity_level'], p['goal'])[2], diet)
+        single.append(time.perf_counter() - t0)
+    print(f"\n  One day (plan()): p50 {np.percentile(single, 50) * 1e3:.2f} ms,"
+          f" p99 {np.percentile(single, 99) * 1e3:.2f} ms\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--profiles', type=int, default=5000)
+    args = parser.parse_args()
+    benchmark(args.profiles)
+
+
+if __name__ == '__main__':
+    main()
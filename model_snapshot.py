@@ -0,0 +1,321 @@
+"""Immutable model snapshots and zero-downtime hot swap.
+
+A `ModelSnapshot` freezes one trained recommender (forest, encoders,
+calibration, rules) together with its version and the artifact it came from.
+A published snapshot is never modified; a new model is always a new snapshot.
+
+A `ModelHandle` holds the live snapshot in a single attribute. A reader takes
+`handle.current` once per request and uses only that object, so a request can
+never mix two versions. Publishing is one reference assignment, which is
+atomic under the GIL, so the read path takes no lock. `handle.call()` returns
+the result together with the version that produced it and counts the
+prediction per version in `instrumentation`.
+
+`ArtifactWatcher` polls artifact files (mtime and size) from a daemon thread.
+When one changes, the watcher loads it off the hot path, builds its SHAP
+explainers there too, and publishes it.
+`save()` writes artifacts atomically, so a poll never sees a half-written
+file. `LiveModels` is the app's registry: one handle per task, fed by one
+watcher on `models/<task>.joblib`.
+
+`python model_snapshot.py` hammers a handle from reader threads while two
+artifacts are swapped in turn, then checks every response against the model
+of the version it reports.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from health_app import DietRecommenderAI, JointRecommenderAI, WorkoutRecommenderAI
+from incremental_training import ARTIFACT_DIR
+from instrumentation import count, observe
+
+WATCH_INTERVAL = 2.0   # seconds between artifact polls
+
+# task -> (recommender class, dataset, train from the dataset when no current artifact)
+LIVE_TASKS = {
+    'diet':    (DietRecommenderAI,    'diet_recommendations_dataset.csv', True),
+    'workout': (WorkoutRecommenderAI, 'workout_dataset.csv',              True),
+    'joint':   (JointRecommenderAI,   'joint_dataset.csv',                False),
+}
+
+
+class ModelSnapshot:
+    """One trained recommender, frozen together with its version and source."""
+    __slots__ = ('recommender', 'version', 'source', 'loaded_at')
+
+    def __init__(self, recommender, source=None):
+        for name, value in (('recommender', recommender), ('version', recommender.version),
+                            ('source', source), ('loaded_at', time.time())):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('ModelSnapshot is immutable; publish a new snapshot instead')
+
+    def __delattr__(self, name):
+        raise AttributeError('ModelSnapshot is immutable; publish a new snapshot instead')
+
+    @property
+    def forest(self):
+        return self.recommender.model
+
+    @property
+    def encoders(self):
+        return self.recommender.encoders
+
+    def __repr__(self):
+        return f"ModelSnapshot({type(self.recommender).__name__}, version={self.version})"
+
+
+class ModelHandle:
+    """The single atomic reference to a task's live `ModelSnapshot`."""
+
+    def __init__(self, task, snapshot=None):
+        self.task      = task
+        self._snapshot = snapshot
+        self.swaps     = 0
+
+    @property
+    def current(self):
+        """The live snapshot (None until one is published)."""
+        return self._snapshot
+
+    @property
+    def version(self):
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot.version
+
+    def publish(self, snapshot):
+        """Makes `snapshot` live; in-flight requests finish on the one they took."""
+        previous, self._snapshot = self._snapshot, snapshot
+        self.swaps += 1
+        count('model_swaps', task=self.task, version=snapshot.version)
+        return previous
+
+    def call(self, method, **kwargs):
+        """(result, version) of `method` on the recommender of the live snapshot."""
+        snapshot = self._snapshot
+        result   = getattr(snapshot.recommender, method)(**kwargs)
+        count('predictions', task=self.task, version=snapshot.version)
+        return result, snapshot.version
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ArtifactWatcher:
+    """Polls artifact files and publishes changed ones to their handles.
+
+    `watch(handle, recommender_cls, path, csv_file)` registers one artifact.
+    With `csv_file`, only artifacts trained on that file's current contents
+    are published (`load_if_current`). Loading and, with `warm_explainers`,
+    building the explainers happen on the watcher thread; readers only ever see
+    the finished snapshot.
+    """
+
+    def __init__(self, interval=WATCH_INTERVAL, warm_explainers=True):
+        self.interval        = interval
+        self.warm_explainers = warm_explainers
+        self._watches        = []
+        self._stop           = threading.Event()
+        self._thread         = None
+
+    def watch(self, handle, recommender_cls, path, csv_file=None, cache=None):
+        current = handle.current
+        self._watches.append({
+            'handle': handle, 'cls': recommender_cls, 'path': path,
+            'csv_file': csv_file, 'cache': cache,
+            # An artifact the live snapshot was loaded from counts as seen
+            'signature': (_signature(path) if current is not None
+                          and current.source == path else None),
+        })
+        return self
+
+    def check(self):
+        """One poll; returns the tasks whose snapshot was swapped."""
+        swapped = []
+        for w in self._watches:
+            signature = _signature(w['path'])
+            if signature is None or signature == w['signature']:
+                continue
+            w['signature'] = signature
+            t0 = time.perf_counter()
+            try:
+                if w['csv_file']:
+                    recommender = w['cls'].load_if_current(w['path'], w['csv_file'], w['cache'])
+                else:
+                    recommender = w['cls'].load(w['path'], cache=w['cache'])
+            except Exception:
+                count('model_swap_failures', task=w['handle'].task)
+                continue
+            if recommender is None or recommender.version == w['handle'].version:
+                continue
+            if self.warm_explainers:
+                recommender.warm_explainers()
+            w['handle'].publish(ModelSnapshot(recommender, source=w['path']))
+            observe('model_load_seconds', time.perf_counter() - t0, task=w['handle'].task)
+            swapped.append(w['handle'].task)
+        return swapped
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='artifact-watcher',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+class LiveModels:
+    """One `ModelHandle` per task in LIVE_TASKS, kept current by one watcher.
+
+    A task's first snapshot is built on first use. It is the saved artifact
+    when that matches the dataset; otherwise diet and workout train from the
+    CSV, and the joint handle stays empty until a joint artifact is saved.
+    Its explainers are built on a daemon thread, so the first `explain` does
+    not pay for them on the caller's (UI) thread.
+    """
+
+    def __init__(self, cache=None, artifact_dir=ARTIFACT_DIR, interval=WATCH_INTERVAL):
+        self.cache        = cache
+        self.artifact_dir = artifact_dir
+        self.handles      = {task: ModelHandle(task) for task in LIVE_TASKS}
+        self.watcher      = ArtifactWatcher(interval)
+        self._started     = set()
+
+    def handle(self, task):
+        handle = self.handles[task]
+        if task not in self._started:
+            self._started.add(task)
+            cls, dataset, train = LIVE_TASKS[task]
+            path        = os.path.join(self.artifact_dir, f'{task}.joblib')
+            recommender = cls.load_if_current(path, dataset, self.cache)
+            source      = path
+            if recommender is None and train:
+                recommender, source = cls(dataset, cache=self.cache), dataset
+            if recommender is not None and handle.current is None:
+                handle.publish(ModelSnapshot(recommender, source=source))
+                threading.Thread(target=recommender.warm_explainers, name=f'{task}-explainers',
+                                 daemon=True).start()
+            self.watcher.watch(handle, cls, path, csv_file=dataset, cache=self.cache).start()
+        return handle
+
+    def versions(self):
+        """task -> live version, for the tasks built so far."""
+        return {task: h.version for task, h in self.handles.items() if h.current is not None}
+
+    def stop(self):
+        self.watcher.stop()
+
+
+# ── Hot-swap demo ────────────────────────────────────────────────────────────
+
+def demo(seconds=5.0, readers=4, swap_every=0.5):
+    work = tempfile.mkdtemp(prefix='snapshot_demo_')
+    try:
+        # Two models with different versions: full data and the first half
+        full = os.path.join(work, 'full.csv')
+        half = os.path.join(work, 'half.csv')
+        shutil.copy('workout_dataset.csv', full)
+        with open('workout_dataset.csv') as f:
+            lines = f.readlines()
+        with open(half, 'w') as f:
+            f.writelines(lines[:len(lines) // 2])
+        models = [WorkoutRecommenderAI(full), WorkoutRecommenderAI(half)]
+        blobs  = []
+        for i, model in enumerate(models):
+            path = os.path.join(work, f'model{i}.joblib')
+            model.save(path)
+            with open(path, 'rb') as f:
+                blobs.append(f.read())
+
+        artifact = os.path.join(work, 'workout.joblib')
+        models[0].save(artifact)
+        handle  = ModelHandle('workout', ModelSnapshot(WorkoutRecommenderAI.load(artifact),
+                                                       source=artifact))
+        # Readers only predict, so swaps skip the explainer build
+        watcher = ArtifactWatcher(interval=swap_every / 5, warm_explainers=False).watch(
+            handle, WorkoutRecommenderAI, artifact).start()
+
+        rng      = np.random.default_rng(0)
+        requests = [dict(age=int(rng.integers(18, 81)), weight=float(rng.uniform(50, 120)),
+                         height=float(rng.uniform(150, 200)),
+                         disease=str(rng.choice(['None', 'Diabetes', 'Hypertension', 'Obesity'])),
+                         activity_level=str(rng.choice(['Sedentary', 'Moderately Active',
+                                                        'Very Active'])),
+                         goal=str(rng.choice(['Lose Weight', 'Maintain Weight', 'Gain Weight'])))
+                    for _ in range(200)]
+        responses, times, stop = [], [], threading.Event()
+
+        def reader(seed):
+            local_rng = np.random.default_rng(seed)
+            while not stop.is_set():
+                i  = int(local_rng.integers(len(requests)))
+                t0 = time.perf_counter()
+                result, version = handle.call('predict', **requests[i])
+                times.append(time.perf_counter() - t0)
+                responses.append((i, version, result))
+
+        threads = [threading.Thread(target=reader, args=(s,)) for s in range(readers)]
+        for t in threads:
+            t.start()
+        deadline, turn = time.time() + seconds, 1
+        while time.time() < deadline:
+            time.sleep(swap_every)
+            tmp = artifact + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(blobs[turn % 2])
+            os.replace(tmp, artifact)
+            turn += 1
+        stop.set()
+        for t in threads:
+            t.join()
+        watcher.stop()
+
+        expected = {m.version: m for m in models}
+        wrong    = sum(result != expected[version].predict(**requests[i])
+                       for i, version, result in responses)
+        seen     = {v: sum(1 for _, ver, _ in responses if ver == v) for v in expected}
+        print(f"\n  {len(responses)} responses from {readers} reader threads in {seconds:.0f}s,"
+              f" {handle.swaps} swaps")
+        for version, n in seen.items():
+            print(f"    version {version}: {n} responses")
+        print(f"  Responses inconsistent with their reported version: {wrong}")
+        print(f"  p50 / p99 latency: {np.percentile(times, 50) * 1e3:.3f} /"
+              f" {np.percentile(times, 99) * 1e3:.3f} ms\n")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--swap-every', type=float, default=0.5,
+                        help='seconds between artifact rewrites (default: 0.5)')
+    args = parser.parse_args()
+    demo(args.seconds, args.readers, args.swap_every)
+
+
+if __name__ == '__main__':
+    main()
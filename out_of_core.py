@@ -0,0 +1,302 @@
+"""Out-of-core training for datasets larger than RAM.
+
+The dataset is streamed twice in fixed-size chunks (CSV, or Parquet when
+pyarrow is installed):
+  1. collect the category vocabularies and the row count, and fit the encoders;
+  2. encode every chunk straight into an on-disk float32 feature memmap and an
+     int32 label memmap (`<work_dir>/X.npy`, `y.npy`).
+
+Two fit modes are then available:
+  memmap  -- fit the recommender's forest directly on the memmap; sklearn
+             keeps float32 C-ordered input as is, so the OS pages it in on
+             demand.
+  chunks  -- fit a small sub-forest on each of `n_chunks` disjoint random row
+             samples (only one sample in RAM at a time) and merge their trees
+             into a single forest. Peak RSS is bounded by the chunk size.
+
+    python out_of_core.py train workout big_workout.csv [--mode chunks --n-chunks 10]
+    python out_of_core.py benchmark workout [--rows 1000000 --trees 20]
+    python out_of_core.py encode-benchmark workout [--rows 10000000]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import check_array
+
+from health_app import DietRecommenderAI, WorkoutRecommenderAI
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:   # Parquet input is optional
+    pq = None
+
+TASKS = {
+    'diet':    (DietRecommenderAI,    'diet_recommendations_dataset.csv'),
+    'workout': (WorkoutRecommenderAI, 'workout_dataset.csv'),
+}
+
+CHUNK_ROWS = 100_000
+
+
+def iter_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    """Yields DataFrames of at most `chunk_rows` rows with only `columns`."""
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError('reading Parquet needs pyarrow (pip install pyarrow)')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def build_memmap(recommender, path, work_dir, chunk_rows=CHUNK_ROWS):
+    """Two streaming passes: fit encoders, then fill X/y memmaps. Returns (X, y)."""
+    cat_cols = recommender._CATEGORICAL_COLS + [recommender._TARGET_COL]
+    columns  = list(dict.fromkeys(recommender._FEATURE_COLS + [recommender._TARGET_COL]))
+
+    vocab, n_rows = {col: set() for col in cat_cols}, 0
+    for chunk in iter_chunks(path, columns, chunk_rows):
+        n_rows += len(chunk)
+        for col in cat_cols:
+            vocab[col].update(chunk[col].fillna('None').astype(str).unique())
+    # Same classes_ as fitting on the whole column (sorted uniques)
+    for col in cat_cols:
+        recommender.encoders[col] = LabelEncoder().fit(np.array(sorted(vocab[col]), dtype=object))
+
+    os.makedirs(work_dir, exist_ok=True)
+    X = np.lib.format.open_memmap(os.path.join(work_dir, 'X.npy'), mode='w+', dtype=np.float32,
+                                  shape=(n_rows, len(recommender._FEATURE_COLS)))
+    y = np.lib.format.open_memmap(os.path.join(work_dir, 'y.npy'), mode='w+', dtype=np.int32,
+                                  shape=(n_rows,))
+    start = 0
+    for chunk in iter_chunks(path, columns, chunk_rows):
+        stop = start + len(chunk)
+        _, y[start:stop] = recommender.encode_frame(chunk, out=X[start:stop])
+        start = stop
+    X.flush()
+    y.flush()
+    return X, y
+
+
+def fit_chunked(base_model, X, y, n_chunks, seed=42):
+    """Fits one sub-forest per disjoint random row sample and merges the trees.
+
+    `base_model.n_estimators` trees are split across the chunks (at most one
+    chunk per tree). Each sample
+    is read from the memmap in sorted row order, fitted and released before
+    the next one is loaded.
+    """
+    n_chunks = min(n_chunks, base_model.n_estimators)   # at least one tree per chunk
+    rng      = np.random.default_rng(seed)
+    order    = rng.permutation(len(y))
+    classes  = np.unique(y)
+    trees    = np.array_split(np.arange(base_model.n_estimators), n_chunks)
+
+    merged = None
+    for i, (rows, tree_ids) in enumerate(zip(np.array_split(order, n_chunks), trees)):
+        rows = np.sort(rows)
+        X_c, y_c = np.asarray(X[rows]), np.asarray(y[rows])
+        if len(np.unique(y_c)) != len(classes):
+            raise ValueError(f'chunk {i} does not contain every class; use fewer chunks')
+        sub = clone(base_model).set_params(n_estimators=len(tree_ids),
+                                           random_state=int(rng.integers(2 ** 31)))
+        sub.fit(X_c, y_c)
+        if merged is None:
+            merged = sub
+        else:
+            merged.estimators_ += sub.estimators_
+        del X_c, y_c
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def train_out_of_core(task, path, work_dir, mode='memmap', n_chunks=10,
+                      chunk_rows=CHUNK_ROWS, n_estimators=None):
+    """Returns a trained recommender for `task` without loading `path` into RAM."""
+    recommender = TASKS[task][0]()
+    # OOB votes would be an (n_rows, n_classes) float64 array in RAM; out-of-core
+    # models skip calibration and report the forest's raw confidence. They also
+    # skip the rule table, whose support counts scan every column of X per rule.
+    recommender.model.set_params(oob_score=False)
+    if n_estimators:
+        recommender.model.set_params(n_estimators=n_estimators)
+    X, y = build_memmap(recommender, path, work_dir, chunk_rows)
+    if mode == 'memmap':
+        recommender.model.fit(X, y)
+    else:
+        recommender.model = fit_chunked(recommender.model, X, y, n_chunks)
+    recommender._set_version(path)
+    recommender.fit_early_exit(X)   # ranks trees on a row sample, so memmap-friendly
+    return recommender
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def make_synthetic(task, source, n_rows, out_path, seed=0):
+    """Writes an `n_rows` CSV resampled from `source` rows with 2% numeric jitter."""
+    recommender_cls = TASKS[task][0]
+    rng     = np.random.default_rng(seed)
+    numeric = [c for c in recommender_cls._FEATURE_COLS
+               if c not in recommender_cls._CATEGORICAL_COLS]
+    header  = True
+    for start in range(0, n_rows, CHUNK_ROWS):
+        chunk = source.iloc[rng.integers(0, len(source), min(CHUNK_ROWS, n_rows - start))].copy()
+        chunk[numeric] = (chunk[numeric] * rng.normal(1, 0.02, (len(chunk), len(numeric)))).round(1)
+        chunk.to_csv(out_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MiB; None where `resource` is missing.
+
+    tracemalloc would miss memmapped pages, so the benchmark compares RSS.
+    """
+    try:
+        import resource   # POSIX only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_mode(task, path, work_dir, mode, trees, n_chunks, test_path):
+    """Child-process entry: trains one way and prints timing / F1 / peak RSS as JSON."""
+    t0 = time.perf_counter()
+    if mode == 'in-memory':
+        recommender = TASKS[task][0]()
+        recommender.model.set_params(n_estimators=trees)
+        recommender.train_model(path)
+    else:
+        recommender = train_out_of_core(task, path, work_dir, mode, n_chunks,
+                                        n_estimators=trees)
+    train_s = time.perf_counter() - t0
+    X_te, y_te = recommender.encode_frame(pd.read_csv(test_path))
+    print(json.dumps({
+        'train_s':     train_s,
+        'f1':          f1_score(y_te, recommender.model.predict(X_te), average='weighted'),
+        'peak_rss_mb': _peak_rss_mb(),
+    }))
+
+
+def benchmark(task, rows=1_000_000, trees=20, n_chunks=10):
+    """Peak RSS / time / F1 of in-memory vs. memmap vs. chunked training.
+
+    Every mode runs in a fresh process so its peak RSS is its own.
+    """
+    workdir = tempfile.mkdtemp(prefix='fitai_ooc_')
+    try:
+        path, test_path = os.path.join(workdir, 'train.csv'), os.path.join(workdir, 'test.csv')
+        df   = pd.read_csv(TASKS[task][1])
+        test = df.sample(frac=0.2, random_state=0)   # real rows never resampled into train
+        test.to_csv(test_path, index=False)
+        make_synthetic(task, df.drop(test.index), rows, path)
+        print(f"\n{task}: {rows:,} rows ({os.path.getsize(path) / 2 ** 20:.0f} MiB CSV), "
+              f"{trees} trees")
+        print(f"{'Mode':<10} {'Train (s)':>10} {'Peak RSS (MiB)':>15} {'Test F1':>8}")
+        for mode in ('in-memory', 'memmap', 'chunks'):
+            proc = subprocess.run(
+                [sys.executable, __file__, '_run', task, path, '--work-dir',
+                 os.path.join(workdir, mode), '--mode', mode, '--trees', str(trees),
+                 '--n-chunks', str(n_chunks), '--test', test_path],
+                capture_output=True, text=True)
+            if proc.returncode:
+                raise RuntimeError(f'{mode} run failed:\n{proc.stderr}')
+            r    = json.loads(proc.stdout.strip().splitlines()[-1])
+            peak = 'n/a' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:.0f}"
+            print(f"{mode:<10} {r['train_s']:>10.1f} {peak:>15} {r['f1']:>8.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _legacy_encode(recommender, df):
+    """The pre-float32 `encode_frame`: copy the frame, encode in place, `.values`."""
+    df = df.copy()
+    for col in recommender._CATEGORICAL_COLS + [recommender._TARGET_COL]:
+        df[col] = LabelEncoder().fit_transform(df[col].fillna('None').astype(str))
+    return df[recommender._FEATURE_COLS].values, df[recommender._TARGET_COL].values
+
+
+def encode_benchmark(task, rows=10_000_000, seed=0):
+    """Peak traced memory / time of frame -> forest-ready X, old vs. current path.
+
+    Both paths end with the `check_array(..., dtype=float32)` conversion the
+    forest applies on fit, which is free for the current path.
+    """
+    recommender_cls, dataset = TASKS[task]
+    src = pd.read_csv(dataset, usecols=recommender_cls._FEATURE_COLS
+                      + [recommender_cls._TARGET_COL])
+    df  = src.iloc[np.random.default_rng(seed).integers(0, len(src), rows)].reset_index(drop=True)
+    final_mb = rows * len(recommender_cls._FEATURE_COLS) * 4 / 2 ** 20
+    print(f"\n{task}: {rows:,} rows in memory; final float32 X = {final_mb:.0f} MiB")
+    print(f"{'Path':<28} {'Time (s)':>9} {'Peak extra (MiB)':>17} {'x final X':>10} {'Copied by fit':>14}")
+
+    for label, encode in (('legacy (.values float64)', _legacy_encode),
+                          ('float32 in place', lambda r, d: r.encode_frame(d, fit=True))):
+        tracemalloc.start()
+        t0    = time.perf_counter()
+        X, y  = encode(recommender_cls(), df)
+        X_fit = check_array(X, dtype=np.float32, order='C')
+        elapsed = time.perf_counter() - t0
+        peak    = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        copied  = 'no' if np.shares_memory(X, X_fit) else 'yes'
+        print(f"{label:<28} {elapsed:>9.1f} {peak:>17.0f} {peak / final_mb:>10.1f} {copied:>14}")
+        del X, y, X_fit
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=['train', 'benchmark', 'encode-benchmark', '_run'])
+    parser.add_argument('task', choices=sorted(TASKS))
+    parser.add_argument('dataset', nargs='?')
+    parser.add_argument('--mode', choices=['memmap', 'chunks', 'in-memory'], default='memmap')
+    parser.add_argument('--n-chunks', type=int, default=10)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--work-dir', default=None, help='where X.npy / y.npy are written')
+    parser.add_argument('--out', default=None, help='artifact path (default: models/<task>.joblib)')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--trees', type=int, default=20)
+    parser.add_argument('--test', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.task, args.rows, args.trees, args.n_chunks)
+    elif args.command == 'encode-benchmark':
+        encode_benchmark(args.task, args.rows)
+    elif args.command == '_run':
+        _run_mode(args.task, args.dataset, args.work_dir, args.mode, args.trees,
+                  args.n_chunks, args.test)
+    else:
+        if not args.dataset:
+            parser.error('train needs a DATASET path')
+        if args.mode == 'in-memory':
+            parser.error("train supports --mode memmap or chunks; use health_app for in-memory")
+        work_dir = args.work_dir or tempfile.mkdtemp(prefix='fitai_ooc_')
+        try:
+            recommender = train_out_of_core(args.task, args.dataset, work_dir, args.mode,
+                                            args.n_chunks, args.chunk_rows)
+        finally:
+            if not args.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        out = args.out or os.path.join('models', f'{args.task}.joblib')
+        recommender.save(out)
+        print(f"Trained {args.task} ({args.mode}) -> {out}  version {recommender.version}")
+
+
+if __name__ == '__main__':
+    main()
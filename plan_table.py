@@ -0,0 +1,372 @@
+"""Offline plan-table compiler.
+
+Pre-scores every bucketed input combination with the production forest and
+stores the result as a flat, array-indexed table (`<task>.npy`, mmap'd on load)
+plus a small JSON sidecar. At request time a prediction is then one index
+computation into the table instead of a 100-tree traversal.
+
+    python plan_table.py compile diet  [--weight-step 1.0 ...]
+    python plan_table.py compile workout
+    python plan_table.py report  workout
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from batch_scoring import BatchScorer
+from health_app import (DietRecommenderAI, WorkoutRecommenderAI, CLINICAL_DEFAULTS,
+                        _ACTIVITY_MAP, _GOAL_MAP)
+
+TABLE_DIR  = 'plan_tables'
+CHUNK_ROWS = 1 << 20
+MAX_CELLS  = 250_000_000
+
+_GENDERS    = ['Female', 'Male']
+_DISEASES   = ['None', 'Diabetes', 'Hypertension', 'Obesity']
+_SEVERITIES = ['Mild', 'Moderate', 'Severe']
+_ACTIVITIES = ['Sedentary', 'Moderate', 'Active']       # dataset levels
+_GOALS      = ['Lose Weight', 'Maintain', 'Gain Muscle']  # dataset levels
+
+# Axis order is the table's memory layout (row-major, last axis fastest).
+# Numeric axes are (lo, hi, step); categorical axes list their values.
+TASKS = {
+    'diet': {
+        'dataset':     'diet_recommendations_dataset.csv',
+        'recommender': DietRecommenderAI,
+        'axes': [
+            ('age',             (18.0, 80.0, 1.0)),
+            ('gender',          _GENDERS),
+            ('weight',          (40.0, 140.0, 2.0)),
+            ('height',          (145.0, 205.0, 2.0)),
+            ('disease',         _DISEASES),
+            ('severity',        _SEVERITIES),
+            ('activity',        _ACTIVITIES),
+            ('weekly_exercise', (0.0, 14.0, 2.0)),
+        ],
+    },
+    'workout': {
+        'dataset':     'workout_dataset.csv',
+        'recommender': WorkoutRecommenderAI,
+        'axes': [
+            ('age',      (18.0, 80.0, 1.0)),
+            ('gender',   _GENDERS),
+            ('weight',   (40.0, 140.0, 0.5)),
+            ('height',   (145.0, 205.0, 0.5)),
+            ('disease',  _DISEASES),
+            ('activity', _ACTIVITIES),
+            ('goal',     _GOALS),
+        ],
+    },
+}
+
+
+# ── Axis helpers ─────────────────────────────────────────────────────────────
+
+def _is_numeric(spec):
+    return isinstance(spec, tuple)
+
+
+def _axis_len(spec):
+    if _is_numeric(spec):
+        lo, hi, step = spec
+        return int(round((hi - lo) / step)) + 1
+    return len(spec)
+
+
+def _with_steps(axes, steps):
+    """Returns `axes` with the numeric steps in `steps` ({name: step}) replaced."""
+    out = []
+    for name, spec in axes:
+        if _is_numeric(spec) and steps.get(name) is not None:
+            spec = (spec[0], spec[1], float(steps[name]))
+        out.append((name, spec))
+    return out
+
+
+def _feature_matrix(task, recommender, values):
+    """Builds the model's float32 feature matrix from per-axis value arrays.
+
+    Numeric axes carry raw values; categorical axes carry indices into their
+    axis list (encoded once per category, then gathered).
+    """
+    axes  = dict(TASKS[task]['axes'])
+    codes = {}
+    for name, col in (('gender', 'Gender'), ('disease', 'Disease_Type'),
+                      ('severity', 'Severity'), ('activity', 'Physical_Activity_Level'),
+                      ('goal', 'Goal')):
+        if name in axes:
+            codes[name] = np.array([recommender._safe_encode(col, v) for v in axes[name]],
+                                   dtype=np.float32)[values[name]]
+
+    weight = values['weight'].astype(np.float32)
+    height = values['height'].astype(np.float32)
+    bmi    = weight / ((height / 100) ** 2)
+    if task == 'workout':
+        cols = [values['age'], codes['gender'], weight, height, bmi,
+                codes['disease'], codes['activity'], codes['goal']]
+    else:
+        clinical = np.array([[CLINICAL_DEFAULTS[d]['cholesterol'], CLINICAL_DEFAULTS[d]['bp'],
+                              CLINICAL_DEFAULTS[d]['glucose']] for d in _DISEASES],
+                            dtype=np.float32)[values['disease']]
+        cols = [values['age'], codes['gender'], weight, height, bmi,
+                codes['disease'], codes['severity'], codes['activity'],
+                clinical[:, 0], clinical[:, 1], clinical[:, 2], values['weekly_exercise']]
+
+    X = np.empty((len(weight), len(cols)), dtype=np.float32)
+    for j, col in enumerate(cols):
+        X[:, j] = col
+    return X
+
+
+def _cell_values(axes, flat_idx):
+    """Maps flat table indices back to per-axis values (numeric) / indices (categorical)."""
+    shape  = [_axis_len(spec) for _, spec in axes]
+    coords = np.unravel_index(flat_idx, shape)
+    values = {}
+    for (name, spec), idx in zip(axes, coords):
+        values[name] = spec[0] + idx * spec[2] if _is_numeric(spec) else idx
+    return values
+
+
+# ── Table ────────────────────────────────────────────────────────────────────
+
+class PlanTable:
+    """Array-indexed prediction table for one task.
+
+    Each cell holds `(class_index, round(confidence * 255))` as uint8, with the
+    recommender's calibration map already applied to the confidence. Inputs
+    that fall outside the table's ranges or categories, tables compiled for a
+    different model version, and `exact=True` lookups all go to the live
+    forest in `recommender`. The recommender's rule table is consulted first,
+    as in its `predict`, so a rule answer never depends on whether a table
+    was compiled.
+    """
+
+    def __init__(self, task, axes, table, classes, version, recommender=None):
+        self.task        = task
+        self.axes        = axes
+        self.table       = table
+        self.classes     = list(classes)
+        self.version     = version
+        self.recommender = recommender
+        self._shape      = [_axis_len(spec) for _, spec in axes]
+        self._strides    = np.cumprod([1] + self._shape[::-1][:-1])[::-1].tolist()
+        self.hits        = 0
+        self.fallbacks   = 0
+
+    @property
+    def stale(self):
+        return self.recommender is not None and self.recommender.version != self.version
+
+    # ── Compile / persist ────────────────────────────────────────────────────
+
+    @classmethod
+    def compile(cls, task, recommender, steps=None, out_dir=TABLE_DIR,
+                chunk_rows=CHUNK_ROWS, max_cells=MAX_CELLS):
+        axes    = _with_steps(TASKS[task]['axes'], steps or {})
+        n_cells = int(np.prod([_axis_len(spec) for _, spec in axes], dtype=np.int64))
+        if n_cells > max_cells:
+            raise ValueError(f"{task} table would have {n_cells:,} cells (limit {max_cells:,}); "
+                             "use coarser steps")
+
+        os.makedirs(out_dir, exist_ok=True)
+        path  = os.path.join(out_dir, f'{task}.npy')
+        table = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(n_cells, 2))
+
+        model = recommender.model
+        with BatchScorer(recommender) as scorer:   # one thread per core
+            for start in range(0, n_cells, chunk_rows):
+                stop  = min(start + chunk_rows, n_cells)
+                X     = _feature_matrix(task, recommender,
+                                        _cell_values(axes, np.arange(start, stop)))
+                proba = scorer.predict_proba(X)
+                conf  = proba.max(axis=1)
+                if recommender.calibrator is not None:
+                    conf = recommender.calibrator(conf)
+                table[start:stop, 0] = proba.argmax(axis=1)
+                table[start:stop, 1] = np.rint(conf * 255)
+        table.flush()
+
+        classes = recommender.encoders[recommender._TARGET_COL].inverse_transform(model.classes_)
+        meta = {
+            'task':    task,
+            'version': recommender.version,
+            'classes': [str(c) for c in classes],
+            'axes':    [[name, list(spec) if _is_numeric(spec) else spec] for name, spec in axes],
+        }
+        with open(os.path.join(out_dir, f'{task}.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return cls(task, axes, table, classes, recommender.version, recommender)
+
+    @classmethod
+    def load(cls, task, recommender=None, table_dir=TABLE_DIR):
+        with open(os.path.join(table_dir, f'{task}.json')) as f:
+            meta = json.load(f)
+        axes  = [(name, tuple(spec) if isinstance(spec[0], (int, float)) else spec)
+                 for name, spec in meta['axes']]
+        table = np.load(os.path.join(table_dir, f'{task}.npy'), mmap_mode='r')
+        return cls(task, axes, table, meta['classes'], meta['version'], recommender)
+
+    @classmethod
+    def load_if_present(cls, task, recommender=None, table_dir=TABLE_DIR):
+        """Like `load`, but returns None when the task has not been compiled."""
+        if not os.path.exists(os.path.join(table_dir, f'{task}.json')):
+            return None
+        return cls.load(task, recommender, table_dir)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def _index(self, inputs):
+        """Flat cell index for one request, or None if it is off-table."""
+        flat = 0
+        for (name, spec), stride in zip(self.axes, self._strides):
+            value = inputs[name]
+            if _is_numeric(spec):
+                lo, hi, step = spec
+                i = int(round((float(value) - lo) / step))
+                if not 0 <= i < _axis_len(spec):
+                    return None
+            else:
+                if value not in spec:
+                    return None
+                i = spec.index(value)
+            flat += i * stride
+        return flat
+
+    def _inputs(self, age, weight, height, disease, gender, activity_level,
+                severity=None, goal=None, weekly_exercise=None):
+        return {
+            'age': age, 'weight': weight, 'height': height,
+            'gender': gender, 'disease': disease, 'severity': severity,
+            'activity': _ACTIVITY_MAP.get(activity_level, 'Moderate'),
+            'goal': _GOAL_MAP.get(goal, 'Maintain'),
+            'weekly_exercise': weekly_exercise,
+        }
+
+    def lookup(self, age, weight, height, disease, gender='Female',
+               activity_level='Moderately Active', severity='Mild',
+               goal='Maintain Weight', weekly_exercise=3.0, exact=False):
+        """Returns (label, confidence), from the table when possible."""
+        if self.recommender is not None:
+            hit = (self.recommender._rules_for(disease, gender, activity_level, goal)
+                   if self.task == 'workout' else
+                   self.recommender._rules_for(disease, gender, activity_level, severity))
+            if hit is not None:
+                return hit
+        idx = None
+        if not exact and not self.stale:
+            idx = self._index(self._inputs(age, weight, height, disease, gender,
+                                           activity_level, severity, goal, weekly_exercise))
+        if idx is not None:
+            self.hits += 1
+            cls_idx, conf = self.table[idx]
+            return self.classes[cls_idx], float(conf) / 255.0
+
+        if self.recommender is None:
+            raise LookupError(f"{self.task} input is off-table and no live model is attached")
+        self.fallbacks += 1
+        if self.task == 'workout':
+            return self.recommender.predict(age, weight, height, disease, gender=gender,
+                                            activity_level=activity_level, goal=goal)
+        clinical = CLINICAL_DEFAULTS.get(disease, CLINICAL_DEFAULTS['None'])
+        return self.recommender.predict_with_confidence(
+            age, weight, height, disease, gender=gender, activity_level=activity_level,
+            severity=severity, cholesterol=clinical['cholesterol'],
+            blood_pressure=clinical['bp'], glucose=clinical['glucose'],
+            weekly_exercise=weekly_exercise)
+
+
+# ── Accuracy vs. bucket size ─────────────────────────────────────────────────
+
+def _sample_inputs(axes, n, rng):
+    """Random continuous inputs inside the table's ranges (categoricals as indices)."""
+    values = {}
+    for name, spec in axes:
+        if _is_numeric(spec):
+            lo, hi, _ = spec
+            values[name] = (rng.integers(lo, hi + 1, n).astype(float) if name == 'age'
+                            else rng.uniform(lo, hi, n))
+        else:
+            values[name] = rng.integers(0, len(spec), n)
+    return values
+
+
+def bucket_report(task, recommender, step_grid=(0.25, 0.5, 1.0, 2.0, 5.0),
+                  n_samples=20_000, seed=0):
+    """Label agreement and confidence error of bucketed vs. exact scoring.
+
+    Weight and height share each step in `step_grid`; other axes keep their
+    defaults. Scoring the bucket centre is exactly what the table would return,
+    so no table has to be compiled to produce the report.
+    """
+    rng    = np.random.default_rng(seed)
+    base   = TASKS[task]['axes']
+    values = _sample_inputs(base, n_samples, rng)
+    exact  = recommender.model.predict_proba(_feature_matrix(task, recommender, values))
+
+    rows = []
+    for step in step_grid:
+        axes    = _with_steps(base, {'weight': step, 'height': step})
+        snapped = dict(values)
+        for name, spec in axes:
+            if _is_numeric(spec):
+                lo, _, s = spec
+                snapped[name] = lo + np.round((values[name] - lo) / s) * s
+        approx  = recommender.model.predict_proba(_feature_matrix(task, recommender, snapped))
+        n_cells = int(np.prod([_axis_len(spec) for _, spec in axes], dtype=np.int64))
+        rows.append({
+            'step':           step,
+            'cells':          n_cells,
+            'table_mb':       n_cells * 2 / 1e6,
+            'agreement':      float((approx.argmax(1) == exact.argmax(1)).mean()),
+            'mean_conf_err':  float(np.abs(approx.max(1) - exact.max(1)).mean()),
+        })
+    return rows
+
+
+def print_bucket_report(task, rows):
+    print(f"\n{task} table -- accuracy vs. weight/height bucket size")
+    print(f"{'Step':>6} {'Cells':>14} {'Size (MB)':>10} {'Agreement':>10} {'Conf err':>9}")
+    for r in rows:
+        print(f"{r['step']:>6.2f} {r['cells']:>14,} {r['table_mb']:>10.1f}"
+              f" {r['agreement']:>10.4f} {r['mean_conf_err']:>9.4f}")
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=['compile', 'report'])
+    parser.add_argument('task', choices=sorted(TASKS))
+    parser.add_argument('--age-step', type=float)
+    parser.add_argument('--weight-step', type=float)
+    parser.add_argument('--height-step', type=float)
+    parser.add_argument('--exercise-step', type=float)
+    parser.add_argument('--out-dir', default=TABLE_DIR)
+    args = parser.parse_args()
+
+    spec        = TASKS[args.task]
+    recommender = spec['recommender'](spec['dataset'])
+
+    if args.command == 'report':
+        print_bucket_report(args.task, bucket_report(args.task, recommender))
+        return
+
+    steps = {'age': args.age_step, 'weight': args.weight_step,
+             'height': args.height_step, 'weekly_exercise': args.exercise_step}
+    t0    = time.perf_counter()
+    table = PlanTable.compile(args.task, recommender, steps, out_dir=args.out_dir)
+    print(f"Compiled {args.task} table: {len(table.table):,} cells, "
+          f"{table.nbytes / 1e6:.1f} MB in {time.perf_counter() - t0:.1f}s "
+          f"-> {os.path.join(args.out_dir, args.task + '.npy')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def quantize_features(row, quantum=0.1):
+    """Snaps every value of an encoded feature row onto a `quantum` grid.
+
+    Returns the integer grid coordinates as a hashable tuple. Encoded
+    categoricals are whole numbers, so they survive any quantum that divides 1.
+    """
+    return tuple(int(round(float(v) / quantum)) for v in row)
+
+
+class PredictionCache:
+    """Bounded LRU cache with a per-entry TTL for recommender predictions.
+
+    Keys are `(namespace, version, quantized_features)`. When a recommender
+    binds a new model version for its namespace, every entry of the old version
+    is dropped, so a retrained model can never serve stale predictions.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, quantum=0.1, clock=time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize  = maxsize
+        self.ttl      = ttl
+        self.quantum  = quantum
+        self._clock   = clock
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._versions = {}             # namespace -> bound model version
+        self._lock    = threading.Lock()
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self.expirations = 0
+
+    def make_key(self, namespace, version, features):
+        return (namespace, version, quantize_features(features, self.quantum))
+
+    def dequantize(self, key):
+        """Returns the feature row a key stands for (the grid point itself)."""
+        return [[q * self.quantum for q in key[2]]]
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self.ttl is not None and self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bind_version(self, namespace, version):
+        """Records the live model version for `namespace`, purging older entries."""
+        with self._lock:
+            if self._versions.get(namespace) == version:
+                return
+            self._versions[namespace] = version
+            stale = [k for k in self._entries if k[0] == namespace and k[1] != version]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits':        self.hits,
+                'misses':      self.misses,
+                'hit_ratio':   self.hits / lookups if lookups else 0.0,
+                'size':        len(self._entries),
+                'maxsize':     self.maxsize,
+                'evictions':   self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def report(self):
+        s = self.stats()
+        return (f"PredictionCache: {s['size']}/{s['maxsize']} entries | "
+                f"hit ratio {s['hit_ratio']:.1%} ({s['hits']} hits, {s['misses']} misses) | "
+                f"{s['evictions']} evictions, {s['expirations']} expired")
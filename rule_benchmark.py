@@ -0,0 +1,125 @@
+"""Rule fast path vs. the forest on held-out traffic.
+
+Each recommender is trained on 80 % of its dataset, rules included. The other
+20 % is replayed as single GUI-style requests, once with the rule table and
+once with the forest only. The report gives the rules themselves, coverage
+(the share of requests a rule answered), agreement (the share of covered
+requests where the rule's labels equal the forest's) and the p50/p99 latency
+of both paths. Latency is uncached: feature building plus scoring.
+
+    python rule_benchmark.py [--task diet|workout|joint|all] [--requests 300]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from health_app import DietRecommenderAI, JointRecommenderAI, WorkoutRecommenderAI
+from joint_benchmark import _ACTIVITY_UI, _GOAL_UI
+
+TASKS = {
+    'diet':    (DietRecommenderAI,    'diet_recommendations_dataset.csv', 'predict_with_confidence'),
+    'workout': (WorkoutRecommenderAI, 'workout_dataset.csv',              'predict'),
+    'joint':   (JointRecommenderAI,   'joint_dataset.csv',                'predict'),
+}
+TEST_SIZE    = 0.20
+RANDOM_STATE = 42
+
+# Dataset column -> (predict keyword, dataset value -> GUI value)
+_REQUEST_ARGS = {
+    'Age':                     ('age',             None),
+    'Weight_kg':               ('weight',          None),
+    'Height_cm':               ('height',          None),
+    'Disease_Type':            ('disease',         None),
+    'Gender':                  ('gender',          None),
+    'Physical_Activity_Level': ('activity_level',  _ACTIVITY_UI),
+    'Goal':                    ('goal',            _GOAL_UI),
+    'Severity':                ('severity',        None),
+    'Cholesterol_mg/dL':       ('cholesterol',     None),
+    'Blood_Pressure_mmHg':     ('blood_pressure',  None),
+    'Glucose_mg/dL':           ('glucose',         None),
+    'Weekly_Exercise_Hours':   ('weekly_exercise', None),
+}
+
+
+def _requests(recommender_cls, test):
+    """Held-out rows as keyword arguments of the recommender's predict method."""
+    cols = [c for c in _REQUEST_ARGS if c in recommender_cls._FEATURE_COLS]
+    requests = []
+    for row in test[cols].to_dict('records'):
+        req = {}
+        for col in cols:
+            key, to_ui = _REQUEST_ARGS[col]
+            value      = 'None' if pd.isna(row[col]) else row[col]
+            req[key]   = to_ui[value] if to_ui else value
+        requests.append(req)
+    return requests
+
+
+def _labels(result):
+    return tuple(label for label, _ in result) if isinstance(result[0], tuple) else result[0]
+
+
+def _timed_answers(score, requests):
+    answers, times = [], []
+    for req in requests:
+        t0 = time.perf_counter()
+        answers.append(score(**req))
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1e3
+    return answers, np.percentile(times, 50), np.percentile(times, 99)
+
+
+def benchmark(task, n_requests=300):
+    recommender_cls, dataset, method = TASKS[task]
+    df = pd.read_csv(dataset)
+    train, test = train_test_split(df, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+    recommender = recommender_cls()
+    X, y = recommender.encode_frame(train, fit=True)
+    recommender.model.fit(X, y)
+    recommender.fit_calibration(recommender._out_of_fold_proba(X, y), y)
+    t0 = time.perf_counter()
+    recommender.fit_rules(X, y)
+    mine_s = time.perf_counter() - t0
+    rules  = recommender.rules
+
+    requests = _requests(recommender_cls, test.iloc[:n_requests])
+    score    = getattr(recommender, method)
+    fast, fast_p50, fast_p99 = _timed_answers(score, requests)
+    # A rule hit returns the rule's own result object
+    results  = [rule['result'] for rule in rules.rules]
+    hits     = [any(answer is r for r in results) for answer in fast]
+    recommender.rules = None
+    slow, slow_p50, slow_p99 = _timed_answers(score, requests)
+    recommender.rules = rules
+
+    covered  = np.array(hits)
+    agree    = [_labels(a) == _labels(b) for a, b, hit in zip(fast, slow, hits) if hit]
+
+    print(f"\n=== {task} ({len(rules)} rules, mined in {mine_s * 1e3:.0f} ms) ===")
+    for line in rules.describe():
+        print(f"  {line}")
+    print(f"\n  Coverage: {covered.mean():.1%} of {len(requests)} requests | "
+          f"agreement with the forest: {f'{np.mean(agree):.1%}' if agree else 'n/a'}")
+    print(f"\n  {'Path':<16} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    print(f"  {'Forest only':<16} {slow_p50:>9.3f} {slow_p99:>9.3f}")
+    print(f"  {'Rules + forest':<16} {fast_p50:>9.3f} {fast_p99:>9.3f}")
+    print(f"\n  p50 speed-up {slow_p50 / fast_p50:.1f}x\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--task', choices=[*TASKS, 'all'], default='all')
+    parser.add_argument('--requests', type=int, default=300,
+                        help='held-out requests replayed per path (default: 300)')
+    args = parser.parse_args()
+
+    for task in (TASKS if args.task == 'all' else [args.task]):
+        benchmark(task, args.requests)
+
+
+if __name__ == '__main__':
+    main()
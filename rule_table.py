@@ -0,0 +1,143 @@
+"""Rule fast path: answers high-certainty inputs without touching the forest.
+
+Some input regions are decided by one or two categorical fields -- on the diet
+task the disease type alone fixes the recommendation. `RuleTable.mine` looks
+for such regions after training: every equality condition on a categorical
+column, and every pair of them on different columns, is a candidate. The
+forest labels PROBE_ROWS probe rows with the candidate's conditions forced in.
+Each probe draws every other column independently from the training data, so
+the probes cover the whole region rather than the rows the forest has
+memorised. A candidate becomes a rule when the forest gives one answer on at
+least MIN_AGREEMENT of the probes, at least MIN_SUPPORT training rows fall in
+the region, and at least MIN_AGREEMENT of those rows carry that answer as
+their training label (per target). Agreement with the forest alone is not
+precision: a forest can be unanimous on a region whose labels are mixed. The
+confidence a rule returns is that share of the region's training rows, i.e.
+the accuracy the rule would have had on the training set.
+
+The table is short, ordered (single conditions first, then by support) and
+pickled with the recommender. `match` compares raw strings: no encoding and
+no tree traversal. `rule_benchmark.py` reports coverage, agreement with the
+forest and latency.
+"""
+import itertools
+
+import numpy as np
+
+MIN_AGREEMENT = 0.995   # share of probes (forest) and of region rows (labels) for the answer
+MIN_SUPPORT   = 30      # training rows that must fall in the region
+PROBE_ROWS    = 512     # probe rows per candidate region
+RANDOM_STATE  = 0
+
+
+class RuleTable:
+    """Ordered (conditions -> result) rules; the first matching rule answers.
+
+    `conditions` is a tuple of (column, value) pairs on the recommender's
+    categorical columns (dataset labels, e.g. 'Physical_Activity_Level' ==
+    'Sedentary'). `result` has the shape the recommender's `_score` returns.
+    """
+
+    def __init__(self, rules, classes):
+        self.rules   = rules     # [{'conditions', 'result', 'support', 'agreement'}, ...]
+        self.columns = sorted({col for rule in rules for col, _ in rule['conditions']})
+        # Unknown values are read as the first class, as `_safe_encode` does
+        self._known    = {col: frozenset(classes[col]) for col in self.columns}
+        self._fallback = {col: classes[col][0] for col in self.columns}
+        self._lookup   = [(rule['conditions'], rule['result']) for rule in rules]
+
+    def __len__(self):
+        return len(self.rules)
+
+    def match(self, values):
+        """`result` of the first rule whose conditions all hold, else None.
+
+        `values` maps column -> raw dataset label; columns no rule tests may be
+        missing.
+        """
+        if not self._lookup:
+            return None
+        row = {}
+        for col in self.columns:
+            value    = str(values[col]).strip()
+            row[col] = value if value in self._known[col] else self._fallback[col]
+        for conditions, result in self._lookup:
+            if all(row[col] == value for col, value in conditions):
+                return result
+        return None
+
+    def describe(self):
+        """One printable line per rule, in evaluation order."""
+        lines = []
+        for i, rule in enumerate(self.rules, 1):
+            cond    = ' and '.join(f"{col} == {value}" for col, value in rule['conditions'])
+            results = rule['result'] if isinstance(rule['result'][0], tuple) else [rule['result']]
+            answer  = ', '.join(f"{label} ({conf:.3f})" for label, conf in results)
+            lines.append(f"{i:>2}. {cond} -> {answer}  [support {rule['support']},"
+                         f" agreement {rule['agreement']:.3f}]")
+        return lines
+
+    # ── Mining ───────────────────────────────────────────────────────────────
+
+    @classmethod
+    def mine(cls, recommender, X, y, min_agreement=MIN_AGREEMENT,
+             min_support=MIN_SUPPORT, probe_rows=PROBE_ROWS, seed=RANDOM_STATE):
+        """Extracts the rule table of a fitted recommender from its training
+        matrix `X` and encoded labels `y` (as from `encode_frame`)."""
+        features = recommender._FEATURE_COLS
+        targets  = recommender._targets
+        y_cols   = np.asarray(y).reshape(len(X), len(targets))
+        terms    = [(features.index(col), code) for col in recommender._CATEGORICAL_COLS
+                    for code in np.unique(X[:, features.index(col)])]
+
+        rng    = np.random.default_rng(seed)
+        probes = X[rng.integers(0, len(X), (probe_rows, len(features))),
+                   np.arange(len(features))]
+
+        def accepted(candidates):
+            if not candidates:
+                return []
+            block = np.tile(probes, (len(candidates), 1))
+            for i, cand in enumerate(candidates):
+                for j, code in cand:
+                    block[i * probe_rows:(i + 1) * probe_rows, j] = code
+            votes = np.asarray(recommender.model.predict(block)).reshape(
+                len(candidates), probe_rows, len(targets))
+            found = []
+            for cand, cand_votes in zip(candidates, votes):
+                answer, counts = np.unique(cand_votes, axis=0, return_counts=True)
+                agreement      = counts.max() / probe_rows
+                in_region      = np.logical_and.reduce([X[:, j] == code for j, code in cand])
+                support        = int(in_region.sum())
+                if agreement < min_agreement or support < min_support:
+                    continue
+                answer    = answer[counts.argmax()]
+                precision = np.mean(y_cols[in_region] == answer, axis=0).min()
+                if precision >= min_agreement:
+                    found.append((cand, answer, agreement, y_cols[in_region], support))
+            return found
+
+        singles = accepted([(term,) for term in terms])
+        decided = {cand[0] for cand, *_ in singles}
+        pairs   = accepted([(a, b) for a, b in itertools.combinations(terms, 2)
+                            if a[0] != b[0] and a not in decided and b not in decided])
+
+        rules = []
+        for found in (singles, pairs):
+            for cand, answer, agreement, region_y, support in sorted(
+                    found, key=lambda f: -f[4]):
+                result = tuple(
+                    (str(recommender.encoders[target].inverse_transform([code])[0]),
+                     float(np.mean(region_y[:, k] == code)))
+                    for k, (target, code) in enumerate(zip(targets, answer)))
+                rules.append({
+                    'conditions': tuple((features[j],
+                                         str(recommender.encoders[features[j]].classes_[int(code)]))
+                                        for j, code in cand),
+                    'result':     result if recommender._TARGET_COLS else result[0],
+                    'support':    support,
+                    'agreement':  float(agreement),
+                })
+        classes = {col: list(recommender.encoders[col].classes_)
+                   for col in recommender._CATEGORICAL_COLS}
+        return cls(rules, classes)
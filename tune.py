@@ -0,0 +1,260 @@
+"""Hyper-parameter search with successive halving and an on-disk score cache.
+
+Samples configurations for every model family in the benchmark's `MODELS`,
+scores them with stratified CV on growing subsamples of the training split
+(keeping the best 1/factor each round) and picks the smallest model that meets
+the F1 target. Every (config, fold, resource) result is appended to
+`tune_cache/<task>.jsonl` as soon as it finishes, so interrupted searches
+resume where they stopped and repeated searches cost nothing.
+
+    python tune.py workout --f1-target 0.80
+    python tune.py diet --n-candidates 40 --jobs 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+import benchmark
+import workout_benchmark
+
+CACHE_DIR = 'tune_cache'
+
+TASKS = {
+    'diet':    benchmark,
+    'workout': workout_benchmark,
+}
+
+# Sampling spaces per model family; each entry draws one value from `rng`.
+# LR and KNN are `bench_pipelines.scaled` pipelines, hence the `clf__` prefix.
+SEARCH_SPACES = {
+    'Logistic Regression': {
+        'clf__C': lambda rng: float(10 ** rng.uniform(-3, 2)),
+    },
+    'Decision Tree': {
+        'max_depth':        lambda rng: int(rng.integers(2, 21)),
+        'min_samples_leaf': lambda rng: int(rng.integers(1, 21)),
+    },
+    'Random Forest': {
+        'n_estimators':     lambda rng: int(rng.choice([10, 25, 50, 100, 200, 300])),
+        'max_depth':        lambda rng: rng.choice([None, 4, 6, 8, 12, 16]),
+        'min_samples_leaf': lambda rng: int(rng.integers(1, 11)),
+        'max_features':     lambda rng: rng.choice(['sqrt', 'log2', None]),
+    },
+    'K-Nearest Neighbors': {
+        'clf__n_neighbors': lambda rng: int(rng.integers(1, 32)),
+        'clf__weights':     lambda rng: str(rng.choice(['uniform', 'distance'])),
+    },
+    'Gradient Boosting': {
+        'n_estimators':  lambda rng: int(rng.choice([25, 50, 100, 200])),
+        'learning_rate': lambda rng: float(10 ** rng.uniform(-2, 0)),
+        'max_depth':     lambda rng: int(rng.integers(1, 6)),
+    },
+}
+
+
+def _plain(value):
+    """numpy scalars -> Python scalars so configs are JSON-able and hash stably."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def sample_configs(n_candidates, seed):
+    rng      = np.random.default_rng(seed)
+    families = list(SEARCH_SPACES)
+    configs  = []
+    for i in range(n_candidates):
+        family = families[i % len(families)]
+        params = {k: _plain(draw(rng)) for k, draw in SEARCH_SPACES[family].items()}
+        configs.append({'family': family, 'params': params})
+    return configs
+
+
+# ── Score cache ──────────────────────────────────────────────────────────────
+
+class ScoreCache:
+    """Append-only JSON-lines store of per-(config, fold, resource) scores."""
+
+    def __init__(self, path):
+        self.path    = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:   # torn write from an interrupted run
+                        continue
+                    self.entries[rec['key']] = rec
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._fh = open(path, 'a')
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, rec):
+        self.entries[rec['key']] = rec
+        self._fh.write(json.dumps(rec) + '\n')
+        self._fh.flush()
+
+    def close(self):
+        self._fh.close()
+
+
+def _job_key(data_hash, config, fold, n_splits, resource, seed):
+    blob = json.dumps([data_hash, config, fold, n_splits, resource, seed], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+# ── Scoring ──────────────────────────────────────────────────────────────────
+
+def _score_job(module_name, config, X_tr, y_tr, X_val, y_val):
+    """Fits one config on one fold; runs in a worker process."""
+    module = TASKS[module_name]
+    model  = clone(module.MODELS[config['family']]).set_params(**config['params'])
+    t0     = time.perf_counter()
+    model.fit(X_tr, y_tr)
+    fit_s  = time.perf_counter() - t0
+    t0     = time.perf_counter()
+    y_pred = model.predict(X_val)
+    pred_s = time.perf_counter() - t0
+    return {
+        'f1':         float(f1_score(y_val, y_pred, average='weighted')),
+        'latency_us': pred_s / len(X_val) * 1e6,
+        'fit_s':      fit_s,
+        'size_kb':    len(pickle.dumps(model)) / 1024,
+    }
+
+
+def objective(stats, f1_target, latency_weight):
+    """Quality/latency trade-off: F1 counts up to the target, then latency decides."""
+    return min(stats['f1'], f1_target) - latency_weight * np.log10(1 + stats['latency_us'])
+
+
+def _subsample(X, y, n, seed):
+    if n >= len(X):
+        return X, y
+    idx, _ = train_test_split(np.arange(len(X)), train_size=n, stratify=y, random_state=seed)
+    return X[idx], y[idx]
+
+
+def successive_halving(task, X, y, configs, cache, factor=3, min_resources=None,
+                       n_splits=3, jobs=None, seed=42, f1_target=0.9,
+                       latency_weight=0.01, log=print):
+    """Runs halving rounds; returns the final round's per-config mean stats."""
+    data_hash  = hashlib.sha1(np.ascontiguousarray(X).tobytes() + y.tobytes()).hexdigest()[:16]
+    n_rounds   = max(1, int(np.ceil(np.log(len(configs)) / np.log(factor))))
+    min_res    = min_resources or max(n_splits * 20, len(X) // factor ** (n_rounds - 1))
+    candidates = list(configs)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for rnd in range(n_rounds):
+            resource = len(X) if rnd == n_rounds - 1 else min(len(X), min_res * factor ** rnd)
+            X_r, y_r = _subsample(X, y, resource, seed)
+            folds    = list(StratifiedKFold(n_splits=n_splits, shuffle=True,
+                                            random_state=seed).split(X_r, y_r))
+
+            scores, pending, cached = {}, {}, 0
+            for ci, config in enumerate(candidates):
+                for fi, (tr, va) in enumerate(folds):
+                    key = _job_key(data_hash, config, fi, n_splits, resource, seed)
+                    rec = cache.get(key)
+                    if rec is not None:
+                        scores.setdefault(ci, []).append(rec['stats'])
+                        cached += 1
+                        continue
+                    fut = pool.submit(_score_job, task, config,
+                                      X_r[tr], y_r[tr], X_r[va], y_r[va])
+                    pending[fut] = (ci, key)
+
+            for fut in as_completed(pending):
+                ci, key = pending[fut]
+                stats   = fut.result()
+                cache.put({'key': key, 'config': candidates[ci], 'stats': stats})
+                scores.setdefault(ci, []).append(stats)
+
+            summary = []
+            for ci, config in enumerate(candidates):
+                mean = {k: float(np.mean([s[k] for s in scores[ci]])) for k in scores[ci][0]}
+                mean['objective'] = objective(mean, f1_target, latency_weight)
+                summary.append((config, mean))
+            summary.sort(key=lambda cm: cm[1]['objective'], reverse=True)
+            log(f"  round {rnd + 1}/{n_rounds}: {len(candidates):>3} configs x {n_splits} folds"
+                f" on {resource:>5} rows  ({cached} cached, {len(pending)} fitted)")
+
+            if rnd < n_rounds - 1:
+                keep       = max(1, int(np.ceil(len(candidates) / factor)))
+                candidates = [c for c, _ in summary[:keep]]
+    return summary
+
+
+def select(summary, f1_target):
+    """Smallest (then fastest) config meeting the target, else the best F1."""
+    meeting = [cm for cm in summary if cm[1]['f1'] >= f1_target]
+    if meeting:
+        return min(meeting, key=lambda cm: (cm[1]['size_kb'], cm[1]['latency_us']))
+    return max(summary, key=lambda cm: cm[1]['f1'])
+
+
+# ── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('task', choices=sorted(TASKS))
+    parser.add_argument('--f1-target', type=float, default=0.80)
+    parser.add_argument('--latency-weight', type=float, default=0.01,
+                        help='objective penalty per decade of per-row latency (us)')
+    parser.add_argument('--n-candidates', type=int, default=60)
+    parser.add_argument('--factor', type=int, default=3)
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    args = parser.parse_args()
+
+    module = TASKS[args.task]
+    X, y, class_names, _ = module.load_and_preprocess(module.DATASET)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=module.TEST_SIZE, random_state=module.RANDOM_STATE, stratify=y)
+
+    configs = sample_configs(args.n_candidates, args.seed)
+    cache   = ScoreCache(os.path.join(args.cache_dir, f'{args.task}.jsonl'))
+    print(f"Tuning '{args.task}': {len(configs)} configs, factor {args.factor}, "
+          f"F1 target {args.f1_target:.2f}")
+    try:
+        summary = successive_halving(args.task, X_train, y_train, configs, cache,
+                                     factor=args.factor, n_splits=args.folds, jobs=args.jobs,
+                                     seed=args.seed, f1_target=args.f1_target,
+                                     latency_weight=args.latency_weight)
+    finally:
+        cache.close()
+
+    print(f"\n{'Model':<22} {'Params':<58} {'CV F1':>6} {'us/row':>7} {'KB':>8} {'Obj':>7}")
+    for config, m in summary:
+        params = json.dumps(config['params'])[:58]
+        print(f"{config['family']:<22} {params:<58} {m['f1']:>6.3f} {m['latency_us']:>7.1f}"
+              f" {m['size_kb']:>8.1f} {m['objective']:>7.3f}")
+
+    best, stats = select(summary, args.f1_target)
+    model = clone(module.MODELS[best['family']]).set_params(**best['params'])
+    model.fit(X_train, y_train)
+    test_f1 = f1_score(y_test, model.predict(X_test), average='weighted')
+    met     = 'meets' if stats['f1'] >= args.f1_target else 'misses'
+    print(f"\n  Selected: {best['family']} {json.dumps(best['params'])}")
+    print(f"  CV F1 {stats['f1']:.3f} ({met} target) | test F1 {test_f1:.3f} | "
+          f"{stats['latency_us']:.1f} us/row | {stats['size_kb']:.1f} KB\n")
+
+    with open(os.path.join(args.cache_dir, f'{args.task}_best.json'), 'w') as f:
+        json.dump({'config': best, 'cv': stats, 'test_f1': test_f1,
+                   'f1_target': args.f1_target}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Monte-Carlo weight projection from the plan's energy balance.
+
+Each simulated path follows the plan's daily target with its own adherence,
+and the body adapts to the imbalance:
+  - adherence: a per-path mean (clipped normal) plus week-to-week noise. A
+    non-adherent share of the week drifts back to maintenance, so intake is
+    target + (1 - adherence) x (TDEE0 - target) + noise. The weekly adherence
+    noise and the intake noise are both normal, so one draw covers both;
+  - expenditure: TDEE at the current weight, including the workout
+    schedule's burn (`energy_targets` and the burn are piecewise linear in
+    weight; slope k kcal/kg is taken at the starting weight), minus
+    metabolic adaptation. Adaptation is a
+    per-path share of the planned gap that phases in over a few weeks. In a
+    deficit it lowers expenditure; in a surplus it raises it;
+  - 7,700 kcal per kg of body weight.
+
+With x_t the weight change after t weeks, each week is
+x_{t+1} = r x_t + b_t, where r = 1 - 7k / 7700 and b_t is the week's imbalance
+at the starting weight. So x_t = r^(t-1) * sum_{s<t} b_s r^(-s): one scaled
+cumsum over all paths and weeks at once, with no Python loop over either.
+Only the quantile bands are kept.
+
+`WeightProjector` memoizes projections per (profile, target, horizon,
+workout burn).
+`fan_coordinates` maps a projection onto canvas pixels for the dashboard's
+fan chart.
+
+`python weight_projection.py` times projections over random profiles and
+checks them against a week-by-week loop on the same random draws.
+"""
+import argparse
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from health_app import energy_targets
+
+KCAL_PER_KG       = 7700.0
+N_PATHS           = 4000
+MIN_WEEKS         = 12
+MAX_WEEKS         = 52
+ADHERENCE_MEAN    = 0.80    # share of the planned gap a path keeps, on average
+ADHERENCE_SD      = 0.15    # between paths
+WEEKLY_SD         = 0.10    # week to week, within a path
+INTAKE_SD         = 100.0   # kcal/day, weekly mean intake noise
+ADAPTATION_MEAN   = 0.10    # share of the planned gap offset by adaptation
+ADAPTATION_SD     = 0.05
+ADAPTATION_WEEKS  = 4.0     # time constant of the adaptation phase-in
+QUANTILES         = (0.05, 0.25, 0.50, 0.75, 0.95)
+MEMO_SIZE         = 16
+RANDOM_STATE      = 0
+
+# raw_info fields a projection depends on
+PROFILE_FIELDS = ('age', 'gender', 'weight_kg', 'height_cm', 'activity_level', 'goal')
+
+
+def _draws(rng, n_paths, weeks):
+    """Random inputs of every path: (mean adherence, weekly noise, adaptation share)."""
+    adherence = np.clip(rng.normal(ADHERENCE_MEAN, ADHERENCE_SD, (n_paths, 1)), 0.0, 1.0)
+    noise     = rng.standard_normal((n_paths, weeks), dtype=np.float32)
+    adapt     = np.clip(rng.normal(ADAPTATION_MEAN, ADAPTATION_SD, (n_paths, 1)), 0.0, None)
+    return adherence.astype(np.float32), noise, adapt.astype(np.float32)
+
+
+def _weekly_imbalance(draws, tdee, target):
+    """(paths, weeks) kcal/day of each week at the starting weight."""
+    adherence, noise, adapt = draws
+    gap   = tdee - target                           # planned deficit (> 0) or surplus (< 0)
+    sd    = np.hypot(WEEKLY_SD * gap, INTAKE_SD)    # adherence and intake noise, combined
+    phase = 1.0 - np.exp(-np.arange(1, noise.shape[1] + 1) / ADAPTATION_WEEKS)
+    # intake - tdee, where intake = target + (1 - adherence) * gap + noise
+    kept  = adherence - adapt * phase.astype(np.float32)
+    return np.float32(sd) * noise - kept * np.float32(gap)
+
+
+def trajectories(weight, tdee, slope, target, draws):
+    """(paths, weeks + 1) simulated weights; column 0 is the starting weight."""
+    imbalance = _weekly_imbalance(draws, tdee, target)
+    n, weeks  = imbalance.shape
+    r         = 1.0 - 7.0 * slope / KCAL_PER_KG
+    b         = 7.0 * imbalance / KCAL_PER_KG       # kg / week at the starting weight
+    powers    = (r ** np.arange(weeks)).astype(np.float32)
+    out       = np.empty((n, weeks + 1), dtype=np.float32)
+    out[:, 0] = weight
+    out[:, 1:] = weight + np.cumsum(b / powers, axis=1) * powers
+    return out
+
+
+class WeightProjection:
+    """Quantile bands of simulated weight, one column per week."""
+
+    def __init__(self, paths, tdee, target):
+        self.weeks     = np.arange(paths.shape[1])
+        self.quantiles = QUANTILES
+        self.bands     = np.quantile(paths, QUANTILES, axis=0)    # (len(QUANTILES), weeks + 1)
+        self.start     = float(paths[0, 0])
+        self.tdee      = float(tdee)
+        self.target    = int(target)
+        self.n_paths   = len(paths)
+
+    @property
+    def median(self):
+        return self.bands[QUANTILES.index(0.50)]
+
+    def summary(self, week=None):
+        """'-6.2 kg by week 26 (90% band -8.9 to -3.1 kg)'."""
+        week   = self.weeks[-1] if week is None else week
+        change = np.round(self.bands[:, week] - self.start, 1) + 0.0   # no '-0.0'
+        return (f"{change[QUANTILES.index(0.50)]:+.1f} kg by week {week}"
+                f" (90% band {change[0]:+.1f} to {change[-1]:+.1f} kg)")
+
+
+def project(profile, target_cals=None, weeks=26, exercise_kcal=0.0, n_paths=N_PATHS,
+            seed=RANDOM_STATE):
+    """A `WeightProjection` for SetupView's `raw_info` over `weeks` weeks.
+
+    `target_cals` defaults to the plan's target for the profile's goal.
+    `exercise_kcal` is the workout schedule's daily net burn
+    (workout_schedule.py); it scales with body weight like the burn it counts.
+    """
+    p      = profile
+    weeks  = int(np.clip(weeks, MIN_WEEKS, MAX_WEEKS))
+    weight = np.array([p['weight_kg'], p['weight_kg'] + 1.0])
+    _, tdee, target = energy_targets(weight, p['height_cm'], p['age'], p['gender'],
+                                     p['activity_level'], p['goal'],
+                                     exercise_kcal=exercise_kcal * weight / weight[0])
+    target = target[0] if target_cals is None else target_cals
+    draws  = _draws(np.random.default_rng(seed), n_paths, weeks)
+    paths  = trajectories(p['weight_kg'], tdee[0], tdee[1] - tdee[0], target, draws)
+    return WeightProjection(paths, tdee[0], target)
+
+
+class WeightProjector:
+    """Memoized `project()` calls, keyed by the profile, target, horizon and burn."""
+
+    def __init__(self, maxsize=MEMO_SIZE, n_paths=N_PATHS):
+        self.maxsize = maxsize
+        self.n_paths = n_paths
+        self.builds  = 0
+        self.hits    = 0
+        self._memo   = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def project(self, profile, target_cals=None, weeks=26, exercise_kcal=0.0):
+        key = (tuple(profile[f] for f in PROFILE_FIELDS), target_cals, weeks, exercise_kcal)
+        with self._lock:
+            projection = self._memo.get(key)
+            if projection is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return projection
+        projection = project(profile, target_cals, weeks, exercise_kcal, self.n_paths)
+        with self._lock:
+            self._memo[key] = projection
+            self.builds += 1
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+        return projection
+
+
+def fan_coordinates(projection, width, height, pad=(48, 12, 12, 28)):
+    """Canvas geometry of a fan chart: (bands, median, y range).
+
+    `pad` is (left, top, right, bottom) pixels. `bands` holds one flat
+    [x0, y0, x1, y1, ...] polygon per quantile pair, outermost first;
+    `median` is a flat polyline. The y range is (low kg, high kg).
+    """
+    left, top, right, bottom = pad
+    lo, hi = projection.bands[0].min(), projection.bands[-1].max()
+    margin = max(0.5, 0.05 * (hi - lo))
+    lo, hi = lo - margin, hi + margin
+    x = left + projection.weeks / projection.weeks[-1] * (width - left - right)
+    y = top + (hi - projection.bands) / (hi - lo) * (height - top - bottom)
+    n = len(QUANTILES)
+    bands = []
+    for i in range(n // 2):
+        ring = np.concatenate([np.stack([x, y[i]], axis=1),
+                               np.stack([x, y[n - 1 - i]], axis=1)[::-1]])
+        bands.append(ring.ravel().tolist())
+    median = np.stack([x, y[n // 2]], axis=1).ravel().tolist()
+    return bands, median, (lo, hi)
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def _trajectories_loop(weight, tdee, slope, target, draws):
+    """Week-by-week reference for `trajectories` on the same draws."""
+    imbalance = _weekly_imbalance(draws, tdee, target)
+    out       = np.empty((imbalance.shape[0], imbalance.shape[1] + 1))
+    for i, row in enumerate(imbalance):
+        w = out[i, 0] = weight
+        for t, kcal in enumerate(row):
+            burn = tdee + slope * (w - weight)
+            w   += 7.0 * (kcal + tdee - burn) / KCAL_PER_KG
+            out[i, t + 1] = w
+    return out
+
+
+def benchmark(n_profiles=200, n_paths=N_PATHS, weeks=MAX_WEEKS, seed=0):
+    from what_if import _random_profile
+
+    rng       = np.random.default_rng(seed)
+    profiles  = [_random_profile(rng) for _ in range(n_profiles)]
+    projector = WeightProjector(maxsize=n_profiles, n_paths=n_paths)
+    cold, warm, geometry = [], [], []
+    for p in profiles:
+        t0 = time.perf_counter()
+        projection = projector.project(p, weeks=weeks)
+        cold.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        projector.project(p, weeks=weeks)
+        warm.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        fan_coordinates(projection, 900, 260)
+        geometry.append(time.perf_counter() - t0)
+
+    # Same draws through the week-by-week loop, on a few profiles
+    loop, error = [], 0.0
+    for p in profiles[:5]:
+        _, tdee, target = energy_targets(np.array([p['weight_kg'], p['weight_kg'] + 1.0]),
+                                         p['height_cm'], p['age'], p['gender'],
+                                         p['activity_level'], p['goal'])
+        draws = _draws(np.random.default_rng(seed), n_paths, weeks)
+        args  = (p['weight_kg'], tdee[0], tdee[1] - tdee[0], target[0], draws)
+        t0 = time.perf_counter()
+        reference = _trajectories_loop(*args)
+        loop.append(time.perf_counter() - t0)
+        error = max(error, np.abs(trajectories(*args) - reference).max())
+
+    ms = lambda v, q: np.percentile(v, q) * 1e3
+    print(f"\n=== Weight projection: {n_profiles} profiles, {n_paths:,} paths x {weeks} weeks ===")
+    print(f"\n  Projection (cold):   p50 {ms(cold, 50):7.2f} ms   max {ms(cold, 100):7.2f} ms"
+          f"   ({n_paths * weeks / np.median(cold) / 1e6:.0f}M path-weeks/s)")
+    print(f"  Projection (memo):   p50 {ms(warm, 50):7.3f} ms")
+    print(f"  Fan geometry:        p50 {ms(geometry, 50):7.3f} ms")
+    print(f"  Week-by-week loop:   p50 {ms(loop, 50):7.0f} ms"
+          f"   (max |difference| {error:.1e} kg)")
+
+    by_goal = {}
+    for p in profiles:
+        change = projector.project(p, weeks=weeks).median[-1] - p['weight_kg']
+        by_goal.setdefault(p['goal'], []).append(change)
+    print(f"\n  Median change at week {weeks} by goal:")
+    for goal, changes in sorted(by_goal.items()):
+        print(f"    {goal:<16} {np.round(np.median(changes), 1) + 0.0:+6.1f} kg   ({len(changes)} profiles)")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--paths', type=int, default=N_PATHS)
+    parser.add_argument('--weeks', type=int, default=MAX_WEEKS)
+    args = parser.parse_args()
+    benchmark(args.profiles, args.paths, args.weeks)
+
+
+if __name__ == '__main__':
+    main()
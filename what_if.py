@@ -0,0 +1,309 @@
+"""What-if grids: the plan at every weight / weekly-exercise slider position.
+
+For a base profile (SetupView's `raw_info` and its clinical defaults), every
+slider combination is built as one encoded matrix:
+  - diet: W weights x E exercise hours (Weight_kg, BMI and
+    Weekly_Exercise_Hours vary; every other column is the base row);
+  - workout: W weights (the workout forest has no exercise column);
+  - joint model, when one is live: W x E rows answer both targets.
+Each forest scores its matrix in one `predict_proba` call (`score_batch`).
+`build_schedules` (each cell's workout burn), `energy_targets` and
+`macro_grams` then run once over the whole grid. When the
+rule table answers the profile's categorical fields (3.12), the rule answer
+fills the grid, as it would for `predict`. A slider move is then an index
+lookup into the finished arrays.
+
+`WhatIfEngine` memoizes grids per (profile, live model versions) in a small
+LRU. Revisiting a profile costs nothing, and a hot-swapped model (3.14)
+gets a fresh grid.
+
+`python what_if.py` builds grids for random profiles and times the slider
+moves against scoring each move live. It also checks the grid against live
+predictions.
+"""
+import argparse
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from health_app import CLINICAL_DEFAULTS, energy_targets, macro_grams
+from workout_schedule import build_schedules
+
+WEIGHT_SPAN   = 20.0   # kg either side of the profile's weight
+WEIGHT_STEP   = 0.5
+MIN_WEIGHT    = 30.0
+EXERCISE_MAX  = 20.0   # hours / week
+EXERCISE_STEP = 0.5
+MEMO_SIZE     = 16     # grids kept (profile x model versions)
+FRAME_BUDGET  = 1 / 60
+
+# raw_info fields a grid depends on (not the name)
+PROFILE_FIELDS = ('age', 'gender', 'weight_kg', 'height_cm', 'disease', 'severity',
+                  'weekly_exercise', 'activity_level', 'goal')
+
+
+def weight_axis(weight):
+    """Slider positions around `weight`; the profile's own weight is on the grid."""
+    steps = np.arange(-WEIGHT_SPAN, WEIGHT_SPAN + WEIGHT_STEP / 2, WEIGHT_STEP)
+    axis  = weight + steps
+    return axis[axis >= MIN_WEIGHT]
+
+
+def exercise_axis(hours):
+    """0 .. EXERCISE_MAX hours in EXERCISE_STEP steps, plus the profile's own value."""
+    grid = np.arange(0.0, max(EXERCISE_MAX, hours) + EXERCISE_STEP / 2, EXERCISE_STEP)
+    return np.union1d(grid, [hours])
+
+
+def _nearest(axis, value):
+    i = int(np.clip(np.searchsorted(axis, value), 1, len(axis) - 1))
+    return i if axis[i] - value < value - axis[i - 1] else i - 1
+
+
+def _vary(recommender, base, weights, height, exercise=None):
+    """`base` (one encoded row) repeated for every weight (x exercise value)."""
+    cols = recommender._FEATURE_COLS
+    E    = 1 if exercise is None else len(exercise)
+    X    = np.repeat(np.asarray(base, dtype=np.float64), len(weights) * E, axis=0)
+    w    = np.repeat(weights, E)
+    X[:, cols.index('Weight_kg')] = w
+    X[:, cols.index('BMI')]       = w / ((height / 100) ** 2)   # as in _build_features
+    if exercise is not None:
+        X[:, cols.index('Weekly_Exercise_Hours')] = np.tile(exercise, len(weights))
+    return X
+
+
+def _shaped(answer, shape):
+    """(labels, confidences) as arrays of `shape`; a rule hit is one scalar pair."""
+    labels, conf = answer
+    if np.ndim(conf) == 0:
+        return np.full(shape, labels, dtype=object), np.full(shape, float(conf))
+    return np.asarray(labels, dtype=object).reshape(shape), np.asarray(conf).reshape(shape)
+
+
+class WhatIfGrid:
+    """Every slider position of one profile, precomputed; `at()` is a lookup."""
+
+    def __init__(self, profile, clinical, diet=None, workout=None, joint=None):
+        p = profile
+        self.weights  = weight_axis(p['weight_kg'])
+        self.exercise = exercise_axis(p['weekly_exercise'])
+        W, E          = len(self.weights), len(self.exercise)
+        height        = p['height_cm']
+
+        self.bmi = self.weights / ((height / 100) ** 2)
+
+        if joint is not None:
+            base = joint._build_features(p['age'], p['weight_kg'], height, p['disease'],
+                                         p['gender'], p['activity_level'], p['goal'],
+                                         p['severity'], clinical['cholesterol'], clinical['bp'],
+                                         clinical['glucose'], p['weekly_exercise'])
+            hit  = joint._rules_for(p['disease'], p['gender'], p['activity_level'], p['goal'],
+                                    p['severity'])
+            answers = hit if hit is not None else joint.score_batch(
+                _vary(joint, base, self.weights, height, self.exercise))
+            (self.diet_rec, self.diet_conf), (self.workout, self.workout_conf) = (
+                _shaped(answer, (W, E)) for answer in answers)
+            self.rows_scored = 0 if hit is not None else W * E
+        else:
+            base = diet._build_features(p['age'], p['weight_kg'], height, p['disease'],
+                                        p['gender'], p['activity_level'], p['severity'],
+                                        clinical['cholesterol'], clinical['bp'],
+                                        clinical['glucose'], p['weekly_exercise'])
+            hit  = diet._rules_for(p['disease'], p['gender'], p['activity_level'], p['severity'])
+            self.diet_rec, self.diet_conf = _shaped(
+                hit if hit is not None else diet.score_batch(
+                    _vary(diet, base, self.weights, height, self.exercise)), (W, E))
+            self.rows_scored = 0 if hit is not None else W * E
+
+            base = workout._build_features(p['age'], p['weight_kg'], height, p['disease'],
+                                           p['gender'], p['activity_level'], p['goal'])
+            hit  = workout._rules_for(p['disease'], p['gender'], p['activity_level'], p['goal'])
+            labels, conf = _shaped(
+                hit if hit is not None else workout.score_batch(
+                    _vary(workout, base, self.weights, height)), (W, 1))
+            # No exercise column: one answer per weight, shared along the exercise axis
+            self.workout      = np.broadcast_to(labels, (W, E))
+            self.workout_conf = np.broadcast_to(conf, (W, E))
+            self.rows_scored += 0 if hit is not None else W
+
+        # Every cell's workout schedule in one call; its burn moves TDEE (W, E)
+        weights = np.broadcast_to(self.weights[:, None], (W, E))
+        burn = build_schedules(self.workout.ravel(), weights.ravel(),
+                               np.tile(self.exercise, W)).exercise_kcal.reshape(W, E)
+        _, self.tdee, self.target_cals = energy_targets(
+            weights, height, p['age'], p['gender'], p['activity_level'], p['goal'],
+            exercise_kcal=burn)
+        self.macros = macro_grams(self.target_cals, self.diet_rec)             # (W, E, 3)
+
+    def at(self, weight, weekly_exercise):
+        """The plan at the slider position nearest (weight, weekly_exercise)."""
+        i = _nearest(self.weights, weight)
+        j = _nearest(self.exercise, weekly_exercise)
+        protein, fat, carbs = self.macros[i, j].tolist()
+        return {
+            'weight_kg':          float(self.weights[i]),
+            'weekly_exercise':    float(self.exercise[j]),
+            'bmi':                float(self.bmi[i]),
+            'target_cals':        int(self.target_cals[i, j]),
+            'macros':             {'Protein': protein, 'Fats': fat, 'Carbs': carbs},
+            'diet_rec':           self.diet_rec[i, j],
+            'diet_confidence':    float(self.diet_conf[i, j]),
+            'workout_intensity':  self.workout[i, j],
+            'workout_confidence': float(self.workout_conf[i, j]),
+        }
+
+
+class WhatIfEngine:
+    """Memoized `WhatIfGrid`s over the live models of a `LiveModels` registry."""
+
+    def __init__(self, models, maxsize=MEMO_SIZE):
+        self.models  = models
+        self.maxsize = maxsize
+        self.builds  = 0
+        self.hits    = 0
+        self._memo   = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def grid(self, profile, clinical=None):
+        """The grid for `profile` (SetupView's raw_info) with the live models."""
+        if clinical is None:
+            clinical = CLINICAL_DEFAULTS.get(profile['disease'], CLINICAL_DEFAULTS['None'])
+        joint = self.models.handle('joint').current
+        snapshots = ({'joint': joint} if joint is not None else
+                     {task: self.models.handle(task).current for task in ('diet', 'workout')})
+        key = (tuple(profile[f] for f in PROFILE_FIELDS), tuple(sorted(clinical.items())),
+               tuple((task, s.version) for task, s in snapshots.items()))
+        with self._lock:
+            grid = self._memo.get(key)
+            if grid is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return grid
+        grid = WhatIfGrid(profile, clinical,
+                          **{task: s.recommender for task, s in snapshots.items()})
+        with self._lock:
+            self._memo[key] = grid
+            self.builds += 1
+            while len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+        return grid
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def _random_profile(rng):
+    return {
+        'age':             int(rng.integers(18, 81)),
+        'gender':          str(rng.choice(['Male', 'Female'])),
+        'weight_kg':       float(np.round(rng.uniform(50, 130), 1)),
+        'height_cm':       float(np.round(rng.uniform(150, 200), 1)),
+        'disease':         str(rng.choice(['None', 'Diabetes', 'Hypertension', 'Obesity'])),
+        'severity':        str(rng.choice(['Mild', 'Moderate', 'Severe'])),
+        'weekly_exercise': float(np.round(rng.uniform(0, 10), 1)),
+        'activity_level':  str(rng.choice(['Sedentary', 'Lightly Active', 'Moderately Active',
+                                           'Very Active', 'Extra Active'])),
+        'goal':            str(rng.choice(['Lose Weight', 'Maintain Weight', 'Gain Weight'])),
+    }
+
+
+def _live_move(diet, workout, profile, clinical, weight, hours):
+    """One slider move scored directly: two predictions, the schedule, the energy maths."""
+    p = profile
+    diet_rec, diet_conf = diet.predict_with_confidence(
+        p['age'], weight, p['height_cm'], p['disease'], gender=p['gender'],
+        activity_level=p['activity_level'], severity=p['severity'],
+        cholesterol=clinical['cholesterol'], blood_pressure=clinical['bp'],
+        glucose=clinical['glucose'], weekly_exercise=hours)
+    intensity, workout_conf = workout.predict(p['age'], weight, p['height_cm'], p['disease'],
+                                              gender=p['gender'],
+                                              activity_level=p['activity_level'], goal=p['goal'])
+    burn = build_schedules([intensity], [weight], [hours]).exercise_kcal[0]
+    _, _, target = energy_targets(weight, p['height_cm'], p['age'], p['gender'],
+                                  p['activity_level'], p['goal'], exercise_kcal=burn)
+    return diet_rec, diet_conf, intensity, workout_conf, int(target), macro_grams(target, diet_rec)
+
+
+def benchmark(n_profiles=20, n_moves=2000, seed=0):
+    import shutil
+    import tempfile
+
+    from model_snapshot import LiveModels
+
+    work   = tempfile.mkdtemp(prefix='what_if_')    # no saved joint model: two forests
+    models = LiveModels(artifact_dir=work)
+    try:
+        diet    = models.handle('diet').current.recommender
+        workout = models.handle('workout').current.recommender
+        engine  = WhatIfEngine(models)
+        rng     = np.random.default_rng(seed)
+
+        profiles = [_random_profile(rng) for _ in range(n_profiles)]
+        cold, warm, rows, grids = [], [], [], []
+        for p in profiles:
+            t0 = time.perf_counter()
+            grid = engine.grid(p)
+            cold.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            engine.grid(p)
+            warm.append(time.perf_counter() - t0)
+            rows.append(grid.rows_scored)
+            grids.append(grid)
+
+        moves = [(int(rng.integers(n_profiles)), float(rng.uniform(-WEIGHT_SPAN, WEIGHT_SPAN)),
+                  float(rng.uniform(0, EXERCISE_MAX))) for _ in range(n_moves)]
+        lookup = []
+        for k, dw, hours in moves:
+            t0 = time.perf_counter()
+            grids[k].at(profiles[k]['weight_kg'] + dw, hours)
+            lookup.append(time.perf_counter() - t0)
+
+        live, same_label, conf_dev, same_target = [], 0, 0.0, 0
+        checks = moves[:200]
+        for k, dw, hours in checks:
+            p, grid = profiles[k], grids[k]
+            cell = grid.at(p['weight_kg'] + dw, hours)
+            clinical = CLINICAL_DEFAULTS.get(p['disease'], CLINICAL_DEFAULTS['None'])
+            t0 = time.perf_counter()
+            d, dc, w, wc, target, _ = _live_move(diet, workout, p, clinical,
+                                                 cell['weight_kg'], cell['weekly_exercise'])
+            live.append(time.perf_counter() - t0)
+            same_label  += (d == cell['diet_rec']) + (w == cell['workout_intensity'])
+            conf_dev     = max(conf_dev, abs(dc - cell['diet_confidence']),
+                               abs(wc - cell['workout_confidence']))
+            same_target += target == cell['target_cals']
+    finally:
+        models.stop()
+        shutil.rmtree(work, ignore_errors=True)
+
+    ms = lambda v, q: np.percentile(v, q) * 1e3
+    print(f"\n=== What-if grids: {n_profiles} profiles, {len(grids[0].weights)} weights x"
+          f" {len(grids[0].exercise)} exercise values ===")
+    print(f"\n  Grid build (cold):   p50 {ms(cold, 50):7.2f} ms   max {ms(cold, 100):7.2f} ms"
+          f"   rows scored per grid: median {int(np.median(rows)):,}, max {max(rows):,}"
+          f" (rule hits score none)")
+    print(f"  Grid (memoized):     p50 {ms(warm, 50):7.3f} ms")
+    print(f"  Slider move, grid:   p50 {ms(lookup, 50):7.4f} ms   p99 {ms(lookup, 99):7.4f} ms"
+          f"   ({n_moves:,} moves)")
+    print(f"  Slider move, live:   p50 {ms(live, 50):7.2f} ms   p99 {ms(live, 99):7.2f} ms"
+          f"   (two predictions + schedule + energy maths)")
+    print(f"  Frame budget:        {FRAME_BUDGET * 1e3:.1f} ms")
+    print(f"\n  Agreement with live predictions on {len(checks)} moves:"
+          f" labels {same_label / (2 * len(checks)):.1%},"
+          f" calorie targets {same_target / len(checks):.1%},"
+          f" max |dConfidence| {conf_dev:.3f}")
+    print("  (live answers use early exit: displayed confidence within 0.05)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--profiles', type=int, default=20)
+    parser.add_argument('--moves', type=int, default=2000)
+    args = parser.parse_args()
+    benchmark(args.profiles, args.moves)
+
+
+if __name__ == '__main__':
+    main()
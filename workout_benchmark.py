@@ -1,4 +1,9 @@
+import argparse
+import json
+import pickle
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 warnings.filterwarnings('ignore')
 
 import matplotlib
@@ -9,26 +14,41 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.model_selection import train_test_split, cross_validate, StratifiedKFold
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, confusion_matrix
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.neighbors import KNeighborsClassifier
 
-DATASET      = 'workout_dataset.csv'
-TEST_SIZE    = 0.20
-RANDOM_STATE = 42
-CV_FOLDS     = 5
+import bench_pipelines
+import bench_store
+import calibration
+from bench_profiler import PhaseProfiler
+from permutation_importance import permutation_importance
+
+DATASET            = 'workout_dataset.csv'
+TEST_SIZE          = 0.20
+RANDOM_STATE       = 42
+CV_FOLDS           = 5
+IMPORTANCE_REPEATS = 10
+CALIBRATION_BINS   = 10
 
 FEATURE_NAMES = ['Age', 'Gender', 'Weight (kg)', 'Height (cm)', 'BMI',
                  'Disease Type', 'Activity Level', 'Goal']
 
+# Column positions of the label-encoded categoricals in X (one-hot in `scaled`)
+CATEGORICAL_IDX = [1, 5, 6, 7]
+
 MODELS = {
-    'Logistic Regression': LogisticRegression(max_iter=1000, random_state=RANDOM_STATE),
+    'Logistic Regression': bench_pipelines.scaled(
+        LogisticRegression(max_iter=1000, random_state=RANDOM_STATE),
+        CATEGORICAL_IDX, len(FEATURE_NAMES)),
     'Decision Tree':       DecisionTreeClassifier(random_state=RANDOM_STATE),
     'Random Forest':       RandomForestClassifier(n_estimators=100, random_state=RANDOM_STATE),
-    'K-Nearest Neighbors': KNeighborsClassifier(n_neighbors=7),
+    'K-Nearest Neighbors': bench_pipelines.scaled(
+        KNeighborsClassifier(n_neighbors=7, algorithm='kd_tree'),
+        CATEGORICAL_IDX, len(FEATURE_NAMES)),
     'Gradient Boosting':   GradientBoostingClassifier(n_estimators=100, random_state=RANDOM_STATE),
 }
 
@@ -66,48 +86,79 @@ def load_and_preprocess(filepath: str):
 
 # ── Evaluation ───────────────────────────────────────────────────────────────
 
-def evaluate_models(X_train, X_test, y_train, y_test):
+def _calibration(model, cv_run, X_train, y_train, y_test, proba):
+    """ECE and reliability curves of test confidence, raw and after an isotonic
+    map fitted on the CV folds' out-of-fold predictions (no extra fits)."""
+    if proba is None:
+        return {'ece': None, 'ece_calibrated': None,
+                'reliability': None, 'reliability_calibrated': None}
+    oof = np.full((len(y_train), len(model.classes_)), np.nan)
+    for est, idx in zip(cv_run['estimator'], cv_run['indices']['test']):
+        oof[np.ix_(idx, np.searchsorted(model.classes_, est.classes_))] = \
+            est.predict_proba(X_train[idx])
+    calibrator    = calibration.ConfidenceCalibrator().fit(oof, y_train, model.classes_)
+    conf, correct = calibration.top_confidence(proba, model.classes_, y_test)
+    out = {}
+    for suffix, c in (('', conf), ('_calibrated', calibrator(conf))):
+        out['ece' + suffix] = calibration.expected_calibration_error(c, correct, CALIBRATION_BINS)
+        out['reliability' + suffix] = np.vstack(
+            calibration.reliability_curve(c, correct, CALIBRATION_BINS))
+    return out
+
+
+def evaluate_models(X_train, X_test, y_train, y_test, profiler=None, importance_jobs=None,
+                    progress=None):
+    """`progress(done, total, unit)`, if given, is called as each model's folds finish."""
+    profiler = profiler or PhaseProfiler()
     cv = StratifiedKFold(n_splits=CV_FOLDS, shuffle=True, random_state=RANDOM_STATE)
     results = {}
 
-    for name, model in MODELS.items():
-        model.fit(X_train, y_train)
-        y_pred    = model.predict(X_test)
-        cv_scores = cross_val_score(model, X_train, y_train, cv=cv, scoring='f1_weighted')
-
-        if hasattr(model, 'predict_proba'):
-            proba    = model.predict_proba(X_test)
-            avg_conf = float(proba.max(axis=1).mean())
-        else:
-            avg_conf = None
-
-        results[name] = {
-            'model':     model,
-            'y_pred':    y_pred,
-            'accuracy':  accuracy_score(y_test, y_pred),
-            'f1':        f1_score(y_test, y_pred, average='weighted'),
-            'precision': precision_score(y_test, y_pred, average='weighted', zero_division=0),
-            'recall':    recall_score(y_test, y_pred, average='weighted', zero_division=0),
-            'cv_mean':   cv_scores.mean(),
-            'cv_std':    cv_scores.std(),
-            'cm':        confusion_matrix(y_test, y_pred),
-            'avg_conf':  avg_conf,
-        }
+    for i, (name, model) in enumerate(MODELS.items()):
+        with profiler.phase(f'fit {name}'):
+            fit_peak_mb   = bench_store.fit_peak_memory(model, X_train, y_train)
+            predict_times = bench_store.time_predict(model, X_test)
+            y_pred = model.predict(X_test)
+            proba  = model.predict_proba(X_test) if hasattr(model, 'predict_proba') else None
+        with profiler.phase(f'cv {name}'):
+            cv_run    = cross_validate(model, X_train, y_train, cv=cv, scoring='f1_weighted',
+                                       return_estimator=True, return_indices=True)
+            cv_scores = cv_run['test_score']
+        with profiler.phase(f'calibration {name}'):
+            calib = _calibration(model, cv_run, X_train, y_train, y_test, proba)
+        with profiler.phase(f'importance {name}'):
+            perm = permutation_importance(model, X_test, y_test, n_repeats=IMPORTANCE_REPEATS,
+                                          jobs=importance_jobs, seed=RANDOM_STATE)
+
+        with profiler.phase(f'metrics {name}'):
+            results[name] = {
+                'model':         model,
+                'y_pred':        y_pred,
+                'accuracy':      accuracy_score(y_test, y_pred),
+                'f1':            f1_score(y_test, y_pred, average='weighted'),
+                'precision':     precision_score(y_test, y_pred, average='weighted', zero_division=0),
+                'recall':        recall_score(y_test, y_pred, average='weighted', zero_division=0),
+                'cv_mean':       cv_scores.mean(),
+                'cv_std':        cv_scores.std(),
+                'cm':            confusion_matrix(y_test, y_pred),
+                'avg_conf':      float(proba.max(axis=1).mean()) if proba is not None else None,
+                **calib,
+                'importances':   perm['mean'],
+                'importance_ci': perm['ci'],
+                # Per-fold / per-repeat samples for run-to-run significance tests
+                'params':        model.get_params(),
+                'cv_scores':     cv_scores,
+                'cv_fit_times':  cv_run['fit_time'],
+                'predict_times': predict_times,
+                'predict_rows':  len(X_test),
+                'fit_peak_mb':   fit_peak_mb,
+                'model_kb':      len(pickle.dumps(model)) / 1024,
+            }
+        if progress:
+            progress((i + 1) * CV_FOLDS, len(MODELS) * CV_FOLDS, 'folds')
 
     return results
 
 
-def _get_importances(model):
-    if hasattr(model, 'feature_importances_'):
-        imp = model.feature_importances_
-    elif hasattr(model, 'coef_'):
-        imp = np.abs(model.coef_).mean(axis=0)
-    else:
-        return None
-    total = imp.sum()
-    return imp / total if total > 0 else imp
-
-
 # ── Plots ─────────────────────────────────────────────────────────────────────
 
 def _style_ax(ax, title):
@@ -120,7 +171,7 @@ def _style_ax(ax, title):
     ax.xaxis.set_tick_params(labelcolor=DIM, labelsize=8)
 
 
-def plot_comparison(results: dict, class_names, out_file='workout_benchmark.png'):
+def plot_comparison(results: dict, class_names, out_file='workout_benchmark.png', dpi=150):
     model_names  = list(results.keys())
     metric_specs = [
         ('Accuracy',           'accuracy'),
@@ -179,15 +230,16 @@ def plot_comparison(results: dict, class_names, out_file='workout_benchmark.png'
                 ax.text(c, r, str(cm[r, c]), ha='center', va='center',
                         color=txt_col, fontsize=11, fontweight='bold')
 
-    plt.savefig(out_file, dpi=150, bbox_inches='tight', facecolor=BG)
+    plt.savefig(out_file, dpi=dpi, bbox_inches='tight', facecolor=BG)
     plt.close(fig)
     print(f"  Chart saved -> {out_file}")
 
 
 def plot_feature_importance(results: dict, feature_names,
-                            out_file='workout_feature_importance.png'):
+                            out_file='workout_feature_importance.png', dpi=150):
     fig, axes = plt.subplots(1, 5, figsize=(24, 7), facecolor=BG)
-    fig.suptitle('Workout Intensity — Feature Importance per Model', color=TEXT,
+    fig.suptitle('Workout Intensity — Permutation Importance per Model '
+                 '(drop in weighted F1, 95% CI)', color=TEXT,
                  fontsize=18, fontweight='bold')
     fig.subplots_adjust(top=0.88, bottom=0.08, left=0.05, right=0.97, wspace=0.45)
 
@@ -196,17 +248,20 @@ def plot_feature_importance(results: dict, feature_names,
         ax.set_title(short, color=TEXT, fontsize=12, fontweight='bold', pad=10)
         ax.spines[:].set_visible(False)
 
-        importances = _get_importances(res['model'])
+        importances = res['importances']
         if importances is None:
-            ax.text(0.5, 0.5, 'Not\nApplicable\n(KNN)', ha='center', va='center',
+            ax.text(0.5, 0.5, 'Not\nAvailable', ha='center', va='center',
                     color=DIM, fontsize=13, transform=ax.transAxes)
             ax.set_xticks([])
             ax.set_yticks([])
             continue
 
         idx  = np.argsort(importances)
+        ci   = res.get('importance_ci')
         bars = ax.barh(range(len(feature_names)), importances[idx],
-                       color=color, edgecolor='none', height=0.6)
+                       color=color, edgecolor='none', height=0.6,
+                       xerr=None if ci is None else ci[idx],
+                       error_kw={'color': TEXT, 'linewidth': 1.0, 'capsize': 3})
         ax.set_yticks(range(len(feature_names)))
         ax.set_yticklabels([feature_names[i] for i in idx], color=DIM, fontsize=9)
         ax.xaxis.grid(True, color=GRID, alpha=0.6, linewidth=0.8)
@@ -216,25 +271,124 @@ def plot_feature_importance(results: dict, feature_names,
             ax.text(val + 0.005, bar.get_y() + bar.get_height() / 2,
                     f'{val:.3f}', va='center', color=TEXT, fontsize=8)
 
-    plt.savefig(out_file, dpi=150, bbox_inches='tight', facecolor=BG)
+    plt.savefig(out_file, dpi=dpi, bbox_inches='tight', facecolor=BG)
     plt.close(fig)
     print(f"  Chart saved -> {out_file}")
 
 
+def plot_reliability(results: dict, class_names, out_file='workout_calibration.png', dpi=150):
+    fig, axes = plt.subplots(1, 5, figsize=(24, 5.5), facecolor=BG)
+    fig.suptitle('Workout Intensity — Reliability (test set, raw vs. isotonic-calibrated)',
+                 color=TEXT, fontsize=18, fontweight='bold')
+    fig.subplots_adjust(top=0.82, bottom=0.12, left=0.05, right=0.97, wspace=0.3)
+
+    for ax, (name, res), color, short in zip(axes, results.items(), PALETTE, SHORT_NAMES):
+        _style_ax(ax, short)
+        ax.plot([0, 1], [0, 1], color=DIM, linestyle=':', linewidth=1)
+        if res.get('reliability') is None:
+            ax.text(0.5, 0.5, 'Not\nAvailable', ha='center', va='center',
+                    color=DIM, fontsize=13, transform=ax.transAxes)
+            continue
+        for key, style in (('', '--'), ('_calibrated', '-')):
+            mean_conf, accuracy, _ = np.asarray(res['reliability' + key], dtype=float)
+            label = f"{'raw' if not key else 'calibrated'} (ECE {res['ece' + key]:.3f})"
+            ax.plot(mean_conf, accuracy, style, marker='o', color=color if key else DIM,
+                    linewidth=1.6, markersize=4, label=label)
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1.05)
+        ax.set_xlabel('Confidence', color=DIM, fontsize=9)
+        ax.set_ylabel('Accuracy',   color=DIM, fontsize=9)
+        ax.legend(loc='upper left', fontsize=8, frameon=False)
+
+    plt.savefig(out_file, dpi=dpi, bbox_inches='tight', facecolor=BG)
+    plt.close(fig)
+    print(f"  Chart saved -> {out_file}")
+
+
+# ── Results persistence & rendering ──────────────────────────────────────────
+
+RESULTS_FILE = 'workout_results.json'
+
+# Chart name -> (plot function, output file stem); rendered from saved results
+CHARTS = {
+    'comparison':         (plot_comparison,         'workout_benchmark'),
+    'feature_importance': (plot_feature_importance, 'workout_feature_importance'),
+    'calibration':        (plot_reliability,        'workout_calibration'),
+}
+
+
+def save_results(results: dict, class_names, path=RESULTS_FILE):
+    """Writes the plain metrics (no fitted models) so charts can be redrawn later."""
+    models = {}
+    for name, res in results.items():
+        models[name] = {k: (v.tolist() if isinstance(v, np.ndarray) else v)
+                        for k, v in res.items() if k not in ('model', 'y_pred')}
+    with open(path, 'w') as f:
+        json.dump({'task': 'workout', 'dataset': DATASET,
+                   'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'cv_folds': CV_FOLDS,
+                   'class_names': list(class_names), 'feature_names': FEATURE_NAMES,
+                   'models': models}, f, indent=2, default=str)
+    print(f"  Results saved -> {path}")
+
+
+def load_results(path=RESULTS_FILE):
+    """Returns (results, class_names, feature_names) from `save_results` output."""
+    with open(path) as f:
+        data = json.load(f)
+    results = {}
+    for name, res in data['models'].items():
+        res['cm'] = np.asarray(res['cm'])
+        for key in ('importances', 'importance_ci', 'reliability', 'reliability_calibrated'):
+            if res.get(key) is not None:
+                res[key] = np.asarray(res[key])
+        results[name] = res
+    return results, data['class_names'], data['feature_names']
+
+
+def _render_chart(chart, results_path, out_file, dpi):
+    """Draws one chart from saved results; runs in a worker process."""
+    results, class_names, feature_names = load_results(results_path)
+    plot_fn, _ = CHARTS[chart]
+    labels = class_names if chart == 'comparison' else feature_names
+    plot_fn(results, labels, out_file=out_file, dpi=dpi)
+    return out_file
+
+
+def render_charts(results_path=RESULTS_FILE, dpi=150, fmt='png', jobs=None, profiler=None):
+    """Renders every chart, one figure per worker process.
+
+    With an enabled profiler the charts are drawn in-process instead, one
+    profiled phase per chart.
+    """
+    profiler = profiler or PhaseProfiler()
+    jobs_args = [(chart, results_path, f'{stem}.{fmt}', dpi)
+                 for chart, (_, stem) in CHARTS.items()]
+    if profiler.enabled or jobs == 1:
+        for args in jobs_args:
+            with profiler.phase(f'plot {args[0]}'):
+                _render_chart(*args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs or len(jobs_args)) as pool:
+        for future in [pool.submit(_render_chart, *args) for args in jobs_args]:
+            future.result()
+
+
 # ── Console summary ───────────────────────────────────────────────────────────
 
 def print_summary(results: dict):
     best   = max(results, key=lambda m: results[m]['f1'])
     header = (f"\n{'Model':<22} {'Accuracy':>9} {'Precision':>10} {'Recall':>8}"
-              f" {'F1':>8} {'Avg Conf':>9}  {'CV F1 (mean+/-std)':>20}")
+              f" {'F1':>8} {'Avg Conf':>9} {'ECE':>6} {'ECE cal':>8}  {'CV F1 (mean+/-std)':>20}")
     sep = "=" * len(header)
     print(f"\n{sep}\n{header}\n{sep}")
     for name, res in results.items():
         conf_str = f"{res['avg_conf']:>8.3f}" if res['avg_conf'] is not None else "     N/A"
+        ece_str  = (f"{res['ece']:>6.3f} {res['ece_calibrated']:>8.3f}"
+                    if res.get('ece') is not None else f"{'N/A':>6} {'N/A':>8}")
         marker   = "  << best" if name == best else ""
         print(
             f"{name:<22} {res['accuracy']:>9.3f} {res['precision']:>10.3f}"
-            f" {res['recall']:>8.3f} {res['f1']:>8.3f} {conf_str}  "
+            f" {res['recall']:>8.3f} {res['f1']:>8.3f} {conf_str} {ece_str}  "
             f"{res['cv_mean']:>6.3f} +/- {res['cv_std']:.3f}{marker}"
         )
     print(sep)
@@ -244,26 +398,69 @@ def print_summary(results: dict):
 # ── Entry point ───────────────────────────────────────────────────────────────
 
 def main():
-    print(f"Loading '{DATASET}'...")
-    X, y, class_names, encoders = load_and_preprocess(DATASET)
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
-    )
-
-    print(f"Samples -- total: {len(X)} | train: {len(X_train)} | test: {len(X_test)}")
-    print(f"Classes: {list(class_names)}")
-    print(f"\nTraining & evaluating ({CV_FOLDS}-fold CV on training set)...\n")
-
-    results = evaluate_models(X_train, X_test, y_train, y_test)
-
-    print_summary(results)
+    parser = argparse.ArgumentParser(description='Workout intensity model benchmark')
+    parser.add_argument('--profile', nargs='?', const='profiles/workout', metavar='DIR',
+                        help='profile each phase and write pstats, collapsed stacks and '
+                             'allocation reports to DIR (default: profiles/workout)')
+    parser.add_argument('--profile-top', type=int, default=20, metavar='N',
+                        help='allocation sites listed per phase (default: 20)')
+    parser.add_argument('--results', default=RESULTS_FILE, metavar='PATH',
+                        help=f'where evaluation results are saved (default: {RESULTS_FILE})')
+    parser.add_argument('--store', default=bench_store.DB_PATH, metavar='DB',
+                        help=f'SQLite run history (default: {bench_store.DB_PATH})')
+    parser.add_argument('--no-store', action='store_true', help='do not record this run')
+    parser.add_argument('--render-only', action='store_true',
+                        help='skip evaluation and redraw the charts from --results')
+    parser.add_argument('--no-plots', action='store_true', help='evaluate and save results only')
+    parser.add_argument('--dpi', type=int, default=150, help='raster chart resolution (default: 150)')
+    parser.add_argument('--format', choices=['png', 'svg', 'pdf'], default='png',
+                        help='chart file format; svg/pdf are vector (default: png)')
+    parser.add_argument('--importance-jobs', type=int, default=None, metavar='N',
+                        help='permutation-importance worker processes (default: all cores)')
+    parser.add_argument('--knn-index', default='models/workout_knn.joblib', metavar='PATH',
+                        help='where the fitted KNN pipeline and its KD-tree are saved')
+    parser.add_argument('--knn-scaling', action='store_true',
+                        help='time KD-tree vs. brute-force KNN queries on 1x/10x/50x data')
+    parser.add_argument('--plot-jobs', type=int, default=None, metavar='N',
+                        help='chart worker processes (default: one per chart; 1 = in-process)')
+    args     = parser.parse_args()
+    profiler = PhaseProfiler(args.profile, top_n=args.profile_top)
+
+    if not args.render_only:
+        print(f"Loading '{DATASET}'...")
+        with profiler.phase('load'):
+            X, y, class_names, encoders = load_and_preprocess(DATASET)
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y
+        )
 
-    print("Generating charts...")
-    plot_comparison(results, class_names)
-    plot_feature_importance(results, FEATURE_NAMES)
+        print(f"Samples -- total: {len(X)} | train: {len(X_train)} | test: {len(X_test)}")
+        print(f"Classes: {list(class_names)}")
+        print(f"\nTraining & evaluating ({CV_FOLDS}-fold CV on training set)...\n")
+
+        results = evaluate_models(X_train, X_test, y_train, y_test, profiler,
+                                  args.importance_jobs)
+
+        print_summary(results)
+        knn      = results['K-Nearest Neighbors']
+        size     = bench_pipelines.save_knn(knn['model'], X_train, y_train, args.knn_index)
+        query_us = np.median(knn['predict_times']) / len(X_test) * 1e6
+        print(f"  KNN index saved -> {args.knn_index} ({size / 1024:.0f} KB, "
+              f"batch query {query_us:.1f} us/row)")
+        if args.knn_scaling:
+            with profiler.phase('knn scaling'):
+                bench_pipelines.knn_latency_report(knn['model'], X_train, y_train, X_test)
+        save_results(results, class_names, args.results)
+        if not args.no_store:
+            run_id = bench_store.record_run(args.results, args.store)
+            print(f"  Run recorded -> {args.store} (run {run_id})")
+
+    if not args.no_plots:
+        print("Generating charts...")
+        render_charts(args.results, args.dpi, args.format, args.plot_jobs, profiler)
+    profiler.print_summary()
     print("\nDone.")
 
-
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Seven-day workout schedules with MET-based energy accounting.
+
+`build_schedules` expands each user's predicted intensity into a week:
+  - training days: within the intensity's frequency range (WORKOUT_PLANS
+    "days"), nearer the top the more the user already exercises. The days are
+    spread over the week by a fixed pattern per day count;
+  - session length: within the "minutes" range on the same scale, in
+    MINUTE_STEP steps;
+  - exercises: the intensity's four exercises in rotation;
+  - burn: MET x body weight (kg) x hours. The net burn, (MET - 1) x kg x h,
+    excludes the resting energy BMR already counts.
+
+`exercise_kcal` is the plan's net weekly burn per day. It goes into
+`energy_targets`, which counts only the part the activity multiplier does not
+already allow for: TDEE = max(BMR x multiplier, BMR x 1.2 + exercise_kcal).
+More reported hours only move the plan up its ranges, so the calorie target
+never falls as hours rise.
+
+Everything is array arithmetic over the roster: table lookups by intensity
+code, a (users, 7) day mask from a pattern table, and a cumulative count for
+the exercise rotation. One call schedules any number of users.
+
+`python workout_schedule.py` schedules a large random roster and compares it
+with a per-user loop.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from health_app import ACTIVITY_MULTIPLIERS, WORKOUT_PLANS, energy_targets
+
+DAYS             = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+# Compendium of Physical Activities values for the WORKOUT_PLANS exercises
+EXERCISE_METS    = {
+    'Walking':             3.5,
+    'Gentle Yoga':         2.5,
+    'Stretching':          2.3,
+    'Water Aerobics':      5.5,
+    'Brisk Walking / Jog': 5.0,
+    'Cycling':             6.8,
+    'Bodyweight Circuit':  3.8,
+    'Swimming Laps':       7.0,
+    'HIIT Intervals':      8.0,
+    'Weight Training':     5.0,
+    'Running':             9.8,
+    'CrossFit Circuit':    8.0,
+}
+HABIT_FULL_HOURS = 8.0     # weekly hours at which frequency / duration reach the top
+MINUTE_STEP      = 5
+
+INTENSITIES = tuple(WORKOUT_PLANS)
+_EXERCISES  = [[name for name, _ in WORKOUT_PLANS[i]['exercises']] for i in INTENSITIES]
+_METS       = np.array([[EXERCISE_METS[name] for name in row] for row in _EXERCISES])
+_DAY_RANGE  = np.array([WORKOUT_PLANS[i]['days'] for i in INTENSITIES])
+_MIN_RANGE  = np.array([WORKOUT_PLANS[i]['minutes'] for i in INTENSITIES])
+# (sessions, 7): training days for 0..7 sessions, spread over the week
+_PATTERNS   = np.zeros((8, 7), dtype=bool)
+for _n in range(1, 8):
+    _PATTERNS[_n, np.arange(_n) * 7 // _n] = True
+
+
+class Schedules:
+    """Weekly plans for a roster; per-day arrays are (users, 7)."""
+
+    def __init__(self, intensity, exercise, minutes, kcal, net_kcal, exercise_kcal):
+        self.intensity     = intensity       # (users,) index into INTENSITIES
+        self.exercise      = exercise        # index into the intensity's exercises; -1 rests
+        self.minutes       = minutes
+        self.kcal          = kcal            # gross burn per day
+        self.net_kcal      = net_kcal        # burn above resting
+        self.exercise_kcal = exercise_kcal   # (users,) daily net burn, for energy_targets
+
+    def __len__(self):
+        return len(self.intensity)
+
+    @property
+    def sessions(self):
+        return (self.exercise >= 0).sum(axis=1)
+
+    def day_plan(self, user=0):
+        """[{'day', 'exercise', 'minutes', 'kcal'}, ...] for one user; rest days have no exercise."""
+        names = _EXERCISES[self.intensity[user]]
+        return [{'day':      day,
+                 'exercise': names[e] if e >= 0 else None,
+                 'minutes':  int(m),
+                 'kcal':     int(round(k))}
+                for day, e, m, k in zip(DAYS, self.exercise[user], self.minutes[user],
+                                        self.kcal[user])]
+
+
+def build_schedules(intensity, weight, weekly_exercise):
+    """`Schedules` for arrays of predicted intensity, weight (kg) and weekly exercise (h).
+
+    Unknown intensities are planned as Moderate.
+    """
+    names  = np.asarray(intensity, dtype=object).astype(str)
+    code   = np.full(names.shape, INTENSITIES.index('Moderate'))
+    for i, level in enumerate(INTENSITIES):
+        code[names == level] = i
+    weight = np.asarray(weight, dtype=float)
+    hours  = np.asarray(weekly_exercise, dtype=float)
+
+    # How far up the ranges the user starts, from their current habit
+    level   = np.clip(hours / HABIT_FULL_HOURS, 0.0, 1.0)
+    lo, hi  = _DAY_RANGE[code].T
+    days    = lo + np.rint(level * (hi - lo)).astype(int)
+    lo, hi  = _MIN_RANGE[code].T
+    session = lo + np.rint(level * (hi - lo) / MINUTE_STEP).astype(int) * MINUTE_STEP
+
+    train    = _PATTERNS[days]                                        # (users, 7)
+    exercise = np.where(train, (np.cumsum(train, axis=1) - 1) % _METS.shape[1], -1)
+    minutes  = np.where(train, session[:, None], 0)
+    met      = np.where(train, _METS[code[:, None], np.maximum(exercise, 0)], 1.0)
+    kcal     = np.where(train, met * weight[:, None] * minutes / 60.0, 0.0)
+    net      = np.where(train, (met - 1.0) * weight[:, None] * minutes / 60.0, 0.0)
+    return Schedules(code, exercise, minutes, kcal, net, net.sum(axis=1) / 7.0)
+
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+
+def _schedule_loop(intensity, weight, hours):
+    """One user the direct way, for the benchmark: (minutes, kcal, exercise_kcal)."""
+    plan   = WORKOUT_PLANS.get(intensity, WORKOUT_PLANS['Moderate'])
+    level  = min(max(hours / HABIT_FULL_HOURS, 0.0), 1.0)
+    days   = plan['days'][0] + int(np.rint(level * (plan['days'][1] - plan['days'][0])))
+    span   = plan['minutes'][1] - plan['minutes'][0]
+    length = plan['minutes'][0] + int(np.rint(level * span / MINUTE_STEP)) * MINUTE_STEP
+    minutes, kcal, net, session = [0] * 7, [0.0] * 7, 0.0, 0
+    for k in range(days):
+        day = k * 7 // days
+        met = EXERCISE_METS[plan['exercises'][session % 4][0]]
+        minutes[day] = length
+        kcal[day]    = met * weight * length / 60.0
+        net         += (met - 1.0) * weight * length / 60.0
+        session     += 1
+    return minutes, kcal, net / 7.0
+
+
+def benchmark(n_users=100_000, seed=0):
+    rng       = np.random.default_rng(seed)
+    intensity = rng.choice(INTENSITIES, n_users)
+    weight    = rng.uniform(50, 130, n_users).round(1)
+    hours     = rng.uniform(0, 12, n_users).round(1)
+
+    t0 = time.perf_counter()
+    schedules = build_schedules(intensity, weight, hours)
+    batch_s = time.perf_counter() - t0
+
+    n_loop = min(n_users, 10_000)
+    t0 = time.perf_counter()
+    looped = [_schedule_loop(i, w, h) for i, w, h in zip(intensity[:n_loop], weight[:n_loop],
+                                                          hours[:n_loop])]
+    loop_s = time.perf_counter() - t0
+    same = (np.array_equal(np.array([m for m, _, _ in looped]), schedules.minutes[:n_loop])
+            and np.allclose(np.array([k for _, k, _ in looped]), schedules.kcal[:n_loop])
+            and np.allclose([e for _, _, e in looped], schedules.exercise_kcal[:n_loop]))
+
+    print(f"\n=== Workout schedules: {n_users:,} users ===")
+    print(f"\n  One call:      {batch_s * 1e3:8.1f} ms   ({n_users / batch_s:,.0f} users/s)")
+    print(f"  Per-user loop: {loop_s * 1e3:8.1f} ms   ({n_loop / loop_s:,.0f} users/s,"
+          f" {n_loop:,} users)")
+    print(f"  Loop and batch agree: {'yes' if same else 'NO'}")
+
+    print(f"\n  {'Intensity':<10} {'Sessions':>9} {'Min / week':>11} {'kcal / week':>12}"
+          f" {'Net kcal/day':>12}")
+    for i, level in enumerate(INTENSITIES):
+        mask = schedules.intensity == i
+        print(f"  {level:<10} {np.median(schedules.sessions[mask]):>9.0f}"
+              f" {np.median(schedules.minutes[mask].sum(axis=1)):>11.0f}"
+              f" {np.median(schedules.kcal[mask].sum(axis=1)):>12,.0f}"
+              f" {np.median(schedules.exercise_kcal[mask]):>12.0f}")
+    print("  (medians)")
+
+    # More reported hours must never lower the calorie target
+    grid_hours = np.arange(0.0, 20.05, 0.1)
+    monotone   = True
+    for level in INTENSITIES:
+        for kg in (50.0, 80.0, 130.0):
+            burn = build_schedules([level] * len(grid_hours), np.full(len(grid_hours), kg),
+                                   grid_hours).exercise_kcal
+            for activity in ACTIVITY_MULTIPLIERS:
+                _, _, target = energy_targets(kg, 180.0, 40, 'Male', activity,
+                                              'Maintain Weight', exercise_kcal=burn)
+                monotone &= bool(np.all(np.diff(target) >= 0))
+    print(f"  Calorie target non-decreasing in weekly hours (0-20 h, every activity level): "
+          f"{'yes' if monotone else 'NO'}")
+
+    # Extra Active already allows for hard training: losing weight stays a deficit
+    burn = build_schedules(['Intense'], [100.0], [10.0]).exercise_kcal
+    _, tdee0, _ = energy_targets(100.0, 180.0, 35, 'Male', 'Extra Active', 'Lose Weight')
+    _, _, lose  = energy_targets(100.0, 180.0, 35, 'Male', 'Extra Active', 'Lose Weight',
+                                 exercise_kcal=burn)
+    print(f"  100 kg Extra Active male, Intense plan (+{burn[0]:.0f} kcal/day burn): Lose Weight"
+          f" target {int(lose[0]):,} kcal vs maintenance {tdee0:,.0f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=100_000)
+    args = parser.parse_args()
+    benchmark(args.users)
+
+
+if __name__ == '__main__':
+    main()